@@ -0,0 +1,186 @@
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+import hashlib
+import platform
+import random
+import zlib
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+# 言語ごとの本文（行の組み合わせで1枚の画像を作る）
+SAMPLE_TEXTS: Dict[str, List[str]] = {
+    "eng": [
+        "The quick brown fox jumps over the lazy dog.",
+        "Press Start to continue your adventure.",
+        "Settings saved successfully.",
+        "Connection lost. Retrying in 5 seconds...",
+        "Quest complete: return to the village elder.",
+        "HP 120/150  MP 45/80  Level 17",
+        "Error 0x80070005: access is denied.",
+        "Click the button below to download the file.",
+    ],
+    "jpn": [
+        "今日はとても良い天気です。",
+        "設定を保存しました。",
+        "接続が切れました。再試行しています。",
+        "クエスト完了：村の長老に報告せよ。",
+    ],
+}
+
+# 探索するフォントファイル名（言語ごと）。見つかったものだけを使う
+FONT_CANDIDATES: Dict[str, List[str]] = {
+    "eng": ["DejaVuSans.ttf", "DejaVuSerif.ttf", "DejaVuSansMono.ttf", "arial.ttf", "times.ttf", "consola.ttf"],
+    "jpn": ["NotoSansCJK-Regular.ttc", "NotoSansJP-Regular.otf", "ipaexg.ttf", "msgothic.ttc", "YuGothM.ttc"],
+}
+
+FONT_DIRECTORIES = [
+    Path("/usr/share/fonts"),
+    Path("/usr/local/share/fonts"),
+    Path.home() / ".fonts",
+    Path("C:/Windows/Fonts"),
+]
+
+# 変化させるパラメータ
+FONT_SIZES = (14, 20, 32)
+CONTRASTS = {
+    # 名前: (文字色, 背景色)
+    "high": ((0, 0, 0), (255, 255, 255)),
+    "low": ((90, 90, 90), (170, 170, 170)),
+    "inverted": ((235, 235, 235), (30, 30, 40)),
+}
+NOISE_LEVELS = (0.0, 12.0)
+
+
+@dataclass
+class CorpusSample:
+    """ベンチマーク用の画像1枚と，その正解テキスト"""
+    name: str
+    image: np.ndarray  # BGR（キャプチャ結果と同じ形式）
+    text: str
+    language: str
+    params: Dict[str, object] = field(default_factory=dict)
+
+
+def find_fonts(language: str) -> List[Path]:
+    """
+    言語に対応するフォントファイルを探す
+
+    Args:
+        language (str): "eng" などの言語名
+
+    Returns:
+        List[Path]: 見つかったフォント（FONT_CANDIDATES の順）
+    """
+    found = []
+    for name in FONT_CANDIDATES.get(language, []):
+        for directory in FONT_DIRECTORIES:
+            if not directory.is_dir():
+                continue
+            match = next(directory.rglob(name), None)
+            if match:
+                found.append(match)
+                break
+    return found
+
+
+def _load_font(font_path: Optional[Path], size: int) -> ImageFont.ImageFont:
+    if font_path is None:
+        # Pillow 同梱のフォント（英数字のみ）
+        return ImageFont.load_default(size)
+    return ImageFont.truetype(str(font_path), size)
+
+
+def render_text_image(text: str, font: ImageFont.ImageFont, foreground, background,
+                      noise_sigma: float, rng: np.random.Generator, padding: int = 12) -> np.ndarray:
+    """
+    テキストを描画した BGR 画像を作る
+
+    Args:
+        text (str): 描画するテキスト（改行可）
+        font (ImageFont.ImageFont): フォント
+        foreground: 文字色 (R, G, B)
+        background: 背景色 (R, G, B)
+        noise_sigma (float): 加えるガウスノイズの標準偏差（0 ならノイズなし）
+        rng (np.random.Generator): ノイズ用の乱数生成器
+        padding (int): 余白（ピクセル）
+
+    Returns:
+        np.ndarray: BGR 画像
+    """
+    measure = ImageDraw.Draw(Image.new("RGB", (1, 1)))
+    left, top, right, bottom = measure.multiline_textbbox((0, 0), text, font=font, spacing=6)
+    size = (right - left + padding * 2, bottom - top + padding * 2)
+
+    image = Image.new("RGB", size, background)
+    ImageDraw.Draw(image).multiline_text((padding - left, padding - top), text, font=font, fill=foreground, spacing=6)
+
+    array = np.asarray(image, dtype=np.float32)
+    if noise_sigma > 0:
+        array = array + rng.normal(0.0, noise_sigma, array.shape)
+    rgb = np.clip(array, 0, 255).astype(np.uint8)
+    return np.ascontiguousarray(rgb[:, :, ::-1])
+
+
+def generate_corpus(seed: int = 0, samples_per_language: int = 24,
+                    languages: Sequence[str] = ("eng", "jpn")) -> List[CorpusSample]:
+    """
+    決定的なベンチマーク用コーパスを生成する
+
+    フォント・文字サイズ・コントラスト・ノイズと本文を seed から決まる乱数で選びます．同じ環境・同じ引数なら常に同じ画像になります．
+    フォントが見つからない言語は（Pillow 同梱フォントが使える eng を除き）スキップします．
+
+    Args:
+        seed (int): 乱数シード
+        samples_per_language (int): 言語ごとの枚数
+        languages (Sequence[str]): 対象言語
+
+    Returns:
+        List[CorpusSample]: 生成したサンプル
+    """
+    samples = []
+    for language in languages:
+        fonts: List[Optional[Path]] = list(find_fonts(language))
+        if language == "eng":
+            fonts.append(None)
+        if not fonts:
+            continue
+
+        rng = random.Random(f"{seed}-{language}")
+        noise_rng = np.random.default_rng([seed, zlib.crc32(language.encode())])
+        texts = SAMPLE_TEXTS[language]
+
+        for index in range(samples_per_language):
+            font_path = rng.choice(fonts)
+            size = rng.choice(FONT_SIZES)
+            contrast, colors = rng.choice(list(CONTRASTS.items()))
+            noise = rng.choice(NOISE_LEVELS)
+            line_count = rng.randint(1, 3)
+            text = "\n".join(rng.sample(texts, line_count))
+            image = render_text_image(text, _load_font(font_path, size), colors[0], colors[1], noise, noise_rng)
+            font_name = font_path.name if font_path else "pillow-default"
+            samples.append(CorpusSample(
+                name=f"{language}-{index:03d}",
+                image=image,
+                text=text,
+                language=language,
+                params={"font": font_name, "size": size, "contrast": contrast, "noise": noise},
+            ))
+    return samples
+
+
+def corpus_fingerprint(samples: Sequence[CorpusSample]) -> str:
+    """
+    コーパスの内容（画像と正解テキスト）のハッシュ
+
+    フォントの有無などで環境によりコーパスが変わるため，
+    ベースラインとの比較はこの値が一致する場合に限ります．
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(platform.system().encode())
+    for sample in samples:
+        digest.update(sample.name.encode())
+        digest.update(sample.text.encode())
+        digest.update(sample.image.tobytes())
+    return digest.hexdigest()
@@ -0,0 +1,213 @@
+"""
+googletrans 互換のモック翻訳サーバー
+
+googletrans が使う GET /translate_a/single に応答するローカル HTTP サーバーです．
+レイテンシの分布・エラー率・レート制限（429）を設定でき，外部へ通信せずに
+翻訳エンジンの負荷試験を行えます．
+
+    with MockTranslateServer(latency=LatencyDistribution("lognormal", median_ms=80)) as server:
+        config = TranslationConfig(service_endpoint=server.url)
+"""
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlparse
+import json
+import math
+import random
+import threading
+import time
+
+TRANSLATE_PATH = "/translate_a/single"
+
+
+@dataclass
+class LatencyDistribution:
+    """
+    応答レイテンシの分布
+
+    kind:
+        "constant": 常に median_ms
+        "uniform": median_ms ± spread_ms の一様分布
+        "lognormal": 中央値 median_ms，対数標準偏差 sigma の対数正規分布（裾の重い実環境に近い）
+    """
+    kind: str = "lognormal"
+    median_ms: float = 80.0
+    spread_ms: float = 40.0
+    sigma: float = 0.5
+
+    def sample(self, rng: random.Random) -> float:
+        """レイテンシ（秒）を1つ引く"""
+        if self.kind == "constant":
+            value = self.median_ms
+        elif self.kind == "uniform":
+            value = rng.uniform(self.median_ms - self.spread_ms, self.median_ms + self.spread_ms)
+        elif self.kind == "lognormal":
+            value = rng.lognormvariate(math.log(self.median_ms), self.sigma)
+        else:
+            raise ValueError(f"サポートされていない分布です: {self.kind}")
+        return max(value, 0.0) / 1000
+
+
+class TokenBucket:
+    """
+    レート制限用のトークンバケット
+
+    rate 件/秒でトークンが補充され，最大 burst 件まで貯まります．
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> Optional[float]:
+        """
+        トークンを1つ取る
+
+        Returns:
+            Optional[float]: 取れた場合 None，取れない場合は次のトークンまでの秒数
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return None
+            return (1 - self._tokens) / self.rate
+
+
+@dataclass
+class MockServerConfig:
+    """モックサーバーの挙動"""
+    latency: LatencyDistribution = field(default_factory=LatencyDistribution)
+    error_rate: float = 0.0                 # 500 を返す割合（0〜1）
+    throttle_rate: Optional[float] = None   # 許可する要求数/秒（None なら無制限）
+    throttle_burst: int = 10
+    seed: Optional[int] = None
+
+
+def build_response(text: str, source: str, target: str) -> list:
+    """
+    googletrans が解釈できる形式の応答を作る
+
+    data[0] は [訳文, 原文, ...] の並び，data[2] は検出された元言語です．
+    訳文は原文に "[target]" を付けたものにします．
+    """
+    return [[[f"[{target}] {text}", text, None, None, 10]], None, source if source != "auto" else "en"]
+
+
+class MockTranslateServer:
+    """
+    別スレッドで動くモック翻訳サーバー
+
+    port=0 の場合は空いているポートを使います．接続先は url で取得してください．
+    """
+
+    def __init__(self, config: Optional[MockServerConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or MockServerConfig()
+        self._rng = random.Random(self.config.seed)
+        self._rng_lock = threading.Lock()
+        self._bucket = (TokenBucket(self.config.throttle_rate, self.config.throttle_burst)
+                        if self.config.throttle_rate else None)
+        self._status_counts: Dict[int, int] = {}
+        self._stats_lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """接続先（TranslationConfig.service_endpoint に渡す）"""
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def status_counts(self) -> Dict[int, int]:
+        """返したステータスコードごとの件数"""
+        with self._stats_lock:
+            return dict(self._status_counts)
+
+    def start(self) -> "MockTranslateServer":
+        """サーバースレッドを開始する"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._httpd.serve_forever, name="MockTranslateServer", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """サーバーを停止する"""
+        if self._thread is not None:
+            self._httpd.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._httpd.server_close()
+
+    def __enter__(self) -> "MockTranslateServer":
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.stop()
+
+    def _decide(self):
+        """要求1件への応答（ステータス, 遅延秒, Retry-After）を決める"""
+        if self._bucket is not None:
+            retry_after = self._bucket.try_acquire()
+            if retry_after is not None:
+                return 429, 0.0, retry_after
+        with self._rng_lock:
+            delay = self.config.latency.sample(self._rng)
+            failed = self._rng.random() < self.config.error_rate
+        return (500 if failed else 200), delay, None
+
+    def _count(self, status: int) -> None:
+        with self._stats_lock:
+            self._status_counts[status] = self._status_counts.get(status, 0) + 1
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                if parsed.path != TRANSLATE_PATH:
+                    self._send(404, b"not found", "text/plain")
+                    return
+                status, delay, retry_after = server._decide()
+                if delay:
+                    time.sleep(delay)
+                if status == 429:
+                    self._send(429, b"Too Many Requests", "text/plain",
+                               {"Retry-After": str(max(1, math.ceil(retry_after)))})
+                    return
+                if status != 200:
+                    self._send(status, b"Internal Server Error", "text/plain")
+                    return
+                params = parse_qs(parsed.query)
+                body = build_response(
+                    params.get("q", [""])[0],
+                    params.get("sl", ["auto"])[0],
+                    params.get("tl", ["en"])[0],
+                )
+                self._send(200, json.dumps(body, ensure_ascii=False).encode("utf-8"), "application/json; charset=utf-8")
+
+            def _send(self, status: int, body: bytes, content_type: str, headers: Optional[Dict[str, str]] = None):
+                server._count(status)
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                # 負荷試験中にアクセスログで標準エラーを埋めない
+                pass
+
+        return Handler
@@ -0,0 +1,267 @@
+"""
+OCR ベンチマーク
+
+生成したコーパスに対して OCR エンジン／設定ごとにスループット・レイテンシ・
+ピークメモリ・文字誤り率（CER）を計測し，保存済みのベースラインと比較します．
+
+    python -m benchmarks.ocr_benchmark                    # 計測して結果を表示
+    python -m benchmarks.ocr_benchmark --update-baseline  # 結果をベースラインとして保存
+"""
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from benchmarks.corpus import CorpusSample, corpus_fingerprint, generate_corpus
+from models.ocr.ocr import IOCR, OCRFactory
+
+BASELINE_PATH = Path(__file__).resolve().parent / "baseline.json"
+
+# 回帰とみなす閾値
+DEFAULT_TOLERANCES = {
+    "throughput": 0.20,   # スループットが 20% 以上低下
+    "latency_p95": 0.20,  # p95 レイテンシが 20% 以上増加
+    "cer": 0.02,          # CER が 0.02 以上増加（絶対値）
+}
+
+
+@dataclass
+class BenchmarkConfig:
+    """計測する OCR エンジンと設定"""
+    name: str
+    engine_type: str = "tesseract"
+    language: str = "eng"
+    engine_options: Dict[str, Any] = field(default_factory=dict)
+    # 対象にするコーパスの言語
+    corpus_languages: Sequence[str] = ("eng",)
+
+
+DEFAULT_CONFIGS = [
+    BenchmarkConfig(name="tesseract-eng"),
+    BenchmarkConfig(name="tesseract-eng-postcorrect", engine_options={"post_correction": True}),
+    BenchmarkConfig(name="tesseract_auto-fast", engine_type="tesseract_auto",
+                    engine_options={"latency_preference": "fast"}),
+    BenchmarkConfig(name="tesseract_auto-multilingual", engine_type="tesseract_auto",
+                    corpus_languages=("eng", "jpn")),
+]
+
+
+@dataclass
+class BenchmarkResult:
+    """1つの設定の計測結果"""
+    config: str
+    samples: int
+    throughput: float        # 枚/秒
+    latency_p50: float       # 秒
+    latency_p95: float
+    latency_p99: float
+    peak_python_bytes: int   # tracemalloc によるピーク（numpy 配列を含む。時間を計らない別の1周で計測）
+    # このプロセスがこれまでに起動した全子プロセスの最大 RSS（Unix のみ）。
+    # OS の累積値なので設定ごとにはリセットされず，それまでで最大の設定の値がそのまま残る
+    process_peak_child_rss_kb: int
+    cer: float               # 文字誤り率
+
+
+def levenshtein_distance(reference: str, hypothesis: str) -> int:
+    """2つの文字列の編集距離（挿入・削除・置換）"""
+    if len(reference) < len(hypothesis):
+        reference, hypothesis = hypothesis, reference
+    previous = list(range(len(hypothesis) + 1))
+    for i, ref_char in enumerate(reference, 1):
+        current = [i]
+        for j, hyp_char in enumerate(hypothesis, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_char != hyp_char)))
+        previous = current
+    return previous[-1]
+
+
+def normalize_text(text: str) -> str:
+    """空白の違いを無視するため，連続する空白を1つにまとめる"""
+    return " ".join(text.split())
+
+
+def character_error_rate(references: Sequence[str], hypotheses: Sequence[str]) -> float:
+    """
+    コーパス全体の文字誤り率（編集距離の合計 / 正解文字数の合計）
+
+    Args:
+        references (Sequence[str]): 正解テキスト
+        hypotheses (Sequence[str]): OCR結果
+
+    Returns:
+        float: CER
+    """
+    errors = 0
+    total = 0
+    for reference, hypothesis in zip(references, hypotheses):
+        reference = normalize_text(reference)
+        errors += levenshtein_distance(reference, normalize_text(hypothesis))
+        total += len(reference)
+    return errors / total if total else 0.0
+
+
+def _process_peak_child_rss_kb() -> int:
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    except (ImportError, AttributeError):
+        return 0
+
+
+def run_benchmark(name: str, extract: Callable[[np.ndarray], str], samples: Sequence[CorpusSample],
+                  warmup: int = 1) -> BenchmarkResult:
+    """
+    任意の抽出関数をコーパスに対して計測する
+
+    tracemalloc は割り当てのたびに大きな負荷がかかるため，時間の計測とメモリの計測は別の周回で行います．
+
+    Args:
+        name (str): 結果に付ける設定名
+        extract (Callable[[np.ndarray], str]): 画像からテキストを返す関数
+        samples (Sequence[CorpusSample]): コーパス
+        warmup (int): 計測前に捨てる実行回数（traineddata の読み込みなど）
+
+    Returns:
+        BenchmarkResult: 計測結果
+    """
+    for sample in samples[:warmup]:
+        extract(sample.image)
+
+    latencies = []
+    hypotheses = []
+    started = time.perf_counter()
+    for sample in samples:
+        t0 = time.perf_counter()
+        hypotheses.append(extract(sample.image))
+        latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - started
+
+    # メモリは時間を計らない別の1周で計測する
+    tracemalloc.start()
+    try:
+        for sample in samples:
+            extract(sample.image)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if latencies else (0.0, 0.0, 0.0)
+    return BenchmarkResult(
+        config=name,
+        samples=len(samples),
+        throughput=len(samples) / elapsed if elapsed > 0 else 0.0,
+        latency_p50=float(p50),
+        latency_p95=float(p95),
+        latency_p99=float(p99),
+        peak_python_bytes=peak,
+        process_peak_child_rss_kb=_process_peak_child_rss_kb(),
+        cer=character_error_rate([s.text for s in samples], hypotheses),
+    )
+
+
+def run_ocr_benchmark(config: BenchmarkConfig, corpus: Sequence[CorpusSample]) -> BenchmarkResult:
+    """OCRFactory でエンジンを生成し，設定に対応する言語のサンプルで計測する"""
+    engine: IOCR = OCRFactory.create_ocr(config.engine_type, config.language, **config.engine_options)
+    samples = [s for s in corpus if s.language in config.corpus_languages]
+    return run_benchmark(config.name, engine.extract_text, samples)
+
+
+def load_baseline(path: Path = BASELINE_PATH) -> Optional[Dict[str, Any]]:
+    """保存済みのベースラインを読み込む。無ければ None"""
+    if not path.exists():
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baseline(results: Sequence[BenchmarkResult], fingerprint: str, path: Path = BASELINE_PATH) -> None:
+    """計測結果をベースラインとして保存する"""
+    data = {
+        "corpus_fingerprint": fingerprint,
+        "results": {r.config: asdict(r) for r in results},
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def find_regressions(results: Sequence[BenchmarkResult], baseline: Dict[str, Any],
+                     tolerances: Optional[Dict[str, float]] = None) -> List[str]:
+    """
+    ベースラインと比べて悪化した項目を列挙する
+
+    Args:
+        results (Sequence[BenchmarkResult]): 今回の結果
+        baseline (Dict[str, Any]): load_baseline() の戻り値
+        tolerances (Optional[Dict[str, float]]): DEFAULT_TOLERANCES を上書きする閾値
+
+    Returns:
+        List[str]: 回帰の説明（無ければ空）
+    """
+    tolerances = {**DEFAULT_TOLERANCES, **(tolerances or {})}
+    regressions = []
+    for result in results:
+        reference = baseline["results"].get(result.config)
+        if reference is None:
+            continue
+        if result.throughput < reference["throughput"] * (1 - tolerances["throughput"]):
+            regressions.append(f"{result.config}: throughput {reference['throughput']:.2f} -> {result.throughput:.2f} /s")
+        if result.latency_p95 > reference["latency_p95"] * (1 + tolerances["latency_p95"]):
+            regressions.append(f"{result.config}: p95 {reference['latency_p95'] * 1000:.1f} -> {result.latency_p95 * 1000:.1f} ms")
+        if result.cer > reference["cer"] + tolerances["cer"]:
+            regressions.append(f"{result.config}: CER {reference['cer']:.4f} -> {result.cer:.4f}")
+    return regressions
+
+
+def format_results(results: Sequence[BenchmarkResult]) -> str:
+    """結果を表形式の文字列にする"""
+    lines = [f"{'config':<30} {'n':>4} {'img/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'py MB':>7} {'child MB*':>9} {'CER':>7}"]
+    for r in results:
+        lines.append(
+            f"{r.config:<30} {r.samples:>4} {r.throughput:>7.2f} {r.latency_p50 * 1000:>8.1f} "
+            f"{r.latency_p95 * 1000:>8.1f} {r.latency_p99 * 1000:>8.1f} {r.peak_python_bytes / 2**20:>7.1f} "
+            f"{r.process_peak_child_rss_kb / 1024:>9.1f} {r.cer:>7.4f}"
+        )
+    lines.append("* child MB: プロセス全体でこれまでに起動した子プロセスの最大 RSS（設定ごとの値ではない）")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="OCR ベンチマーク")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--samples", type=int, default=24, help="言語ごとのサンプル数")
+    parser.add_argument("--configs", nargs="*", help="計測する設定名（省略時はすべて）")
+    parser.add_argument("--update-baseline", action="store_true", help="結果をベースラインとして保存する")
+    args = parser.parse_args(argv)
+
+    corpus = generate_corpus(seed=args.seed, samples_per_language=args.samples)
+    configs = [c for c in DEFAULT_CONFIGS if not args.configs or c.name in args.configs]
+    results = [run_ocr_benchmark(config, corpus) for config in configs]
+    print(format_results(results))
+
+    fingerprint = corpus_fingerprint(corpus)
+    if args.update_baseline:
+        save_baseline(results, fingerprint)
+        print(f"ベースラインを保存しました: {BASELINE_PATH}")
+        return 0
+
+    baseline = load_baseline()
+    if baseline is None:
+        print("ベースラインがありません（--update-baseline で作成できます）")
+        return 0
+    if baseline.get("corpus_fingerprint") != fingerprint:
+        print("コーパスがベースライン作成時と異なるため比較をスキップしました")
+        return 0
+    regressions = find_regressions(results, baseline)
+    for regression in regressions:
+        print(f"回帰: {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,187 @@
+"""
+綴り補正のマイクロベンチマーク
+
+コーパスの本文の単語に OCR でよくある誤り（rn→m, l→1, o→0 など）を決定的に加え，
+補正器が1語あたりに掛かる時間と，正しい語に戻せた割合を計測します．
+辞書に無い正しい語（"modem" など）を別の語に変えてしまった数も数えます．
+tesseract を使わないのでどの環境でも計測できます．辞書（dictionaries/<言語>.txt）が無い場合は，
+コーパスの単語（一部は辞書から外す）と紛らわしい英単語から作った辞書で計測します．
+
+    python -m benchmarks.postcorrect_benchmark
+"""
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+import argparse
+import random
+import re
+import sys
+import tempfile
+import time
+
+from benchmarks.corpus import SAMPLE_TEXTS
+from models.ocr.postcorrect import MIN_CORRECTABLE_LENGTH, PostCorrector, SymSpellIndex, build_index, get_post_corrector
+
+# OCR でよく起きる取り違え（正しい文字列, 誤認識後の文字列）
+CONFUSIONS: Sequence[Tuple[str, str]] = (
+    ("m", "rn"), ("rn", "m"), ("l", "1"), ("o", "0"), ("e", "c"), ("i", "l"), ("s", "5"), ("cl", "d"), ("h", "b"),
+)
+
+# 辞書が無いときに作る辞書に入れる，コーパスの語と紛らわしい英単語
+DISTRACTOR_WORDS: Sequence[str] = (
+    "the", "then", "them", "thee", "they", "quack", "quick", "brow", "brawn", "brown", "box", "fix", "fax", "fog",
+    "jump", "jumped", "pumps", "over", "oven", "ever", "lady", "lacy", "laze", "dog", "dot", "dig", "dug", "log",
+    "bog", "press", "dress", "prose", "start", "stark", "star", "stare", "continue", "contour", "your", "sour",
+    "tour", "hour", "adventurer", "adventures", "setting", "sitting", "suiting", "save", "saves", "caved", "waved",
+    "successful", "succession", "connect", "connected", "collection", "lost", "last", "list", "lust", "loss",
+    "retry", "retrieving", "retiring", "second", "secondly", "seconded", "quest", "guest", "quiet", "west",
+    "complete", "compete", "completed", "return", "returns", "rerun", "village", "vintage", "villa", "elder",
+    "older", "eider", "alder", "error", "errors", "access", "excess", "accent", "denied", "denies", "dined",
+    "click", "clock", "cluck", "slick", "button", "mutton", "bottom", "below", "bellow", "elbow", "blow",
+    "download", "downloads", "file", "fine", "fire", "mile", "modern", "model", "mode", "level", "lever",
+    "revel", "and", "are", "was", "with", "this", "that", "from", "have", "will", "word", "world", "would",
+)
+
+# 辞書に入れない正しい語（辞書の語に近いので，誤って補正されないかを確認する）
+OUT_OF_VOCABULARY_PROBES: Sequence[str] = (
+    "modem", "modal", "dots", "logs", "stir", "brownie", "clocked", "tours", "elders", "filed", "villas",
+)
+
+
+@dataclass
+class PostCorrectionResult:
+    """補正のマイクロベンチマークの結果"""
+    words: int
+    corrupted: int
+    fixed: int               # 誤りを加えた語のうち正しい語に戻せた数
+    broken: int              # 辞書にある正しい語を別の語に変えてしまった数
+    out_of_vocabulary: int   # 辞書に無い正しい語の数
+    oov_changed: int         # 辞書に無い正しい語を別の語に変えてしまった数
+    microseconds_per_word: float
+
+    def format(self) -> str:
+        fix_rate = self.fixed / self.corrupted if self.corrupted else 0.0
+        return (f"words={self.words} corrupted={self.corrupted} fixed={self.fixed} ({fix_rate:.1%}) "
+                f"broken={self.broken} oov={self.out_of_vocabulary} oov_changed={self.oov_changed} "
+                f"{self.microseconds_per_word:.1f} us/word")
+
+
+def corrupt_word(word: str, rng: random.Random) -> Optional[str]:
+    """単語に取り違えを1つ加える（当てはまる取り違えが無ければ None）"""
+    candidates = [(source, target) for source, target in CONFUSIONS if source in word]
+    if not candidates:
+        return None
+    source, target = rng.choice(candidates)
+    positions = [m.start() for m in re.finditer(re.escape(source), word)]
+    position = rng.choice(positions)
+    return word[:position] + target + word[position + len(source):]
+
+
+def corpus_words(language: str = "eng") -> List[str]:
+    """コーパスの本文の単語（補正対象の長さのもの）"""
+    return [w for text in SAMPLE_TEXTS[language] for w in re.findall(r"[A-Za-z]+", text)
+            if len(w) >= MIN_CORRECTABLE_LENGTH]
+
+
+def build_benchmark_dictionary(language: str = "eng", seed: int = 0,
+                               holdout_rate: float = 0.15) -> Tuple[Dict[str, int], Set[str]]:
+    """
+    辞書が無いときに使う頻度辞書を作る
+
+    コーパスの語の一部（holdout_rate）は辞書から外し，辞書に無い正しい語として使います．
+
+    Returns:
+        Tuple[Dict[str, int], Set[str]]: (単語 → 出現回数, 辞書から外した語)
+    """
+    rng = random.Random(seed)
+    vocabulary = sorted({w.lower() for w in corpus_words(language)})
+    held_out = set(rng.sample(vocabulary, max(1, int(len(vocabulary) * holdout_rate))))
+    words = {word: 1000 for word in vocabulary if word not in held_out}
+    for word in DISTRACTOR_WORDS:
+        words.setdefault(word, rng.randint(10, 2000))
+    return words, held_out | set(OUT_OF_VOCABULARY_PROBES)
+
+
+def make_word_pairs(language: str = "eng", seed: int = 0, repeat: int = 20,
+                    out_of_vocabulary: Sequence[str] = ()) -> List[Tuple[str, str]]:
+    """
+    (入力語, 正解) の組を作る
+
+    半分程度の語には取り違えを加え，残りはそのまま（誤補正しないかの確認用）にします．
+    out_of_vocabulary の語は辞書に無く戻しようがないので，取り違えを加えずにそのまま入れます．
+    """
+    rng = random.Random(seed)
+    skipped = {w.lower() for w in out_of_vocabulary}
+    words = corpus_words(language)
+    probes = [w for w in out_of_vocabulary if w not in {x.lower() for x in words}]
+    pairs = []
+    for _ in range(repeat):
+        for word in words:
+            corrupted = None
+            if word.lower() not in skipped and rng.random() < 0.5:
+                corrupted = corrupt_word(word, rng)
+            pairs.append((corrupted or word, word))
+        pairs.extend((word, word) for word in probes)
+    return pairs
+
+
+def run_postcorrect_benchmark(corrector: PostCorrector, pairs: Sequence[Tuple[str, str]],
+                              out_of_vocabulary: Sequence[str] = ()) -> PostCorrectionResult:
+    """補正器で各語を補正し，時間と正解率を計測する"""
+    for word, _ in pairs[:20]:
+        corrector.correct_word(word)
+    start = time.perf_counter()
+    outputs = [corrector.correct_word(word) for word, _ in pairs]
+    elapsed = time.perf_counter() - start
+
+    missing = {w.lower() for w in out_of_vocabulary}
+    corrupted = fixed = broken = oov = oov_changed = 0
+    for (word, expected), output in zip(pairs, outputs):
+        if word != expected:
+            corrupted += 1
+            fixed += output == expected
+        elif word.lower() in missing:
+            oov += 1
+            oov_changed += output != expected
+        else:
+            broken += output != expected
+    return PostCorrectionResult(
+        words=len(pairs),
+        corrupted=corrupted,
+        fixed=fixed,
+        broken=broken,
+        out_of_vocabulary=oov,
+        oov_changed=oov_changed,
+        microseconds_per_word=elapsed / len(pairs) * 1e6 if pairs else 0.0,
+    )
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="綴り補正のマイクロベンチマーク")
+    parser.add_argument("--language", default="eng")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    corrector = get_post_corrector(args.language)
+    out_of_vocabulary: Sequence[str] = ()
+    with tempfile.TemporaryDirectory() as directory:
+        if corrector is None:
+            if args.language != "eng":
+                print(f"{args.language} の辞書がありません（dictionaries/{args.language}.txt を配置してください）")
+                return 1
+            print("dictionaries/eng.txt が無いため，コーパスの語と紛らわしい英単語から作った辞書で計測します")
+            words, held_out = build_benchmark_dictionary(args.language, args.seed)
+            out_of_vocabulary = sorted(held_out)
+            index_path = Path(directory) / "benchmark.idx"
+            build_index(words, index_path)
+            corrector = PostCorrector(SymSpellIndex(index_path))
+        pairs = make_word_pairs(args.language, args.seed, args.repeat, out_of_vocabulary)
+        result = run_postcorrect_benchmark(corrector, pairs, out_of_vocabulary)
+        if out_of_vocabulary:
+            corrector.index.close()
+    print(result.format())
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
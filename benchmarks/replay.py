@@ -0,0 +1,169 @@
+"""
+記録したキャプチャの再生
+
+CaptureRecorder（OCRTRANSLATOR_RECORD=ファイル で起動すると記録される）が書いた記録を読み込み，
+各フレームを ModelFacade の OCR・翻訳の経路に流して，ステージごとの所要時間を記録時と比較します．
+翻訳は通信しないスタブに置き換え，履歴も使わないので，OCR 側の変更の効果だけを比べられます．
+
+    python -m benchmarks.replay capture.rec              # 最大速度で再生
+    python -m benchmarks.replay capture.rec --speed original
+"""
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+from models.model_facade import ModelFacade
+from models.translator.translator import TranslationConfig, TranslatorFactory
+from models.utils.capture_image import RECORDING_ENV, Recording, read_recording
+from models.utils.cpu_budget import MODES, get_cpu_budget
+from models.utils.instrumentation import collect_stages
+from models.utils.metrics import LatencyHistogram
+
+STUB_ENGINE = "Stub"
+
+# 原速度で再生するときに詰める，キャプチャ間の待ち時間の上限（秒）
+DEFAULT_MAX_GAP = 5.0
+
+
+class StubTranslator:
+    """通信せずに原文に言語タグを付けて返す翻訳エンジン（latency 秒だけ待つ）"""
+
+    latency: float = 0.0
+
+    def __init__(self, config: Optional[TranslationConfig] = None):
+        self.config = config or TranslationConfig()
+        self._translated_text = ""
+
+    @property
+    def translated_text(self) -> str:
+        return self._translated_text
+
+    @property
+    def translator_engine_name(self) -> str:
+        return STUB_ENGINE
+
+    @property
+    def source_language(self) -> str:
+        return "en" if self.config.source_language == "auto" else self.config.source_language
+
+    async def translate(self, text: str) -> str:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self._translated_text = f"[{self.config.target_language}] {text}"
+        return self._translated_text
+
+
+@dataclass
+class ReplayResult:
+    """再生の結果"""
+    captures: int
+    replayed: int
+    skipped: int                     # フレームが記録されていなかったキャプチャ
+    failed: int
+    text_changed: int                # OCR 結果が記録時と異なったキャプチャ
+    elapsed: float
+    recorded: Dict[str, LatencyHistogram] = field(default_factory=dict)
+    replay: Dict[str, LatencyHistogram] = field(default_factory=dict)
+
+    def format(self) -> str:
+        lines = [
+            f"captures={self.captures} replayed={self.replayed} skipped={self.skipped} failed={self.failed} "
+            f"text_changed={self.text_changed} elapsed={self.elapsed:.2f}s",
+            f"{'stage':<28} {'n':>5} {'rec p50':>9} {'rep p50':>9} {'rec p95':>9} {'rep p95':>9}",
+        ]
+        for name in sorted(set(self.recorded) | set(self.replay)):
+            recorded = self.recorded.get(name, LatencyHistogram()).summary()
+            replay = self.replay.get(name, LatencyHistogram()).summary()
+            lines.append(
+                f"{name:<28} {int(replay['count']):>5} {recorded['p50'] * 1000:>9.1f} {replay['p50'] * 1000:>9.1f} "
+                f"{recorded['p95'] * 1000:>9.1f} {replay['p95'] * 1000:>9.1f}"
+            )
+        return "\n".join(lines)
+
+
+def _add_stages(histograms: Dict[str, LatencyHistogram], stages: Sequence[Sequence]) -> None:
+    for name, _, duration in stages:
+        histograms.setdefault(name, LatencyHistogram()).record(duration)
+
+
+def create_replay_model(translation_latency: float = 0.0) -> ModelFacade:
+    """スタブ翻訳・履歴なしの ModelFacade を作る"""
+    TranslatorFactory.register_engine(STUB_ENGINE, StubTranslator)
+    StubTranslator.latency = translation_latency
+    model = ModelFacade()
+    model.history_enabled = False
+    model.set_translator_engine(STUB_ENGINE)
+    return model
+
+
+async def replay_recording(recording: Recording, model: ModelFacade, speed: str = "max",
+                           max_gap: float = DEFAULT_MAX_GAP) -> ReplayResult:
+    """
+    記録を ModelFacade で再生する
+
+    Args:
+        recording (Recording): read_recording() の戻り値
+        model (ModelFacade): 再生に使うモデル（create_replay_model() で作ったもの）
+        speed (str): "max" なら待たずに続けて処理し，"original" なら記録時の間隔で処理する
+        max_gap (float): "original" で待つ間隔の上限（秒）
+
+    Returns:
+        ReplayResult: 記録時と再生時のステージごとの所要時間
+    """
+    result = ReplayResult(captures=len(recording.captures), replayed=0, skipped=0, failed=0, text_changed=0,
+                          elapsed=0.0)
+    start = time.perf_counter()
+    previous_timestamp: Optional[float] = None
+    for event in recording.captures:
+        if speed == "original" and previous_timestamp is not None:
+            await asyncio.sleep(min(max(event.timestamp - previous_timestamp, 0.0), max_gap))
+        previous_timestamp = event.timestamp
+        if event.frame is None or event.frame not in recording.frames:
+            result.skipped += 1
+            continue
+        _add_stages(result.recorded, event.stages)
+        image = recording.decode_frame(event.frame)
+        config = TranslationConfig(source_language=event.source_language, target_language=event.target_language)
+        with collect_stages() as stages:
+            try:
+                _, original_text, _ = await model.translate_image_from_screen(event.rect, config, image=image)
+            except Exception:
+                result.failed += 1
+                continue
+        _add_stages(result.replay, stages)
+        result.replayed += 1
+        if event.original_text is not None and original_text != event.original_text:
+            result.text_changed += 1
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="記録したキャプチャの再生")
+    parser.add_argument("recording", help="CaptureRecorder の記録ファイル")
+    parser.add_argument("--speed", choices=("max", "original"), default="max")
+    parser.add_argument("--max-gap", type=float, default=DEFAULT_MAX_GAP, help="原速度で待つ間隔の上限（秒）")
+    parser.add_argument("--translation-latency", type=float, default=0.0, help="スタブ翻訳の待ち時間（秒）")
+    parser.add_argument("--cpu-mode", choices=MODES, default=None, help="CPU 配分のモード")
+    args = parser.parse_args(argv)
+
+    # 再生した処理をさらに記録しないようにする
+    os.environ.pop(RECORDING_ENV, None)
+    if args.cpu_mode:
+        get_cpu_budget().set_mode(args.cpu_mode)
+    recording = read_recording(args.recording)
+    model = create_replay_model(args.translation_latency)
+    try:
+        result = asyncio.run(replay_recording(recording, model, args.speed, args.max_gap))
+    finally:
+        model.shutdown()
+    print(result.format())
+    return 1 if result.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
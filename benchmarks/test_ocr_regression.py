@@ -0,0 +1,76 @@
+"""
+OCR 性能の回帰テスト
+
+    pytest benchmarks
+
+ベースライン（benchmarks/baseline.json）が無い環境，tesseract が使えない環境，
+またはフォントの違いでコーパスがベースライン作成時と異なる環境ではスキップします．
+ただし CI（環境変数 CI）または OCRTRANSLATOR_BENCH_REQUIRE_BASELINE=1 のときは，
+回帰を検出できないまま通らないよう，ベースラインが無い・tesseract が使えない場合は失敗させます．
+"""
+import os
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("PIL")
+pytest.importorskip("cv2")
+
+from benchmarks.corpus import corpus_fingerprint, generate_corpus
+from benchmarks.ocr_benchmark import (
+    DEFAULT_CONFIGS, character_error_rate, find_regressions, load_baseline, run_ocr_benchmark,
+)
+
+# CI などで閾値を緩めたい場合の上書き（例: OCRTRANSLATOR_BENCH_TOLERANCE=0.5）
+TOLERANCE_ENV = "OCRTRANSLATOR_BENCH_TOLERANCE"
+# 回帰テストを必ず実行させる（CI では既定で有効）
+REQUIRE_BASELINE_ENV = "OCRTRANSLATOR_BENCH_REQUIRE_BASELINE"
+
+
+def _baseline_required() -> bool:
+    value = os.environ.get(REQUIRE_BASELINE_ENV)
+    if value is not None:
+        return value not in ("", "0")
+    return bool(os.environ.get("CI"))
+
+
+def _skip_or_fail(reason: str) -> None:
+    if _baseline_required():
+        pytest.fail(f"{reason}（{REQUIRE_BASELINE_ENV}=0 でスキップに戻せます）")
+    pytest.skip(reason)
+
+
+def test_corpus_is_deterministic():
+    first = generate_corpus(seed=0, samples_per_language=4)
+    second = generate_corpus(seed=0, samples_per_language=4)
+    assert first
+    assert corpus_fingerprint(first) == corpus_fingerprint(second)
+    assert corpus_fingerprint(first) != corpus_fingerprint(generate_corpus(seed=1, samples_per_language=4))
+
+
+def test_character_error_rate():
+    assert character_error_rate(["hello world"], ["hello  world\n"]) == 0.0
+    assert character_error_rate(["abcd"], ["abed"]) == pytest.approx(0.25)
+
+
+@pytest.mark.parametrize("config", DEFAULT_CONFIGS, ids=lambda c: c.name)
+def test_no_regression_against_baseline(config):
+    baseline = load_baseline()
+    if baseline is None or config.name not in baseline["results"]:
+        _skip_or_fail("ベースラインがありません（python -m benchmarks.ocr_benchmark --update-baseline）")
+
+    corpus = generate_corpus()
+    if baseline.get("corpus_fingerprint") != corpus_fingerprint(corpus):
+        pytest.skip("コーパスがベースライン作成時と異なります")
+
+    try:
+        result = run_ocr_benchmark(config, corpus)
+    except Exception as e:
+        _skip_or_fail(f"OCRエンジンを実行できません: {e}")
+
+    tolerances = None
+    if os.environ.get(TOLERANCE_ENV):
+        tolerance = float(os.environ[TOLERANCE_ENV])
+        tolerances = {"throughput": tolerance, "latency_p95": tolerance}
+    regressions = find_regressions([result], baseline, tolerances)
+    assert not regressions, "\n".join(regressions)
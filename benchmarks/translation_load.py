@@ -0,0 +1,226 @@
+"""
+翻訳エンジンの負荷試験
+
+TranslatorFactory で作った翻訳エンジンに一定の要求レートで翻訳を投げ，
+達成スループット・レイテンシのパーセンタイル・エラーの内訳を表示します．
+既定ではモック翻訳サーバーを起動して接続するため，外部への通信は行いません．
+
+    python -m benchmarks.translation_load --rate 40 --duration 10 --error-rate 0.02 --throttle-rate 30
+"""
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+import argparse
+import asyncio
+import random
+import re
+import sys
+import time
+
+from benchmarks.mock_translate_server import LatencyDistribution, MockServerConfig, MockTranslateServer
+from models.translator.translator import TranslationConfig, TranslationError, TranslatorFactory
+from models.utils.metrics import LatencyHistogram
+
+# 負荷試験で翻訳する文（OCR結果に近い短文）
+LOAD_TEXTS = [
+    "The quick brown fox jumps over the lazy dog.",
+    "Settings saved successfully.",
+    "Connection lost. Retrying in 5 seconds...",
+    "Quest complete: return to the village elder.",
+    "Click the button below to download the file.",
+]
+
+_STATUS_PATTERN = re.compile(r'status code "(\d+)"')
+
+
+@dataclass
+class LoadTestConfig:
+    """負荷試験の設定"""
+    rate: float = 20.0              # 目標要求数/秒
+    duration: float = 10.0          # 要求を発行する秒数
+    engine_type: str = "Google"
+    translation: TranslationConfig = field(default_factory=lambda: TranslationConfig(source_language="en"))
+    max_in_flight: int = 256        # 同時に処理中にできる要求数の上限（超えた分は "dropped"）
+    max_retries: int = 0            # 失敗時の再試行回数
+    retry_backoff: float = 0.2      # 再試行の初回待ち時間（秒，回ごとに2倍）
+    poisson: bool = True            # 到着間隔を指数分布にする（False なら等間隔）
+    seed: int = 0
+
+
+@dataclass
+class LoadTestResult:
+    """負荷試験の結果"""
+    sent: int
+    succeeded: int
+    elapsed: float
+    latency: Dict[str, float]
+    errors: Dict[str, int]
+    retries: int
+
+    @property
+    def throughput(self) -> float:
+        """達成スループット（成功件数/秒）"""
+        return self.succeeded / self.elapsed if self.elapsed > 0 else 0.0
+
+    def format(self, target_rate: float) -> str:
+        lines = [
+            f"目標レート: {target_rate:.1f} req/s  送信: {self.sent}  成功: {self.succeeded}  再試行: {self.retries}",
+            f"達成スループット: {self.throughput:.1f} req/s（{self.elapsed:.1f} 秒）",
+            "レイテンシ(ms): " + "  ".join(
+                f"{key}={self.latency[key] * 1000:.1f}" for key in ("p50", "p95", "p99", "max")
+            ),
+        ]
+        if self.errors:
+            lines.append("エラー: " + "  ".join(f"{kind}={count}" for kind, count in sorted(self.errors.items())))
+        return "\n".join(lines)
+
+
+def classify_error(error: BaseException) -> str:
+    """
+    翻訳失敗の種類を分類する
+
+    TranslationError の原因（__cause__）を見て，HTTP ステータス・タイムアウト・接続エラーなどに分けます．
+    """
+    cause = error.__cause__ or error
+    match = _STATUS_PATTERN.search(str(cause))
+    if match:
+        return f"http_{match.group(1)}"
+    try:
+        import httpx
+        if isinstance(cause, httpx.TimeoutException):
+            return "timeout"
+        if isinstance(cause, httpx.TransportError):
+            return "connection"
+    except ImportError:
+        pass
+    return type(cause).__name__
+
+
+class LoadGenerator:
+    """
+    開ループ（応答を待たずに一定レートで要求を発行する）の負荷生成器
+
+    レイテンシは要求を発行する予定だった時刻から計測するため，
+    サーバーやクライアントが詰まったときの待ち時間も含まれます．
+    翻訳エンジンのインスタンスは検出言語などの状態を持つので，要求ごとに作成します．
+    """
+
+    def __init__(self, config: LoadTestConfig):
+        self.config = config
+        self._factory = TranslatorFactory(config.engine_type)
+        self._histogram = LatencyHistogram()
+        self._errors: Dict[str, int] = {}
+        self._succeeded = 0
+        self._retries = 0
+
+    async def _one_request(self, text: str, scheduled_at: float) -> None:
+        backoff = self.config.retry_backoff
+        for attempt in range(self.config.max_retries + 1):
+            translator = self._factory.create(self.config.translation)
+            try:
+                await translator.translate(text)
+                self._succeeded += 1
+                self._histogram.record(time.perf_counter() - scheduled_at)
+                return
+            except TranslationError as e:
+                if attempt == self.config.max_retries:
+                    kind = classify_error(e)
+                    self._errors[kind] = self._errors.get(kind, 0) + 1
+                    return
+                self._retries += 1
+                await asyncio.sleep(backoff)
+                backoff *= 2
+
+    async def run(self) -> LoadTestResult:
+        """負荷試験を実行する"""
+        rng = random.Random(self.config.seed)
+        interval = 1.0 / self.config.rate
+        semaphore = asyncio.Semaphore(self.config.max_in_flight)
+        tasks: List[asyncio.Task] = []
+        sent = 0
+
+        async def guarded(text: str, scheduled_at: float):
+            try:
+                await self._one_request(text, scheduled_at)
+            finally:
+                semaphore.release()
+
+        started = time.perf_counter()
+        next_at = started
+        while next_at - started < self.config.duration:
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            sent += 1
+            if semaphore.locked():
+                self._errors["dropped"] = self._errors.get("dropped", 0) + 1
+            else:
+                await semaphore.acquire()
+                tasks.append(asyncio.create_task(guarded(rng.choice(LOAD_TEXTS), next_at)))
+            next_at += rng.expovariate(self.config.rate) if self.config.poisson else interval
+
+        await asyncio.gather(*tasks)
+        return LoadTestResult(
+            sent=sent,
+            succeeded=self._succeeded,
+            elapsed=time.perf_counter() - started,
+            latency=self._histogram.summary(),
+            errors=dict(self._errors),
+            retries=self._retries,
+        )
+
+
+def run_load_test(config: LoadTestConfig, server_config: Optional[MockServerConfig] = None) -> LoadTestResult:
+    """
+    モック翻訳サーバーを起動して負荷試験を実行する
+
+    Args:
+        config (LoadTestConfig): 負荷試験の設定（service_endpoint はモックサーバーで上書きされる）
+        server_config (Optional[MockServerConfig]): モックサーバーの挙動
+
+    Returns:
+        LoadTestResult: 結果
+    """
+    with MockTranslateServer(server_config) as server:
+        config.translation.service_endpoint = server.url
+        return asyncio.run(LoadGenerator(config).run())
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="翻訳エンジンの負荷試験")
+    parser.add_argument("--rate", type=float, default=20.0, help="目標要求数/秒")
+    parser.add_argument("--duration", type=float, default=10.0, help="要求を発行する秒数")
+    parser.add_argument("--engine", default="Google", choices=TranslatorFactory.get_available_engines())
+    parser.add_argument("--source-language", default="en", help="auto にすると言語検出も含めて計測")
+    parser.add_argument("--max-in-flight", type=int, default=256)
+    parser.add_argument("--retries", type=int, default=0)
+    parser.add_argument("--latency", default="lognormal", choices=("constant", "uniform", "lognormal"))
+    parser.add_argument("--latency-median-ms", type=float, default=80.0)
+    parser.add_argument("--latency-sigma", type=float, default=0.5)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=None, help="この要求数/秒を超えると 429")
+    parser.add_argument("--throttle-burst", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    server_config = MockServerConfig(
+        latency=LatencyDistribution(args.latency, median_ms=args.latency_median_ms, sigma=args.latency_sigma),
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        throttle_burst=args.throttle_burst,
+        seed=args.seed,
+    )
+    config = LoadTestConfig(
+        rate=args.rate,
+        duration=args.duration,
+        engine_type=args.engine,
+        translation=TranslationConfig(source_language=args.source_language),
+        max_in_flight=args.max_in_flight,
+        max_retries=args.retries,
+        seed=args.seed,
+    )
+    print(run_load_test(config, server_config).format(args.rate))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,30 +1,81 @@
+from models.utils.startup_timer import get_startup_timer
+
 import sys
 import logging
+import logging.handlers
+import queue
 from PyQt6.QtWidgets import QApplication, QMessageBox
+from PyQt6.QtCore import QTimer
 
 # プロジェクトのモジュールをインポート
+from models.daemon.client import RemoteModelFacade, connect_to_daemon
+from models.daemon.protocol import daemon_client_enabled
 from models.model_facade import ModelFacade
 from presenter.main_presenter import MainPresenter
 from view.main_view import MainView
+from view.hotkey_service import HotkeyService
+from models.utils.app_dirs import get_user_cache_dir
+from models.utils.memory_profiler import enable_memory_profiling, memory_profiling_requested
+from models.utils.metrics import MetricsExporter, get_metrics_registry
+from models.utils.tracing import current_trace_id, get_trace_recorder
+
+
+# メトリクスを書き出す間隔（秒）
+METRICS_EXPORT_INTERVAL = 10.0
+
+
+class TraceIdFilter(logging.Filter):
+    """ログレコードに現在のトレースIDを付与するフィルタ（ログを出したスレッド上で評価される）"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.trace_id = current_trace_id() or "-"
+        return True
+
+
+def setup_logging() -> logging.handlers.QueueListener:
+    """
+    ログ設定を初期化
+
+    各スレッドはキューに積むだけにし，ファイル・標準出力への書き込みは
+    QueueListener のスレッドで行うことで，キャプチャ処理が I/O で待たないようにする。
 
+    Returns:
+        logging.handlers.QueueListener: 終了時に stop() するリスナー
+    """
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - [%(trace_id)s] %(message)s')
+    handlers = [
+        logging.FileHandler('ocr_translator.log'),
+        logging.StreamHandler(sys.stdout)
+    ]
+    for handler in handlers:
+        handler.setFormatter(formatter)
 
-def setup_logging():
-    """ログ設定を初期化"""
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler('ocr_translator.log'),
-            logging.StreamHandler(sys.stdout)
-        ]
-    )
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(TraceIdFilter())
+    # 整形はリスナー側のハンドラで行うので，キューにはメッセージ本文だけを積む
+    queue_handler.setFormatter(logging.Formatter('%(message)s'))
+    logging.basicConfig(level=logging.INFO, handlers=[queue_handler])
+
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return listener
 
 
 def main():
     """メインアプリケーション"""
     # ログ設定
-    setup_logging()
+    log_listener = setup_logging()
     logger = logging.getLogger(__name__)
+    startup_timer = get_startup_timer()
+    startup_timer.mark("import/ログ設定")
+
+    # OCRTRANSLATOR_MEMPROFILE=1 のとき，ステージごとのメモリ増減と定期スナップショットを記録する
+    memory_profiler = None
+    if memory_profiling_requested():
+        memory_dir = get_user_cache_dir() / "memory"
+        memory_profiler = enable_memory_profiling(memory_dir)
+        logger.info(f"メモリプロファイリングを有効化しました（出力先: {memory_dir}）")
 
     try:
         # PyQt6アプリケーション作成
@@ -34,26 +85,70 @@ def main():
         # PyQt6では自動的に高DPIスケーリングが有効になります
         app.setApplicationName("OCR Translator")
         app.setApplicationVersion("1.0.0")
+        startup_timer.mark("QApplication作成")
 
         logger.info("OCR Translator アプリケーションを開始しています...")
 
         # MVPアーキテクチャの初期化
-        model = ModelFacade()
+        # （ModelFacade は重い処理を行わず，エンジンの準備はウォームアップで行う）
+        # OCR/翻訳デーモンが起動していれば，温まったエンジンと履歴を共有するシンクライアントとして動作する
+        daemon_client = connect_to_daemon() if daemon_client_enabled() else None
+        if daemon_client:
+            logger.info(f"OCR/翻訳デーモンに接続しました: {daemon_client.socket_path}")
+            model = RemoteModelFacade(daemon_client)
+        else:
+            model = ModelFacade()
         view = MainView()
         presenter = MainPresenter(model, view)
 
         # ビューにプレゼンターを設定
         view.set_presenter(presenter)
 
+        # グローバルホットキー（押下時に OCR/翻訳の準備を投機的に開始する）
+        hotkey_service = HotkeyService(on_key_down=presenter.prewarm)
+        view.set_hotkey_service(hotkey_service)
+
         # メインウィンドウを表示
         view.show()
+        startup_timer.mark("ウィンドウ表示")
+
+        def on_first_event_loop():
+            # イベントループが回り始めた時点でウィンドウは描画可能になっている
+            startup_timer.mark("イベントループ開始")
+            # OCRエンジン探索・tessdata設定・翻訳モジュール読み込みはバックグラウンドで行う
+            def on_warm_up_finished():
+                logger.info(startup_timer.report())
+                # 別スレッドから呼ばれるので，履歴一覧の読み込みはシグナルで GUI スレッドに渡す
+                view.warm_up_finished.emit()
+
+            model.start_warm_up(on_finished=on_warm_up_finished)
+            if hotkey_service.start():
+                logger.info(f"グローバルホットキーを登録しました: {hotkey_service.hotkeys}")
+
+        QTimer.singleShot(0, on_first_event_loop)
 
         logger.info("アプリケーションが正常に起動しました")
 
+        # メトリクスを定期的に JSON / Prometheus テキスト形式で書き出す
+        metrics_dir = get_user_cache_dir() / "metrics"
+        metrics_exporter = MetricsExporter(get_metrics_registry(), metrics_dir, interval=METRICS_EXPORT_INTERVAL)
+        metrics_exporter.start()
+        logger.info(f"メトリクスの出力先: {metrics_dir}")
+
         # イベントループ開始
         exit_code = app.exec()
+        model.shutdown()
+        if memory_profiler:
+            memory_profiler.stop()
+        metrics_exporter.stop()
+
+        # キャプチャごとのスパンを Chrome Trace 形式で保存する（chrome://tracing / Perfetto で表示）
+        trace_path = get_user_cache_dir() / "traces" / "trace.json"
+        get_trace_recorder().flush(trace_path)
+        logger.info(f"トレースを保存しました: {trace_path}")
 
         logger.info(f"アプリケーションが終了しました (終了コード: {exit_code})")
+        log_listener.stop()
         return exit_code
 
     except Exception as e:
@@ -71,6 +166,7 @@ def main():
         except Exception as dialog_error:
             print(f"エラーダイアログの表示にも失敗しました: {dialog_error}")
 
+        log_listener.stop()
         return 1
 
 
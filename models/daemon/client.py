@@ -0,0 +1,305 @@
+"""
+OCR/翻訳デーモンのクライアント
+
+    python -m models.daemon.client screenshot.png   # 画像ファイルをデーモンで OCR・翻訳する
+"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+import argparse
+import asyncio
+import logging
+import socket
+import sys
+import threading
+
+from models.daemon.protocol import (
+    MessageType, ProtocolError, default_socket_path, image_meta, image_payload, recv_frame, send_frame,
+    unix_sockets_supported,
+)
+from models.history.history import HistoryEntry
+from models.ocr.latency_budget import BudgetReport, default_latency_budget_ms
+from models.translator.translator import TranslationConfig
+from models.utils.capture_image import RectangleCoordinates, ScreenSnapshot, capture_screen_snapshot, capture_with_mss
+from models.utils.instrumentation import stage
+from models.utils.metrics import MetricsRegistry, get_metrics_registry
+from models.utils.tracing import current_trace_id
+
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# デーモンの有無を確かめるときの接続タイムアウト（秒）
+PROBE_TIMEOUT = 0.2
+
+
+class DaemonError(Exception):
+    """デーモン側で処理に失敗した"""
+
+
+class DaemonClient:
+    """
+    デーモンへの接続（1本の接続を使い回す）
+
+    要求と応答は1対1なので，複数スレッドから呼ばれた場合はロックで順番に送ります．
+    接続が切れていた場合は次の要求で1回だけ再接続します．
+    要求を送り終えた後の失敗（応答のタイムアウトなど）では，デーモンが処理中の可能性があるため再送しません．
+    """
+
+    def __init__(self, socket_path: Optional[str] = None, timeout: Optional[float] = None):
+        self.socket_path = socket_path or default_socket_path()
+        self.timeout = timeout
+        self._sock: Optional[socket.socket] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> socket.socket:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        return sock
+
+    def request(self, message_type: MessageType, meta: Optional[Dict[str, Any]] = None,
+                payload: Optional[memoryview] = None) -> Dict[str, Any]:
+        """
+        要求を送り，応答のメタデータを返す
+
+        Raises:
+            DaemonError: デーモンがエラーを返した場合
+            OSError: 接続できない場合，または応答を受け取れなかった場合（socket.timeout を含む）
+            EOFError, ProtocolError: 応答の前に接続が切れた，または応答の形式が不正な場合
+        """
+        meta = dict(meta or {})
+        meta.setdefault("trace_id", current_trace_id())
+        with self._lock:
+            # 再送するのは要求を書き終える前に失敗した場合だけ（デーモンが処理を始めた要求は二重に送らない）
+            for attempt in range(2):
+                try:
+                    if self._sock is not None and self._peer_closed_locked():
+                        self._close_locked()
+                    if self._sock is None:
+                        self._sock = self._connect()
+                    send_frame(self._sock, message_type, meta, payload)
+                except socket.timeout:
+                    self._close_locked()
+                    raise
+                except OSError:
+                    self._close_locked()
+                    if attempt:
+                        raise
+                    continue
+                try:
+                    response_type, response, _ = recv_frame(self._sock)
+                except (OSError, EOFError, ProtocolError):
+                    self._close_locked()
+                    raise
+                break
+        if response_type == MessageType.ERROR:
+            raise DaemonError(f"{response.get('type')}: {response.get('error')}")
+        return response
+
+    def set_timeout(self, timeout: Optional[float]) -> None:
+        """以降の送受信のタイムアウト（秒，None で無制限）を設定する"""
+        with self._lock:
+            self.timeout = timeout
+            if self._sock is not None:
+                self._sock.settimeout(timeout)
+
+    def _peer_closed_locked(self) -> bool:
+        # 再利用する接続をデーモンが閉じていないかを，ブロックせずに確かめる
+        try:
+            return self._sock.recv(1, socket.MSG_PEEK | socket.MSG_DONTWAIT) == b""
+        except (BlockingIOError, InterruptedError):
+            return False
+        except OSError:
+            return True
+
+    def _close_locked(self) -> None:
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            finally:
+                self._sock = None
+
+    def close(self) -> None:
+        """接続を閉じる"""
+        with self._lock:
+            self._close_locked()
+
+    def ping(self) -> Dict[str, Any]:
+        return self.request(MessageType.PING)
+
+    def translate_image(self, image: np.ndarray, rect: Optional[RectangleCoordinates] = None,
+                        config: Optional[TranslationConfig] = None, latency_budget_ms: Optional[float] = None,
+                        report_sink: Optional[Callable[[BudgetReport], None]] = None) -> Tuple[str, str, str]:
+        """
+        画像をデーモンに送って OCR・翻訳する
+
+        Args:
+            latency_budget_ms (Optional[float]): レイテンシ予算（ミリ秒）。None ならデーモン側の既定値
+            report_sink (Optional[Callable[[BudgetReport], None]]): 応答に載った予算に対する結果を受け取る関数
+
+        Returns:
+            Tuple[str, str, str]: (翻訳済みテキスト, 抽出された元テキスト, 検出されたソース言語)
+        """
+        meta = image_meta(image)
+        meta.update(_request_meta(rect, config or TranslationConfig(), latency_budget_ms))
+        response = self.request(MessageType.TRANSLATE_IMAGE, meta, image_payload(image))
+        return _translation_result(response, report_sink)
+
+    def translate_region(self, rect: RectangleCoordinates, config: Optional[TranslationConfig] = None,
+                         latency_budget_ms: Optional[float] = None,
+                         report_sink: Optional[Callable[[BudgetReport], None]] = None) -> Tuple[str, str, str]:
+        """デーモン側で画面の指定領域をキャプチャして OCR・翻訳する"""
+        response = self.request(MessageType.TRANSLATE_REGION,
+                                _request_meta(rect, config or TranslationConfig(), latency_budget_ms))
+        return _translation_result(response, report_sink)
+
+    def search_history(self, query: str, limit: int = 50) -> List[HistoryEntry]:
+        response = self.request(MessageType.SEARCH_HISTORY, {"query": query, "limit": limit})
+        return [HistoryEntry(**entry) for entry in response["entries"]]
+
+    def stats(self) -> Dict[str, Any]:
+        """デーモンのメトリクス（MetricsRegistry.snapshot() の形式）"""
+        return self.request(MessageType.STATS)
+
+
+def _request_meta(rect: Optional[RectangleCoordinates], config: TranslationConfig,
+                  latency_budget_ms: Optional[float] = None) -> Dict[str, Any]:
+    meta = {
+        "rect": [rect.x, rect.y, rect.width, rect.height] if rect else None,
+        "source_language": config.source_language,
+        "target_language": config.target_language,
+    }
+    if latency_budget_ms is not None:
+        meta["latency_budget_ms"] = latency_budget_ms
+    return meta
+
+
+def _translation_result(response: Dict[str, Any],
+                        report_sink: Optional[Callable[[BudgetReport], None]]) -> Tuple[str, str, str]:
+    if report_sink and response.get("budget_report"):
+        report_sink(BudgetReport(**response["budget_report"]))
+    return response["translated_text"], response["original_text"], response["source_language"]
+
+
+def connect_to_daemon(socket_path: Optional[str] = None) -> Optional[DaemonClient]:
+    """
+    デーモンが起動していれば接続したクライアントを返す
+
+    Returns:
+        Optional[DaemonClient]: 起動していない・Unix ドメインソケットが使えない場合は None
+    """
+    if not unix_sockets_supported():
+        return None
+    client = DaemonClient(socket_path, timeout=PROBE_TIMEOUT)
+    try:
+        client.ping()
+    except (OSError, EOFError, DaemonError):
+        client.close()
+        return None
+    client.set_timeout(None)
+    return client
+
+
+class RemoteModelFacade:
+    """
+    デーモンに処理を任せる ModelFacade の代わり（シンクライアント）
+
+    画面のキャプチャはこのプロセスで行い，画素をデーモンに送って OCR・翻訳します．
+    OCRエンジン・キャッシュ・履歴はデーモン側で共有されます．
+    """
+
+    def __init__(self, client: DaemonClient):
+        self._client = client
+
+    def prewarm(self) -> None:
+        """デーモン側のエンジンは温まっているので何もしません。"""
+
+    def start_warm_up(self, on_finished: Optional[Callable[[], None]] = None) -> threading.Thread:
+        """
+        ModelFacade と同じ呼び出し方に合わせるためのもので，接続確認だけを行います。
+
+        Returns:
+            threading.Thread: 接続確認を行うスレッド。
+        """
+        def run():
+            try:
+                self._client.ping()
+            except Exception as e:
+                logger.warning(f"RemoteModelFacade: デーモンに接続できません: {e}")
+            if on_finished:
+                on_finished()
+
+        thread = threading.Thread(target=run, name="RemoteWarmUp", daemon=True)
+        thread.start()
+        return thread
+
+    def get_metrics(self) -> MetricsRegistry:
+        """このプロセスのメトリクス（キャプチャとデーモンへの往復時間）を取得します。"""
+        return get_metrics_registry()
+
+    def capture_screen_snapshot(self) -> ScreenSnapshot:
+        return capture_screen_snapshot()
+
+    async def translate_image_from_screen(
+        self,
+        rect: RectangleCoordinates,
+        translation_config: Optional[TranslationConfig] = None,
+        image: Optional["np.ndarray"] = None,
+        latency_budget_ms: Optional[float] = None,
+        report_sink: Optional[Callable[[BudgetReport], None]] = None,
+    ) -> tuple[str, str, str]:
+        """
+        画面の指定領域をキャプチャし，デーモンで OCR・翻訳します。
+
+        latency_budget_ms を省略した場合はこのプロセスの OCRTRANSLATOR_LATENCY_BUDGET_MS を送り，
+        予算に対する結果はデーモンの応答から report_sink に渡します。
+
+        Returns:
+            tuple[str, str, str]: (翻訳済みテキスト, 抽出された元テキスト, 検出されたソース言語)
+        """
+        with stage("end_to_end"):
+            if image is None:
+                image = capture_with_mss(rect)
+            # ソケットの送受信はブロックするので，イベントループを止めないよう別スレッドで行う
+            with stage("daemon_roundtrip"):
+                if latency_budget_ms is None:
+                    latency_budget_ms = default_latency_budget_ms()
+                return await asyncio.to_thread(self._client.translate_image, image, rect, translation_config,
+                                               latency_budget_ms, report_sink)
+
+    def search_history(self, query: str, limit: int = 50) -> List[HistoryEntry]:
+        return self._client.search_history(query, limit)
+
+    def shutdown(self) -> None:
+        self._client.close()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="デーモンで画像ファイルを OCR・翻訳する")
+    parser.add_argument("images", nargs="+", help="画像ファイル")
+    parser.add_argument("--socket", default=None)
+    parser.add_argument("--target-language", default="ja")
+    args = parser.parse_args(argv)
+
+    import cv2
+
+    client = connect_to_daemon(args.socket)
+    if client is None:
+        print("デーモンが起動していません（python -m models.daemon.server で起動できます）", file=sys.stderr)
+        return 1
+    config = TranslationConfig(target_language=args.target_language)
+    for path in args.images:
+        image = cv2.imread(path, cv2.IMREAD_COLOR)
+        if image is None:
+            print(f"{path}: 画像を読み込めません", file=sys.stderr)
+            continue
+        translated, original, source = client.translate_image(image, config=config)
+        print(f"--- {path} ({source})\n{original}\n=>\n{translated}")
+    client.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,221 @@
+"""
+OCR/翻訳デーモンの通信プロトコル
+
+1つのフレームは固定長ヘッダー・JSON のメタデータ・生のペイロードからなります．
+
+    magic(4) "OCRT" | version(1) | type(1) | meta_length(uint32) | payload_length(uint64)
+    meta (UTF-8 JSON, meta_length バイト)
+    payload (payload_length バイト。画像の場合は ndarray の画素をそのまま送る)
+
+画素はエンコードせずに送るため，送信側・受信側ともにコピーや圧縮の処理が要りません．
+受信側は payload を任意のバッファ（バッファプールの配列など）へ直接読み込めます．
+"""
+from __future__ import annotations
+
+from enum import IntEnum
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional, Tuple, Union
+import json
+import os
+import socket
+import struct
+
+from models.utils.app_dirs import get_user_cache_dir
+
+if TYPE_CHECKING:
+    import numpy as np
+
+MAGIC = b"OCRT"
+PROTOCOL_VERSION = 1
+HEADER = struct.Struct("!4sBBIQ")
+
+# 不正なフレームで巨大な確保をしないための上限
+MAX_META_BYTES = 1 * 1024 * 1024
+MAX_PAYLOAD_BYTES = 512 * 1024 * 1024
+
+# 画像として受け取る dtype の種類（bool・符号付き／なし整数・浮動小数点）
+IMAGE_DTYPE_KINDS = "biuf"
+
+# ソケットの場所を上書きする環境変数と，GUI がデーモンを使うかどうかの環境変数（"0" で使わない）
+DAEMON_SOCKET_ENV = "OCRTRANSLATOR_DAEMON_SOCKET"
+DAEMON_ENABLE_ENV = "OCRTRANSLATOR_DAEMON"
+SOCKET_FILE = "ocrtranslator.sock"
+
+
+class MessageType(IntEnum):
+    """フレームの種類"""
+    PING = 1
+    TRANSLATE_IMAGE = 2    # payload: 画素，meta: 形状・dtype・範囲・翻訳設定
+    TRANSLATE_REGION = 3   # デーモン側で画面をキャプチャする（同じディスプレイ上で動いている場合）
+    SEARCH_HISTORY = 4
+    STATS = 5
+    OK = 0x81
+    ERROR = 0x82
+
+
+class ProtocolError(Exception):
+    """フレームの形式が不正，または接続が途中で切れた"""
+
+
+def default_socket_path() -> str:
+    """
+    デーモンのソケットのパス
+
+    OCRTRANSLATOR_DAEMON_SOCKET，$XDG_RUNTIME_DIR，キャッシュディレクトリの順に決めます．
+    """
+    override = os.environ.get(DAEMON_SOCKET_ENV)
+    if override:
+        return override
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir and os.path.isdir(runtime_dir):
+        return os.path.join(runtime_dir, SOCKET_FILE)
+    return str(get_user_cache_dir() / SOCKET_FILE)
+
+
+def daemon_client_enabled() -> bool:
+    """デーモンが起動していればシンクライアントとして動作するか"""
+    return os.environ.get(DAEMON_ENABLE_ENV, "1") != "0"
+
+
+def unix_sockets_supported() -> bool:
+    """この環境で Unix ドメインソケットが使えるか"""
+    return hasattr(socket, "AF_UNIX")
+
+
+def send_frame(sock: socket.socket, message_type: MessageType, meta: Optional[Dict[str, Any]] = None,
+               payload: Union[bytes, memoryview, None] = None) -> None:
+    """
+    フレームを1つ送る
+
+    Args:
+        sock (socket.socket): 接続済みソケット
+        message_type (MessageType): 種類
+        meta (Optional[Dict[str, Any]]): JSON にできるメタデータ
+        payload (Union[bytes, memoryview, None]): 生のペイロード（コピーせずに送る）
+    """
+    meta_bytes = json.dumps(meta or {}, ensure_ascii=False).encode("utf-8")
+    payload_view = memoryview(payload).cast("B") if payload is not None else memoryview(b"")
+    sock.sendall(HEADER.pack(MAGIC, PROTOCOL_VERSION, int(message_type), len(meta_bytes), payload_view.nbytes)
+                 + meta_bytes)
+    if payload_view.nbytes:
+        sock.sendall(payload_view)
+
+
+def _recv_exactly(sock: socket.socket, view: memoryview) -> None:
+    received = 0
+    while received < view.nbytes:
+        count = sock.recv_into(view[received:])
+        if count == 0:
+            raise ProtocolError("接続が途中で切断されました")
+        received += count
+
+
+def recv_frame(sock: socket.socket,
+               allocate: Optional[Callable[[MessageType, Dict[str, Any], int], Any]] = None
+               ) -> Tuple[MessageType, Dict[str, Any], Any]:
+    """
+    フレームを1つ受け取る
+
+    Args:
+        sock (socket.socket): 接続済みソケット
+        allocate: ペイロードの受け取り先を返す関数 (種類, メタデータ, バイト数) -> 書き込み可能なバッファ。
+            省略時は bytearray を確保する
+
+    Returns:
+        Tuple[MessageType, Dict[str, Any], Any]: (種類, メタデータ, ペイロードのバッファ)
+
+    Raises:
+        ProtocolError: 形式が不正な場合
+        EOFError: フレームの先頭で接続が閉じられた場合
+    """
+    header = bytearray(HEADER.size)
+    view = memoryview(header)
+    first = sock.recv_into(view)
+    if first == 0:
+        raise EOFError
+    _recv_exactly(sock, view[first:])
+    magic, version, type_code, meta_length, payload_length = HEADER.unpack(header)
+    if magic != MAGIC or version != PROTOCOL_VERSION:
+        raise ProtocolError(f"対応していないフレームです (magic={magic!r}, version={version})")
+    if meta_length > MAX_META_BYTES or payload_length > MAX_PAYLOAD_BYTES:
+        raise ProtocolError(f"フレームが大きすぎます (meta={meta_length}, payload={payload_length})")
+    try:
+        message_type = MessageType(type_code)
+    except ValueError:
+        raise ProtocolError(f"不明なフレームの種類です: {type_code}")
+
+    meta_bytes = bytearray(meta_length)
+    _recv_exactly(sock, memoryview(meta_bytes))
+    try:
+        meta = json.loads(meta_bytes.decode("utf-8")) if meta_length else {}
+    except ValueError as e:
+        raise ProtocolError(f"メタデータが JSON ではありません: {e}")
+    if not isinstance(meta, dict):
+        raise ProtocolError("メタデータが JSON のオブジェクトではありません")
+
+    buffer = allocate(message_type, meta, payload_length) if allocate else bytearray(payload_length)
+    if payload_length:
+        target = memoryview(buffer).cast("B")
+        if target.nbytes != payload_length:
+            raise ProtocolError("ペイロードの大きさがメタデータと一致しません")
+        _recv_exactly(sock, target)
+    return message_type, meta, buffer
+
+
+def image_meta(image: np.ndarray) -> Dict[str, Any]:
+    """画像を送るときのメタデータ（形状と dtype）"""
+    return {"shape": list(image.shape), "dtype": image.dtype.str}
+
+
+def image_payload(image: np.ndarray) -> memoryview:
+    """画像の画素をコピーせずに送るためのビュー（連続していない場合のみコピーする）"""
+    import numpy as np
+
+    return memoryview(np.ascontiguousarray(image)).cast("B")
+
+
+def validate_image_meta(meta: Dict[str, Any]) -> None:
+    """
+    画像のメタデータを確かめる
+
+    shape は 2〜3 個の 0 以上の整数のリスト，dtype は数値型（bool・整数・浮動小数点）の文字列でなければなりません．
+
+    Raises:
+        ProtocolError: 形式が不正な場合
+    """
+    import numpy as np
+
+    shape = meta.get("shape")
+    if not isinstance(shape, list) or not 2 <= len(shape) <= 3 \
+            or not all(type(dim) is int and dim >= 0 for dim in shape):
+        raise ProtocolError(f"画像の形状が不正です: {shape!r}")
+    dtype = meta.get("dtype")
+    if not isinstance(dtype, str):
+        raise ProtocolError(f"画像の dtype が不正です: {dtype!r}")
+    try:
+        kind = np.dtype(dtype).kind
+    except TypeError:
+        raise ProtocolError(f"画像の dtype が不正です: {dtype!r}")
+    if kind not in IMAGE_DTYPE_KINDS:
+        raise ProtocolError(f"画像の dtype が数値型ではありません: {dtype!r}")
+
+
+def image_nbytes(meta: Dict[str, Any]) -> int:
+    """メタデータから画像のバイト数を求める（validate_image_meta で確かめたメタデータ用）"""
+    import numpy as np
+
+    count = 1
+    for dim in meta["shape"]:
+        count *= int(dim)
+    return count * np.dtype(meta["dtype"]).itemsize
+
+
+def decode_image(meta: Dict[str, Any], payload: Any) -> np.ndarray:
+    """受け取ったペイロードを ndarray として見る（ndarray ならそのまま返す）"""
+    import numpy as np
+
+    if isinstance(payload, np.ndarray):
+        return payload
+    validate_image_meta(meta)
+    if len(payload) != image_nbytes(meta):
+        raise ProtocolError("画像の大きさがメタデータと一致しません")
+    return np.frombuffer(payload, dtype=np.dtype(meta["dtype"])).reshape(meta["shape"])
@@ -0,0 +1,212 @@
+"""
+OCR/翻訳デーモン
+
+1つのプロセスで ModelFacade（OCRエンジン・バッファプール・履歴など）を温めたまま保持し，
+Unix ドメインソケット経由で複数のクライアント（GUI・CLI）から共有します．
+
+    python -m models.daemon.server
+"""
+from dataclasses import asdict
+from typing import Any, Dict, List, Optional
+import argparse
+import asyncio
+import logging
+import os
+import socket
+import socketserver
+import sys
+import threading
+
+from models.daemon.protocol import (
+    MessageType, ProtocolError, decode_image, default_socket_path, image_nbytes, recv_frame, send_frame,
+    unix_sockets_supported, validate_image_meta,
+)
+from models.model_facade import ModelFacade
+from models.ocr.latency_budget import BudgetReport
+from models.translator.translator import TranslationConfig
+from models.utils.buffer_pool import get_default_pool
+from models.utils.capture_image import RectangleCoordinates
+from models.utils.tracing import use_trace
+
+logger = logging.getLogger(__name__)
+
+
+def _translation_config(meta: Dict[str, Any]) -> TranslationConfig:
+    return TranslationConfig(
+        source_language=meta.get("source_language", "auto"),
+        target_language=meta.get("target_language", "ja"),
+    )
+
+
+def _latency_budget_ms(meta: Dict[str, Any]) -> Optional[float]:
+    value = meta.get("latency_budget_ms")
+    if value is None:
+        return None
+    if type(value) not in (int, float) or value <= 0:
+        raise ProtocolError(f"レイテンシ予算が不正です: {value!r}")
+    return float(value)
+
+
+def _translation_response(result, reports: List[BudgetReport]) -> Dict[str, Any]:
+    translated, original, source = result
+    response = {"translated_text": translated, "original_text": original, "source_language": source}
+    if reports:
+        response["budget_report"] = reports[-1].to_dict()
+    return response
+
+
+def _rect(meta: Dict[str, Any]) -> RectangleCoordinates:
+    x, y, width, height = meta.get("rect") or (0, 0, 0, 0)
+    return RectangleCoordinates(x=x, y=y, width=width, height=height)
+
+
+class _RequestHandler(socketserver.BaseRequestHandler):
+    """1つの接続を処理する（接続ごとにスレッドとイベントループを持つ）"""
+
+    server: "_DaemonServer"
+
+    def handle(self) -> None:
+        loop = asyncio.new_event_loop()
+        try:
+            while True:
+                try:
+                    message_type, meta, payload = recv_frame(self.request, self._allocate)
+                except EOFError:
+                    return
+                except (ProtocolError, OSError) as e:
+                    logger.warning(f"OCRDaemon: 接続を閉じます: {e}")
+                    return
+                try:
+                    with use_trace(meta.get("trace_id")):
+                        response = self._dispatch(loop, message_type, meta, payload)
+                    send_frame(self.request, MessageType.OK, response)
+                except Exception as e:
+                    send_frame(self.request, MessageType.ERROR, {"error": str(e), "type": type(e).__name__})
+                finally:
+                    # 処理の途中で失敗した場合もプールの配列を返却する（返却済みなら何もしない）
+                    get_default_pool().release(payload)
+        finally:
+            loop.close()
+
+    @staticmethod
+    def _allocate(message_type: MessageType, meta: Dict[str, Any], length: int):
+        # 画像はバッファプールの配列へ直接受け取る（ModelFacade が OCR 後に返却する）
+        if message_type != MessageType.TRANSLATE_IMAGE:
+            return bytearray(length)
+        validate_image_meta(meta)
+        if length != image_nbytes(meta):
+            raise ProtocolError(f"画像の大きさがメタデータと一致しません (payload={length}, 期待値={image_nbytes(meta)})")
+        return get_default_pool().acquire(tuple(meta["shape"]), meta["dtype"])
+
+    def _dispatch(self, loop: asyncio.AbstractEventLoop, message_type: MessageType,
+                  meta: Dict[str, Any], payload: Any) -> Dict[str, Any]:
+        model = self.server.model
+        if message_type == MessageType.PING:
+            return {"pid": os.getpid()}
+        if message_type in (MessageType.TRANSLATE_IMAGE, MessageType.TRANSLATE_REGION):
+            # 予算に対する結果はこの要求の応答にだけ載せる
+            image = decode_image(meta, payload) if message_type == MessageType.TRANSLATE_IMAGE else None
+            reports: List[BudgetReport] = []
+            result = loop.run_until_complete(
+                model.translate_image_from_screen(_rect(meta), _translation_config(meta), image=image,
+                                                  latency_budget_ms=_latency_budget_ms(meta),
+                                                  report_sink=reports.append)
+            )
+            return _translation_response(result, reports)
+        if message_type == MessageType.SEARCH_HISTORY:
+            entries = model.search_history(meta.get("query", ""), int(meta.get("limit", 50)))
+            return {"entries": [asdict(entry) for entry in entries]}
+        if message_type == MessageType.STATS:
+            return model.get_metrics().snapshot()
+        raise ProtocolError(f"デーモンが処理できないフレームです: {message_type.name}")
+
+
+class _DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, model: ModelFacade):
+        self.model = model
+        super().__init__(socket_path, _RequestHandler)
+
+
+class OCRDaemon:
+    """
+    ModelFacade を共有する常駐サーバー
+
+    ソケットは所有者のみ読み書きできる権限で作成します．
+    同じパスに応答しない古いソケットが残っていれば削除してから待ち受けます．
+    """
+
+    def __init__(self, socket_path: Optional[str] = None, model: Optional[ModelFacade] = None):
+        if not unix_sockets_supported():
+            raise RuntimeError("この環境では Unix ドメインソケットが使えないため，デーモンを起動できません")
+        self.socket_path = socket_path or default_socket_path()
+        self.model = model or ModelFacade()
+        self._server: Optional[_DaemonServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def _remove_stale_socket(self) -> None:
+        if not os.path.exists(self.socket_path):
+            return
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.socket_path)
+        except OSError:
+            os.unlink(self.socket_path)
+            return
+        finally:
+            probe.close()
+        raise RuntimeError(f"デーモンは既に起動しています: {self.socket_path}")
+
+    def start(self) -> None:
+        """待ち受けを開始し，バックグラウンドでエンジンのウォームアップを始める"""
+        os.makedirs(os.path.dirname(os.path.abspath(self.socket_path)), exist_ok=True)
+        self._remove_stale_socket()
+        old_umask = os.umask(0o177)
+        try:
+            self._server = _DaemonServer(self.socket_path, self.model)
+        finally:
+            os.umask(old_umask)
+        self._thread = threading.Thread(target=self._server.serve_forever, name="OCRDaemon", daemon=True)
+        self._thread.start()
+        self.model.start_warm_up()
+        logger.info(f"OCRDaemon: 待ち受けを開始しました: {self.socket_path}")
+
+    def serve_forever(self) -> None:
+        """停止されるまで待ち受ける（Ctrl+C で停止）"""
+        if self._server is None:
+            self.start()
+        try:
+            self._thread.join()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def stop(self) -> None:
+        """待ち受けを停止し，ソケットと履歴を閉じる"""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+            try:
+                os.unlink(self.socket_path)
+            except FileNotFoundError:
+                pass
+        self.model.shutdown()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="OCR/翻訳デーモン")
+    parser.add_argument("--socket", default=None, help="ソケットのパス（省略時は既定の場所）")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    daemon = OCRDaemon(args.socket)
+    daemon.start()
+    daemon.serve_forever()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
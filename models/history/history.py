@@ -0,0 +1,337 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+import hashlib
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+from models.utils.metrics import get_metrics_registry
+
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+HISTORY_FILE = "history.sqlite3"
+
+# 履歴データベースの上限サイズ（MB）の環境変数と既定値
+HISTORY_MAX_MB_ENV = "OCRTRANSLATOR_HISTORY_MAX_MB"
+DEFAULT_HISTORY_MAX_MB = 64
+
+# 書き込みをまとめる最大待ち時間（秒）
+DEFAULT_BATCH_INTERVAL = 0.5
+# 上限を超えたときに一度に削除する古い履歴の割合
+PRUNE_FRACTION = 0.2
+# trigram トークナイザで全文検索できる最短の検索語（これより短い場合は LIKE で探す）
+FTS_MIN_QUERY_LENGTH = 3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY,
+    created_at REAL NOT NULL,
+    x INTEGER NOT NULL,
+    y INTEGER NOT NULL,
+    width INTEGER NOT NULL,
+    height INTEGER NOT NULL,
+    image_hash TEXT NOT NULL,
+    source_language TEXT NOT NULL,
+    target_language TEXT NOT NULL,
+    ocr_text TEXT NOT NULL,
+    translated_text TEXT NOT NULL,
+    requested_source_language TEXT NOT NULL,
+    ocr_settings TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS history_created_at ON history (created_at);
+CREATE INDEX IF NOT EXISTS history_lookup
+    ON history (image_hash, target_language, requested_source_language, ocr_settings);
+CREATE VIRTUAL TABLE IF NOT EXISTS history_fts USING fts5(
+    ocr_text, translated_text, content='history', content_rowid='id', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS history_ai AFTER INSERT ON history BEGIN
+    INSERT INTO history_fts (rowid, ocr_text, translated_text) VALUES (new.id, new.ocr_text, new.translated_text);
+END;
+CREATE TRIGGER IF NOT EXISTS history_ad AFTER DELETE ON history BEGIN
+    INSERT INTO history_fts (history_fts, rowid, ocr_text, translated_text)
+    VALUES ('delete', old.id, old.ocr_text, old.translated_text);
+END;
+"""
+
+_COLUMNS = ("id, created_at, x, y, width, height, image_hash, source_language, target_language, "
+            "ocr_text, translated_text, requested_source_language, ocr_settings")
+
+
+@dataclass
+class HistoryEntry:
+    """キャプチャ1回分の履歴"""
+    x: int
+    y: int
+    width: int
+    height: int
+    image_hash: str
+    source_language: str
+    target_language: str
+    ocr_text: str
+    translated_text: str
+    # 指定された翻訳元言語（"auto" など。source_language は検出された言語）と，OCR の設定を表す文字列
+    requested_source_language: str = "auto"
+    ocr_settings: str = ""
+    created_at: float = field(default_factory=time.time)
+    id: Optional[int] = None
+
+    @property
+    def lookup_key(self) -> Tuple[str, str, str, str]:
+        """find_exact で同じ結果とみなすキー"""
+        return self.image_hash, self.target_language, self.requested_source_language, self.ocr_settings
+
+    @classmethod
+    def from_row(cls, row: Tuple) -> "HistoryEntry":
+        (id_, created_at, x, y, width, height, image_hash, source_language, target_language,
+         ocr_text, translated_text, requested_source_language, ocr_settings) = row
+        return cls(x=x, y=y, width=width, height=height, image_hash=image_hash,
+                   source_language=source_language, target_language=target_language,
+                   ocr_text=ocr_text, translated_text=translated_text,
+                   requested_source_language=requested_source_language, ocr_settings=ocr_settings,
+                   created_at=created_at, id=id_)
+
+
+def compute_image_hash(image: np.ndarray) -> str:
+    """
+    キャプチャ画像の内容ハッシュ
+
+    縮小画像ではなく元の画素全体から求めるため，1文字だけ違う画面を同じものとみなすことはありません．
+
+    Args:
+        image (np.ndarray): キャプチャ画像
+
+    Returns:
+        str: 画像の形状と画素から求めたハッシュ（16進数）
+    """
+    import numpy as np
+
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr((image.shape, image.dtype.str)).encode())
+    digest.update(np.ascontiguousarray(image).data)
+    return digest.hexdigest()
+
+
+class HistoryStore:
+    """
+    キャプチャ履歴の SQLite ストア（FTS5 による全文検索付き）
+
+    add() はキューに積むだけで，書き込みは専用スレッドが短い間隔でまとめて1トランザクションで行います．
+    まだ書き込まれていない履歴も find_exact() では見つかります．
+    データベースが max_bytes を超えたら古い履歴から削除します．
+    """
+
+    def __init__(self, path: Path, max_bytes: int = DEFAULT_HISTORY_MAX_MB * 1024 * 1024,
+                 batch_interval: float = DEFAULT_BATCH_INTERVAL):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.batch_interval = batch_interval
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        # 読み取り用の接続（UI スレッドとワーカースレッドから使うためロックで保護する）
+        self._read_conn = self._connect()
+        self._read_conn.executescript(_SCHEMA)
+        self._read_lock = threading.Lock()
+
+        # HistoryEntry，flush() の完了通知（threading.Event），終了の合図（None）を積む
+        self._queue: queue.Queue = queue.Queue()
+        self._pending: Dict[Tuple[str, str, str, str], HistoryEntry] = {}
+        self._pending_lock = threading.Lock()
+        self._writer = threading.Thread(target=self._run_writer, name="HistoryWriter", daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        # 新規作成時のみ有効（削除したページを incremental_vacuum でファイルから解放する）
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        # WAL にすると書き込み中でも検索がブロックされない
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def add(self, entry: HistoryEntry) -> None:
+        """
+        履歴を追加する（書き込みはバックグラウンドで行う）
+
+        Args:
+            entry (HistoryEntry): 追加する履歴
+        """
+        with self._pending_lock:
+            self._pending[entry.lookup_key] = entry
+        self._queue.put(entry)
+
+    def find_exact(self, image_hash: str, target_language: str, requested_source_language: str = "auto",
+                   ocr_settings: str = "") -> Optional[HistoryEntry]:
+        """
+        同じ画像・同じ翻訳先言語・同じ翻訳元言語の指定・同じ OCR 設定の最新の履歴を探す
+
+        Args:
+            image_hash (str): compute_image_hash() の値
+            target_language (str): 翻訳先言語
+            requested_source_language (str): 指定された翻訳元言語（"auto" など）
+            ocr_settings (str): OCR エンジン・言語・オプションを表す文字列
+
+        Returns:
+            Optional[HistoryEntry]: 見つからなければ None
+        """
+        key = (image_hash, target_language, requested_source_language, ocr_settings)
+        with self._pending_lock:
+            pending = self._pending.get(key)
+        if pending is not None:
+            return pending
+        with self._read_lock:
+            row = self._read_conn.execute(
+                f"SELECT {_COLUMNS} FROM history WHERE image_hash = ? AND target_language = ? "
+                "AND requested_source_language = ? AND ocr_settings = ? ORDER BY created_at DESC LIMIT 1",
+                key,
+            ).fetchone()
+        return HistoryEntry.from_row(row) if row else None
+
+    def search(self, query: str, limit: int = 50) -> List[HistoryEntry]:
+        """
+        OCR結果・翻訳結果を検索する（新しい順）
+
+        3文字以上は FTS5（trigram）で，それより短い場合は部分一致で検索します．
+        空の検索語では最近の履歴を返します．まだ書き込まれていない履歴も含みます．
+
+        Args:
+            query (str): 検索語
+            limit (int): 最大件数
+
+        Returns:
+            List[HistoryEntry]: 見つかった履歴
+        """
+        query = query.strip()
+        if not query:
+            sql = f"SELECT {_COLUMNS} FROM history ORDER BY created_at DESC LIMIT ?"
+            params: Tuple = (limit,)
+        elif len(query) >= FTS_MIN_QUERY_LENGTH:
+            # 検索語全体を1つのフレーズとして扱う（FTS5 の演算子として解釈させない）
+            phrase = '"' + query.replace('"', '""') + '"'
+            sql = (f"SELECT {_COLUMNS} FROM history WHERE id IN "
+                   "(SELECT rowid FROM history_fts WHERE history_fts MATCH ?) "
+                   "ORDER BY created_at DESC LIMIT ?")
+            params = (phrase, limit)
+        else:
+            pattern = "%" + query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            sql = (f"SELECT {_COLUMNS} FROM history "
+                   "WHERE ocr_text LIKE ? ESCAPE '\\' OR translated_text LIKE ? ESCAPE '\\' "
+                   "ORDER BY created_at DESC LIMIT ?")
+            params = (pattern, pattern, limit)
+        with self._read_lock:
+            rows = self._read_conn.execute(sql, params).fetchall()
+        entries = [HistoryEntry.from_row(row) for row in rows]
+
+        folded = query.casefold()
+        with self._pending_lock:
+            pending = [e for e in self._pending.values()
+                       if folded in e.ocr_text.casefold() or folded in e.translated_text.casefold()]
+        if pending:
+            # 書き込み直後で DB と未書き込みの両方に見える履歴は1件にまとめる
+            stored = {(e.image_hash, e.created_at) for e in entries}
+            entries += [e for e in pending if (e.image_hash, e.created_at) not in stored]
+            entries.sort(key=lambda e: e.created_at, reverse=True)
+            entries = entries[:limit]
+        return entries
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """キューに積まれた履歴がすべて書き込まれるまで待つ"""
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def close(self) -> None:
+        """残りの履歴を書き込んで接続を閉じる"""
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join()
+        with self._read_lock:
+            self._read_conn.close()
+
+    def _run_writer(self) -> None:
+        conn = self._connect()
+        try:
+            while True:
+                item = self._queue.get()
+                batch = [item]
+                # 最初の1件から batch_interval の間に来たものをまとめる
+                deadline = time.monotonic() + self.batch_interval
+                while item is not None and not isinstance(item, threading.Event):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = self._queue.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                    batch.append(item)
+
+                entries = [e for e in batch if isinstance(e, HistoryEntry)]
+                if entries:
+                    try:
+                        self._write_batch(conn, entries)
+                    except sqlite3.Error as e:
+                        logger.warning(f"HistoryStore: 履歴の書き込みに失敗しました: {e}")
+                    finally:
+                        self._forget_pending(entries)
+                for signal in batch:
+                    if isinstance(signal, threading.Event):
+                        signal.set()
+                if None in batch:
+                    return
+        finally:
+            conn.close()
+
+    def _write_batch(self, conn: sqlite3.Connection, entries: List[HistoryEntry]) -> None:
+        with conn:
+            conn.executemany(
+                "INSERT INTO history (created_at, x, y, width, height, image_hash, source_language, "
+                "target_language, ocr_text, translated_text, requested_source_language, ocr_settings) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(e.created_at, e.x, e.y, e.width, e.height, e.image_hash, e.source_language,
+                  e.target_language, e.ocr_text, e.translated_text, e.requested_source_language,
+                  e.ocr_settings) for e in entries],
+            )
+        get_metrics_registry().increment("history_writes", len(entries))
+        self._prune(conn)
+
+    def _forget_pending(self, entries: List[HistoryEntry]) -> None:
+        with self._pending_lock:
+            for entry in entries:
+                key = entry.lookup_key
+                if self._pending.get(key) is entry:
+                    del self._pending[key]
+
+    @staticmethod
+    def _database_size(conn: sqlite3.Connection) -> int:
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+        free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        return (page_count - free_pages) * page_size
+
+    def _prune(self, conn: sqlite3.Connection) -> None:
+        """上限サイズを超えていれば古い履歴から削除する"""
+        if self._database_size(conn) <= self.max_bytes:
+            return
+        total = conn.execute("SELECT COUNT(*) FROM history").fetchone()[0]
+        remove = max(1, int(total * PRUNE_FRACTION))
+        with conn:
+            conn.execute(
+                "DELETE FROM history WHERE id IN (SELECT id FROM history ORDER BY created_at LIMIT ?)",
+                (remove,),
+            )
+        conn.execute("PRAGMA incremental_vacuum")
+        logger.info(f"HistoryStore: 上限サイズを超えたため古い履歴を {remove} 件削除しました")
+
+
+def default_history_max_bytes() -> int:
+    """環境変数 OCRTRANSLATOR_HISTORY_MAX_MB（既定 64MB）から履歴の上限サイズを求める"""
+    return int(float(os.environ.get(HISTORY_MAX_MB_ENV, DEFAULT_HISTORY_MAX_MB)) * 1024 * 1024)
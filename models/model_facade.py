@@ -1,8 +1,38 @@
-from typing import Optional, List
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional, List, Sequence
+import asyncio
+import contextvars
+import logging
+import sqlite3
+import threading
+import time
 
+from models.history.history import HISTORY_FILE, HistoryEntry, HistoryStore, compute_image_hash, default_history_max_bytes
+from models.ocr.latency_budget import (
+    CANDIDATE_SETTINGS, DEFAULT_SETTINGS, TRANSLATION_STAGES, BudgetPlan, BudgetReport, LatencyBudgetPlanner,
+    OCRSettings, create_budget_planner, default_latency_budget_ms,
+)
 from models.ocr.ocr import OCRFactory, IOCR
-from models.translator.translator import TranslatorFactory, ITranslator, TranslationConfig
-from models.utils.capture_image import capture_with_mss, RectangleCoordinates
+from models.ocr.postcorrect import get_post_corrector
+from models.translator.lexicon import has_lexicon
+from models.translator.translator import (
+    TranslatorFactory, ITranslator, TranslationConfig, TranslationError, detect_language, preload_translator_modules,
+    translate_segments,
+)
+from models.utils.app_dirs import get_user_cache_dir
+from models.utils.buffer_pool import get_default_pool
+from models.utils.cpu_budget import get_cpu_budget
+from models.utils.instrumentation import collect_stages, stage
+from models.utils.metrics import get_metrics_registry, MetricsRegistry
+from models.utils.capture_image import capture_regions_with_mss, capture_with_mss, capture_screen_snapshot, get_capture_recorder, stop_capture_recording, RectangleCoordinates, ScreenSnapshot
+from models.utils.startup_timer import get_startup_timer
+
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# オンラインの翻訳エンジンが失敗したときに使う，通信しない翻訳エンジン
+LEXICON_ENGINE = "Lexicon"
 
 
 class ModelFacade:
@@ -12,20 +42,182 @@ class ModelFacade:
     """
 
     def __init__(self):
-        # デフォルトのOCRエンジンと言語を設定
-        self._ocr_engine: IOCR = OCRFactory.create_ocr("tesseract", language="eng")
+        # デフォルトのOCRエンジンと言語を設定（生成は初回利用時またはウォームアップ時に行う）
+        # 文字体系を判定して言語を振り分ける（osd / 各言語の traineddata が無ければ eng のみ）
+        self._ocr_engine_type = "tesseract_auto"
+        self._ocr_language = "eng"
+        # 認識結果を頻度辞書で綴り補正する（dictionaries/<言語>.txt が無い言語では何もしない）
+        self._ocr_engine_options: Dict[str, Any] = {"post_correction": True}
+        self._ocr_engine: Optional[IOCR] = None
+        self._ocr_lock = threading.Lock()
+        self._warm_up_thread: Optional[threading.Thread] = None
+        self._warmed_up = False
+        # キャプチャ履歴（初回利用時に開く。開けなければ履歴なしで動作する）
+        self.history_enabled = True
+        self._history: Optional[HistoryStore] = None
+        self._history_lock = threading.Lock()
+        # レイテンシ予算に合わせた OCR 設定の選択（予算を指定したときだけ使う）
+        self._budget_planner: Optional[LatencyBudgetPlanner] = None
+        self._budget_planner_lock = threading.Lock()
         # デフォルトの翻訳エンジンを指定してFactoryをインスタンス化
         self._translator_factory = TranslatorFactory(engine_type="Google")
 
-    def set_ocr_engine(self, engine_type: str, language: str = "eng"):
+    def set_ocr_engine(self, engine_type: str, language: str = "eng", **engine_options: Any):
         """
         使用するOCRエンジンを切り替えます。
 
         Args:
             engine_type (str): "tesseract" などのエンジンタイプ。
             language (str): OCRの言語。
+            **engine_options: エンジン固有の設定（"tesseract_auto" の latency_preference など）。
+        """
+        engine = OCRFactory.create_ocr(engine_type, language, **engine_options)
+        with self._ocr_lock:
+            self._ocr_engine_type = engine_type
+            self._ocr_language = language
+            self._ocr_engine_options = engine_options
+            self._ocr_engine = engine
+
+    def _get_ocr_engine(self) -> IOCR:
+        """
+        OCRエンジンを取得します。未生成であればここで生成します。
+
+        ウォームアップ中に呼ばれた場合は，ウォームアップ側の生成完了を待ちます。
+        """
+        with self._ocr_lock:
+            if self._ocr_engine is None:
+                self._ocr_engine = OCRFactory.create_ocr(self._ocr_engine_type, language=self._ocr_language,
+                                                         **self._ocr_engine_options)
+            return self._ocr_engine
+
+    def warm_up(self) -> None:
+        """
+        OCRエンジンの探索・tessdata の設定と翻訳モジュールの読み込みを済ませます。
+
+        失敗してもここでは例外を送出せず，実際の処理時に改めてエラーを報告します。
+        起動時間レポートには初回の実行だけを記録します。
+        """
+        timer = get_startup_timer()
+        record_timing = not self._warmed_up
+        steps = [
+            ("numpy/cv2", self._preload_image_modules),
+            ("OCRエンジン", self._preload_ocr_engine),
+            ("翻訳モジュール", preload_translator_modules),
+            ("綴り補正辞書", lambda: get_post_corrector(self._ocr_language)),
+            ("履歴", self._get_history),
+        ]
+        for name, step in steps:
+            try:
+                step()
+                if record_timing:
+                    timer.mark(f"warm_up: {name}")
+            except Exception as e:
+                logger.warning(f"ウォームアップに失敗しました ({name}): {e}")
+        self._warmed_up = True
+
+    def _get_history(self) -> Optional[HistoryStore]:
+        """
+        履歴ストアを取得します。未作成であればここで開きます。
+
+        Returns:
+            Optional[HistoryStore]: 履歴が無効，または開けなかった場合は None。
+        """
+        if not self.history_enabled:
+            return None
+        with self._history_lock:
+            if self._history is None:
+                try:
+                    self._history = HistoryStore(get_user_cache_dir() / HISTORY_FILE,
+                                                 max_bytes=default_history_max_bytes())
+                except (sqlite3.Error, OSError) as e:
+                    logger.warning(f"履歴を開けませんでした，履歴なしで続行します: {e}")
+                    self.history_enabled = False
+            return self._history
+
+    def _ocr_settings_key(self, settings: Optional[OCRSettings] = None) -> str:
         """
-        self._ocr_engine = OCRFactory.create_ocr(engine_type, language)
+        履歴の検索キーにする OCR の設定（エンジン・言語・オプション）
+
+        Args:
+            settings (Optional[OCRSettings]): レイテンシ予算で選んだ設定。既定の設定以外ならその名前もキーに含める
+        """
+        options = ",".join(f"{name}={value}" for name, value in sorted(self._ocr_engine_options.items()))
+        key = f"{self._ocr_engine_type}:{self._ocr_language}:{options}"
+        if settings is not None and settings != DEFAULT_SETTINGS:
+            key += f"|{settings.name}"
+        return key
+
+    def search_history(self, query: str, limit: int = 50) -> List[HistoryEntry]:
+        """
+        キャプチャ履歴をOCR結果・翻訳結果から検索します（新しい順）。
+
+        Args:
+            query (str): 検索語。空なら最近の履歴。
+            limit (int): 最大件数。
+
+        Returns:
+            List[HistoryEntry]: 見つかった履歴。
+        """
+        history = self._get_history()
+        return history.search(query, limit) if history else []
+
+    def shutdown(self) -> None:
+        """未書き込みの履歴を保存して履歴ストアを閉じ，OCR の計測値を保存し，キャプチャの記録を終了します。"""
+        with self._history_lock:
+            if self._history is not None:
+                self._history.close()
+                self._history = None
+        with self._budget_planner_lock:
+            if self._budget_planner is not None:
+                self._budget_planner.model.save()
+        stop_capture_recording()
+
+    def _preload_ocr_engine(self) -> None:
+        """OCRエンジンを生成し，対応していれば既定言語のワーカーを温めます。"""
+        engine = self._get_ocr_engine()
+        if hasattr(engine, "preload"):
+            engine.preload()
+
+    @staticmethod
+    def _preload_image_modules() -> None:
+        """前処理で使う numpy / cv2 を読み込みます。"""
+        import numpy  # noqa: F401
+        import cv2  # noqa: F401
+
+    def start_warm_up(self, on_finished: Optional[Callable[[], None]] = None) -> threading.Thread:
+        """
+        warm_up をバックグラウンドスレッドで開始します。
+
+        Args:
+            on_finished (Optional[Callable[[], None]]): 完了時にワーカースレッド上で呼ばれるコールバック。
+
+        Returns:
+            threading.Thread: ウォームアップを実行するスレッド。既に実行中ならそのスレッド。
+        """
+        if self._warm_up_thread and self._warm_up_thread.is_alive():
+            return self._warm_up_thread
+
+        def run():
+            self.warm_up()
+            if on_finished:
+                on_finished()
+
+        self._warm_up_thread = threading.Thread(target=run, name="ModelWarmUp", daemon=True)
+        self._warm_up_thread.start()
+        return self._warm_up_thread
+
+    def prewarm(self) -> threading.Thread:
+        """
+        キャプチャの直前（ホットキー押下時など）に呼ぶ投機的な事前準備です。
+
+        起動時のウォームアップが済んでいても，長時間使われずにページキャッシュから
+        追い出された traineddata を読み直すため，OCRワーカーをもう一度温めます。
+        範囲選択の操作と並行して進むよう，バックグラウンドで実行します。
+
+        Returns:
+            threading.Thread: ウォームアップを実行するスレッド。
+        """
+        return self.start_warm_up()
 
     def set_translator_engine(self, engine_type: str):
         """
@@ -36,6 +228,10 @@ class ModelFacade:
         """
         self._translator_factory = TranslatorFactory(engine_type)
 
+    def get_metrics(self) -> MetricsRegistry:
+        """キャプチャ・OCR・翻訳などの計測値を保持するメトリクスレジストリを取得します。"""
+        return get_metrics_registry()
+
     def get_available_ocr_engines(self) -> List[str]:
         """利用可能なOCRエンジンのリストを取得します。"""
         return OCRFactory.get_available_engines()
@@ -44,35 +240,328 @@ class ModelFacade:
         """利用可能な翻訳エンジンのリストを取得します。"""
         return TranslatorFactory.get_available_engines()
 
+    def capture_screen_snapshot(self) -> ScreenSnapshot:
+        """
+        プライマリモニター全体のスナップショットを取得します。
+
+        Returns:
+            ScreenSnapshot: オーバーレイの背景と選択範囲の切り出しに使うスナップショット。
+        """
+        return capture_screen_snapshot()
+
     async def translate_image_from_screen(
         self,
         rect: RectangleCoordinates,
         translation_config: Optional[TranslationConfig] = None,
+        image: Optional["np.ndarray"] = None,
+        latency_budget_ms: Optional[float] = None,
+        report_sink: Optional[Callable[[BudgetReport], None]] = None,
     ) -> tuple[str, str, str]:
         """
         画面の指定領域をキャプチャし、OCRでテキストを抽出し、翻訳します。
 
+        同じ画像・同じ翻訳先言語の履歴があれば，OCRと翻訳を行わずに履歴の結果を返します。
+        latency_budget_ms を指定した場合は，全体がその時間に収まると予測される OCR 設定のうち
+        最も精度の高いものを使い，予算に対する結果を report_sink に渡します。
+        既定以外の設定で認識した結果は設定名を含むキーで履歴に残し，予算なしの要求には返しません。
+
         Args:
             rect (RectangleCoordinates): キャプチャする画面領域。
             translation_config (Optional[TranslationConfig]): 翻訳設定。
+            image (Optional[np.ndarray]): キャプチャ済みの領域画像。渡された場合は再キャプチャしない。
+            latency_budget_ms (Optional[float]): レイテンシ予算（ミリ秒）。省略時は
+                OCRTRANSLATOR_LATENCY_BUDGET_MS の値（未設定なら予算なし）。
+            report_sink (Optional[Callable[[BudgetReport], None]]): 予算があるとき，この呼び出しの
+                BudgetReport を受け取る関数（呼び出しごとに渡すので並行して呼んでも混ざらない）。
 
         Returns:
             tuple[str, str, str]: (翻訳済みテキスト, 抽出された元テキスト, 検出されたソース言語)
         """
-        # 1. 画面キャプチャ
-        image = capture_with_mss(rect)
+        config = translation_config or TranslationConfig()
+        if latency_budget_ms is None:
+            latency_budget_ms = default_latency_budget_ms()
+        recorder = get_capture_recorder()
+        if recorder is None:
+            return await self._translate_image(rect, config, image, latency_budget_ms=latency_budget_ms,
+                                               report_sink=report_sink)
 
-        # 2. OCRでテキスト抽出
-        extracted_text = self._ocr_engine.extract_text(image)
+        # 記録中はフレームとこの処理のステージの所要時間を残す
+        frames: List["np.ndarray"] = []
+        result = None
+        error = None
+        with collect_stages() as stages:
+            try:
+                result = await self._translate_image(rect, config, image, frame_sink=frames.append,
+                                                     latency_budget_ms=latency_budget_ms, report_sink=report_sink)
+                return result
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                raise
+            finally:
+                recorder.record(rect, frames[0] if frames else None, config.source_language,
+                                config.target_language, stages, result=result, error=error)
 
-        if not extracted_text.strip():
-            return "", "", ""
+    async def _translate_image(
+        self,
+        rect: RectangleCoordinates,
+        config: TranslationConfig,
+        image: Optional["np.ndarray"] = None,
+        frame_sink: Optional[Callable[["np.ndarray"], None]] = None,
+        latency_budget_ms: Optional[float] = None,
+        report_sink: Optional[Callable[[BudgetReport], None]] = None,
+    ) -> tuple[str, str, str]:
+        """
+        translate_image_from_screen の本体です。
 
-        # 3. テキスト翻訳
-        translator = self._translator_factory.create(
-            config=translation_config,
-        )
-        translated_text = await translator.translate(extracted_text)
-        source_language = translator.source_language
+        Args:
+            frame_sink (Optional[Callable]): キャプチャしたフレームのコピーを受け取る関数（記録用）。
+            latency_budget_ms (Optional[float]): レイテンシ予算（ミリ秒）。None なら既定の OCR 設定を使う。
+            report_sink (Optional[Callable]): 予算に対する結果（BudgetReport）を受け取る関数。
+        """
+        start = time.perf_counter()
+        plan: Optional[BudgetPlan] = None
+        ocr_seconds: Optional[float] = None
+        try:
+            with stage("end_to_end"):
+                # 1. 画面キャプチャ（フレームはバッファプールから借りる）
+                pool = get_default_pool()
+                if image is None:
+                    image = capture_with_mss(rect, pool=pool)
+                if frame_sink:
+                    # プールの配列は OCR 後に再利用されるのでコピーを渡す
+                    frame_sink(image.copy())
+
+                history = self._get_history()
+                image_hash = None
+                try:
+                    # 2. 履歴に同じ画像があればそのまま返す
+                    if history:
+                        with stage("history_lookup"):
+                            image_hash = compute_image_hash(image)
+                            # 予算なしの要求には既定の設定の結果だけを返す。予算があれば，
+                            # 精度の高い設定の結果から順に探す（どれも OCR し直すより速い）
+                            candidates = CANDIDATE_SETTINGS if latency_budget_ms is not None else (DEFAULT_SETTINGS,)
+                            entry = None
+                            for settings in candidates:
+                                entry = history.find_exact(image_hash, config.target_language,
+                                                           config.source_language, self._ocr_settings_key(settings))
+                                if entry:
+                                    break
+                        get_metrics_registry().record_cache_access("history", entry is not None)
+                        if entry:
+                            return entry.translated_text, entry.ocr_text, entry.source_language
+
+                    # 3. OCRでテキスト抽出（予算があれば，残り時間に収まる設定を選ぶ）
+                    engine = self._get_ocr_engine()
+                    if latency_budget_ms is not None and hasattr(engine, "extract_text_with"):
+                        planner = self._get_budget_planner()
+                        # 文字体系で振り分けるエンジンは，実際に認識する言語で予測・計測する
+                        language = engine.route(image) if hasattr(engine, "route") else self._ocr_language
+                        worker = engine.worker_for(language) if hasattr(engine, "worker_for") else engine
+                        elapsed_ms = (time.perf_counter() - start) * 1000
+                        plan = planner.plan(image, language,
+                                            latency_budget_ms - elapsed_ms - self._expected_translation_ms())
+                        ocr_start = time.perf_counter()
+                        extracted_text = worker.extract_text_with(image, plan.settings)
+                        ocr_seconds = time.perf_counter() - ocr_start
+                        planner.observe(plan, ocr_seconds)
+                    else:
+                        extracted_text = engine.extract_text(image)
+                finally:
+                    pool.release(image)
+
+                if not extracted_text.strip():
+                    return "", "", ""
+
+                # 4. テキスト翻訳（失敗したら対訳辞書で語句を置き換えた結果を返す）
+                translations, source_language, fallback = await self._translate_texts(config, [extracted_text])
+                translated_text = translations[0]
+
+                # 5. 履歴に保存（書き込みはバックグラウンド。代わりの結果は次回に翻訳し直せるよう残さない）
+                if history and image_hash and not fallback:
+                    history.add(HistoryEntry(
+                        x=rect.x, y=rect.y, width=rect.width, height=rect.height,
+                        image_hash=image_hash,
+                        source_language=source_language,
+                        target_language=config.target_language,
+                        ocr_text=extracted_text,
+                        translated_text=translated_text,
+                        requested_source_language=config.source_language,
+                        ocr_settings=self._ocr_settings_key(plan.settings if plan else None),
+                    ))
+
+                return translated_text, extracted_text, source_language
+        finally:
+            if latency_budget_ms is not None:
+                report = self._report_budget(latency_budget_ms, time.perf_counter() - start, plan, ocr_seconds)
+                if report_sink:
+                    report_sink(report)
+
+    async def _translate_texts(self, config: TranslationConfig, texts: List[str]) -> tuple[List[str], str, bool]:
+        """
+        文の列をまとめて翻訳します。翻訳エンジンが失敗した場合は，対訳辞書があればその結果を返します。
+
+        Returns:
+            tuple[List[str], str, bool]: (texts の順の訳文, 検出されたソース言語, 対訳辞書で代用したか)
+        """
+        factory = self._translator_factory
+        translator = factory.create(config=config)
+        try:
+            translated = await translate_segments(translator, texts, lambda: factory.create(config=config))
+            return translated, translator.source_language, False
+        except TranslationError as e:
+            if factory.engine_type == LEXICON_ENGINE or not has_lexicon(
+                    config.target_language, config.source_language):
+                raise
+            logger.warning(f"翻訳に失敗したため対訳辞書で置き換えます: {e}")
+            get_metrics_registry().increment("translation_fallbacks")
+            factory = TranslatorFactory(engine_type=LEXICON_ENGINE)
+            translator = factory.create(config=config)
+            translated = await translate_segments(translator, texts, lambda: factory.create(config=config))
+            return translated, translator.source_language, True
 
-        return translated_text, extracted_text, source_language
+    async def translate_regions_from_screen(
+        self,
+        rects: Sequence[RectangleCoordinates],
+        translation_config: Optional[TranslationConfig] = None,
+    ) -> List[tuple[str, str, str]]:
+        """
+        画面の複数の領域をまとめてキャプチャ・OCR・翻訳します。
+
+        外接矩形を1回だけキャプチャして各領域をコピーせずに切り出し，
+        OCR は CPU 配分のワーカーで並列に，翻訳は元言語（"auto" なら文ごとに推定）が同じ領域の文をまとめて1回で行います。
+        履歴に同じ画像がある領域は OCR と翻訳を行いません。
+
+        Args:
+            rects (Sequence[RectangleCoordinates]): キャプチャする画面領域のリスト。
+            translation_config (Optional[TranslationConfig]): 翻訳設定。
+
+        Returns:
+            List[tuple[str, str, str]]: rects の順の (翻訳済みテキスト, 抽出された元テキスト, 検出されたソース言語)
+        """
+        config = translation_config or TranslationConfig()
+        if not rects:
+            return []
+        results: List[tuple[str, str, str]] = [("", "", "")] * len(rects)
+        with stage("end_to_end_regions", regions=len(rects)):
+            # 1. 外接矩形を1回だけキャプチャ（各領域はそのビュー）
+            pool = get_default_pool()
+            snapshot, crops = capture_regions_with_mss(rects, pool=pool)
+            history = self._get_history()
+            ocr_settings = self._ocr_settings_key()
+            image_hashes: List[Optional[str]] = [None] * len(rects)
+            extracted: Dict[int, str] = {}
+            try:
+                # 2. 履歴に同じ画像がある領域はそのまま返す
+                pending = []
+                for index, crop in enumerate(crops):
+                    if crop.size == 0:
+                        continue
+                    if history:
+                        with stage("history_lookup"):
+                            image_hashes[index] = compute_image_hash(crop)
+                            entry = history.find_exact(image_hashes[index], config.target_language,
+                                                       config.source_language, ocr_settings)
+                        get_metrics_registry().record_cache_access("history", entry is not None)
+                        if entry:
+                            results[index] = (entry.translated_text, entry.ocr_text, entry.source_language)
+                            continue
+                    pending.append(index)
+
+                # 3. 残りの領域を並列に OCR（ステージの計測が集まるようコンテキストを引き継ぐ）
+                engine = self._get_ocr_engine()
+                executor = get_cpu_budget().executor()
+                futures = [
+                    asyncio.wrap_future(executor.submit(contextvars.copy_context().run, engine.extract_text, crops[index]))
+                    for index in pending
+                ]
+                # 失敗した領域があっても，他の領域の OCR がスナップショットを読み終えるまで待ってから返却する
+                texts = await asyncio.gather(*futures, return_exceptions=True)
+                for text in texts:
+                    if isinstance(text, BaseException):
+                        raise text
+                for index, text in zip(pending, texts):
+                    extracted[index] = text
+            finally:
+                pool.release(snapshot.image)
+
+            # 4. 文字のあった領域の文を，元言語ごとにまとめて翻訳（言語の違う領域を1つの言語として訳さない）
+            indices = [index for index in pending if extracted[index].strip()]
+            if not indices:
+                return results
+            groups = self._group_by_language(config, indices, extracted)
+            translated_groups = await asyncio.gather(*(
+                self._translate_texts(config, [extracted[index] for index in group]) for group in groups
+            ))
+
+            # 5. 領域ごとに結果（元言語はその領域のグループで検出したもの）を返し，履歴に保存
+            for group, (translations, source_language, fallback) in zip(groups, translated_groups):
+                for index, translated_text in zip(group, translations):
+                    results[index] = (translated_text, extracted[index], source_language)
+                    if history and image_hashes[index] and not fallback:
+                        rect = rects[index]
+                        history.add(HistoryEntry(
+                            x=rect.x, y=rect.y, width=rect.width, height=rect.height,
+                            image_hash=image_hashes[index],
+                            source_language=source_language,
+                            target_language=config.target_language,
+                            ocr_text=extracted[index],
+                            translated_text=translated_text,
+                            requested_source_language=config.source_language,
+                            ocr_settings=ocr_settings,
+                        ))
+            return results
+
+    @staticmethod
+    def _group_by_language(config: TranslationConfig, indices: List[int],
+                           extracted: Dict[int, str]) -> List[List[int]]:
+        """
+        元言語が "auto" のとき，領域を文ごとに推定した言語でまとめます。
+
+        推定した言語はまとめ方にだけ使い，翻訳はグループごとに元の設定で行うので，
+        元言語は翻訳エンジンがそのグループの文から検出したものになります（推定できない文は1つのグループにまとめる）。
+
+        Returns:
+            List[List[int]]: 領域番号のグループ（各グループ内は indices の順）
+        """
+        if config.source_language != "auto" or len(indices) <= 1:
+            return [indices]
+        groups: Dict[Optional[str], List[int]] = {}
+        for index in indices:
+            groups.setdefault(detect_language(extracted[index]), []).append(index)
+        return list(groups.values())
+
+    def _get_budget_planner(self) -> LatencyBudgetPlanner:
+        """レイテンシ予算のプランナーを取得します。未作成であれば保存済みの計測値を読み込んで作ります。"""
+        with self._budget_planner_lock:
+            if self._budget_planner is None:
+                self._budget_planner = create_budget_planner()
+            return self._budget_planner
+
+    @staticmethod
+    def _expected_translation_ms() -> float:
+        """これまでの計測から見込まれる，言語検出と翻訳の所要時間（中央値，ミリ秒）。"""
+        metrics = get_metrics_registry()
+        total = 0.0
+        for name in TRANSLATION_STAGES:
+            summary = metrics.latency_summary(name)
+            if summary:
+                total += summary["p50"] * 1000
+        return total
+
+    def _report_budget(self, budget_ms: float, total_seconds: float, plan: Optional[BudgetPlan],
+                       ocr_seconds: Optional[float]) -> BudgetReport:
+        """レイテンシ予算に対する結果をメトリクスに数え，BudgetReport として返します。"""
+        total_ms = total_seconds * 1000
+        met = total_ms <= budget_ms
+        report = BudgetReport(
+            budget_ms=budget_ms,
+            total_ms=total_ms,
+            met=met,
+            settings=plan.settings.name if plan else None,
+            ocr_budget_ms=plan.ocr_budget_ms if plan else None,
+            predicted_ocr_ms=plan.predicted_ms if plan else None,
+            actual_ocr_ms=ocr_seconds * 1000 if ocr_seconds is not None else None,
+        )
+        get_metrics_registry().increment("latency_budget_met" if met else "latency_budget_missed")
+        return report
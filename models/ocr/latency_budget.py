@@ -0,0 +1,310 @@
+"""
+レイテンシ予算に合わせた OCR 設定の選択
+
+OCR の所要時間を，領域の大きさ（メガピクセル）・文字の密度・言語・設定から予測するコストモデルを持ち，
+予算内に収まると予測される設定のうち最も精度の高いものを選びます．
+コストモデルは実際に計測したステージの所要時間（OCR のたびの計測値と，CaptureRecorder の記録）から
+設定・言語ごとに最小二乗法で当てはめ，計測が少ないうちは既定の係数に端末の速さの補正を掛けて使います．
+"""
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Deque, Dict, List, Optional, Sequence, Tuple
+import json
+import logging
+import os
+import threading
+
+from models.utils.app_dirs import get_user_cache_dir
+
+if TYPE_CHECKING:
+    import numpy as np
+    from models.utils.capture_image import Recording
+
+logger = logging.getLogger(__name__)
+
+# 既定のレイテンシ予算（ミリ秒）を指定する環境変数（未設定なら予算なしで常に既定の設定を使う）
+LATENCY_BUDGET_ENV = "OCRTRANSLATOR_LATENCY_BUDGET_MS"
+COST_MODEL_FILE = "latency_model.json"
+
+# 設定・言語ごとに保持する計測値の数と，当てはめに必要な数
+MAX_OBSERVATIONS = 64
+MIN_FIT_SAMPLES = 8
+
+# 文字の密度を見積もるときに縮小する幅（ピクセル）
+DENSITY_SAMPLE_WIDTH = 256
+
+# OCR の後に続く処理のステージ（これらの中央値を予算から差し引いて OCR に使える時間を決める）
+TRANSLATION_STAGES = ("translation_google_client", "language_detection", "translation_google")
+
+
+@dataclass(frozen=True)
+class OCRSettings:
+    """1回の OCR の設定"""
+    name: str
+    latency_preference: str = "balanced"   # traineddata の変種（"fast" / "balanced" / "accurate"）
+    scale: float = 1.0                     # 前処理での拡大・縮小の倍率
+    psm: int = 3                           # tesseract のページ分割モード
+    binarize: bool = False                 # 前処理で二値化するか
+
+
+DEFAULT_SETTINGS = OCRSettings(name="balanced")
+
+# 精度の高い順（予算に収まる最初のものを使う）
+CANDIDATE_SETTINGS: Tuple[OCRSettings, ...] = (
+    OCRSettings(name="accurate", latency_preference="accurate"),
+    DEFAULT_SETTINGS,
+    OCRSettings(name="balanced-block", psm=6),
+    OCRSettings(name="fast-block", latency_preference="fast", psm=6),
+    OCRSettings(name="fast-block-075", latency_preference="fast", scale=0.75, psm=6),
+    OCRSettings(name="fast-block-050-binary", latency_preference="fast", scale=0.5, psm=6, binarize=True),
+)
+
+# 計測が無いときの既定の係数
+_PRIOR_BASE_MS = 40.0
+_PRIOR_MS_PER_MEGAPIXEL = 400.0
+_PRIOR_MS_PER_DENSE_MEGAPIXEL = 1600.0
+_PRIOR_PREFERENCE_FACTORS = {"fast": 0.6, "balanced": 1.0, "accurate": 1.8}
+_PRIOR_PSM_FACTORS = {3: 1.0, 6: 0.8, 7: 0.7}
+_PRIOR_LANGUAGE_FACTORS = {"jpn": 2.0, "chi_sim": 2.0, "chi_tra": 2.0, "kor": 1.5}
+
+
+@dataclass(frozen=True)
+class ImageFeatures:
+    """コストモデルの入力"""
+    megapixels: float   # 拡大・縮小前の画素数（百万）
+    density: float      # 文字の密度の目安（0〜1，エッジの画素の割合）
+
+
+def estimate_text_density(image: np.ndarray) -> float:
+    """
+    文字の密度を見積もる（縮小したグレースケール画像でのエッジの画素の割合）
+
+    Args:
+        image (np.ndarray): BGR またはグレースケールの画像
+
+    Returns:
+        float: 0〜1
+    """
+    import cv2
+
+    height, width = image.shape[:2]
+    if not height or not width:
+        return 0.0
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    if width > DENSITY_SAMPLE_WIDTH:
+        size = (DENSITY_SAMPLE_WIDTH, max(1, round(height * DENSITY_SAMPLE_WIDTH / width)))
+        gray = cv2.resize(gray, size, interpolation=cv2.INTER_AREA)
+    edges = cv2.Canny(gray, 50, 150)
+    return float(cv2.countNonZero(edges)) / edges.size
+
+
+def extract_features(image: np.ndarray) -> ImageFeatures:
+    height, width = image.shape[:2]
+    return ImageFeatures(megapixels=height * width / 1_000_000, density=estimate_text_density(image))
+
+
+def _regressors(settings: OCRSettings, features: ImageFeatures) -> Tuple[float, float, float]:
+    megapixels = features.megapixels * settings.scale ** 2
+    return 1.0, megapixels, megapixels * features.density
+
+
+def prior_cost_ms(settings: OCRSettings, features: ImageFeatures, language: str) -> float:
+    """計測が無いときの予測（ミリ秒）"""
+    constant, megapixels, dense = _regressors(settings, features)
+    cost = _PRIOR_BASE_MS * constant + _PRIOR_MS_PER_MEGAPIXEL * megapixels + _PRIOR_MS_PER_DENSE_MEGAPIXEL * dense
+    factor = (_PRIOR_PREFERENCE_FACTORS.get(settings.latency_preference, 1.0)
+              * _PRIOR_PSM_FACTORS.get(settings.psm, 1.0)
+              * max((_PRIOR_LANGUAGE_FACTORS.get(lang, 1.0) for lang in language.split("+")), default=1.0))
+    return cost * factor
+
+
+class LatencyCostModel:
+    """
+    OCR の所要時間の予測モデル
+
+    設定・言語ごとに直近の計測値 (画素数, 文字の密度, 所要時間) を保持し，
+    所要時間 ≈ a + b × 画素数 + c × 画素数 × 密度 を最小二乗法で当てはめます．
+    計測が MIN_FIT_SAMPLES 件に満たない組み合わせは，既定の係数による予測に
+    すべての計測から求めた「実測 / 既定の予測」の中央値を掛けて使います．
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path
+        self._observations: Dict[Tuple[str, str], Deque[Tuple[float, float, float]]] = {}
+        self._coefficients: Dict[Tuple[str, str], Tuple[float, float, float]] = {}
+        self._speed_ratio = 1.0
+        self._lock = threading.Lock()
+        if path is not None and path.exists():
+            self._load(path)
+
+    def observe(self, settings: OCRSettings, features: ImageFeatures, language: str, seconds: float) -> None:
+        """計測値を1件追加してモデルを当てはめ直す"""
+        key = (settings.name, language)
+        with self._lock:
+            samples = self._observations.setdefault(key, deque(maxlen=MAX_OBSERVATIONS))
+            samples.append((features.megapixels, features.density, seconds * 1000))
+            self._refit(key)
+
+    def predict_ms(self, settings: OCRSettings, features: ImageFeatures, language: str) -> float:
+        """所要時間の予測（ミリ秒）"""
+        with self._lock:
+            coefficients = self._coefficients.get((settings.name, language))
+            speed_ratio = self._speed_ratio
+        if coefficients is None:
+            return prior_cost_ms(settings, features, language) * speed_ratio
+        prediction = sum(c * x for c, x in zip(coefficients, _regressors(settings, features)))
+        return max(prediction, 1.0)
+
+    def _refit(self, key: Tuple[str, str]) -> None:
+        import numpy as np
+
+        settings = _settings_by_name(key[0])
+        samples = self._observations[key]
+        if settings is not None and len(samples) >= MIN_FIT_SAMPLES:
+            matrix = np.array([_regressors(settings, ImageFeatures(m, d)) for m, d, _ in samples])
+            targets = np.array([ms for _, _, ms in samples])
+            solution, *_ = np.linalg.lstsq(matrix, targets, rcond=None)
+            self._coefficients[key] = tuple(float(c) for c in solution)
+        ratios = [
+            ms / prior_cost_ms(s, ImageFeatures(m, d), language)
+            for (name, language), values in self._observations.items()
+            if (s := _settings_by_name(name)) is not None
+            for m, d, ms in values
+        ]
+        if ratios:
+            self._speed_ratio = float(np.median(ratios))
+
+    def observe_recording(self, recording: Recording, language: str = "eng") -> int:
+        """
+        CaptureRecorder の記録から既定の設定の計測値を取り込む
+
+        記録時はレイテンシ予算を使っていない（既定の設定で OCR した）ものとして，
+        前処理と OCR のステージの所要時間の合計を使います．
+
+        Returns:
+            int: 取り込んだ件数
+        """
+        count = 0
+        for event in recording.captures:
+            ocr_seconds = sum(duration for name, _, duration in event.stages
+                              if name.startswith(("preprocess_", "ocr_")))
+            if event.frame is None or event.frame not in recording.frames or not ocr_seconds:
+                continue
+            features = extract_features(recording.decode_frame(event.frame))
+            self.observe(DEFAULT_SETTINGS, features, language, ocr_seconds)
+            count += 1
+        return count
+
+    def _load(self, path: Path) -> None:
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            for entry in data.get("observations", []):
+                key = (entry["settings"], entry["language"])
+                self._observations[key] = deque((tuple(s) for s in entry["samples"]), maxlen=MAX_OBSERVATIONS)
+            for key in list(self._observations):
+                self._refit(key)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"LatencyCostModel: 保存済みの計測値を読み込めません: {e}")
+
+    def save(self) -> None:
+        """計測値をファイルに保存する（path が無ければ何もしない）"""
+        if self.path is None:
+            return
+        with self._lock:
+            data = {"observations": [
+                {"settings": name, "language": language, "samples": list(samples)}
+                for (name, language), samples in self._observations.items()
+            ]}
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"LatencyCostModel: 計測値を保存できません: {e}")
+
+
+def _settings_by_name(name: str) -> Optional[OCRSettings]:
+    for settings in CANDIDATE_SETTINGS:
+        if settings.name == name:
+            return settings
+    return None
+
+
+@dataclass(frozen=True)
+class BudgetPlan:
+    """選んだ設定と予測"""
+    settings: OCRSettings
+    features: ImageFeatures
+    language: str
+    ocr_budget_ms: float
+    predicted_ms: float
+
+
+@dataclass(frozen=True)
+class BudgetReport:
+    """レイテンシ予算に対する結果"""
+    budget_ms: float
+    total_ms: float                      # translate_image_from_screen 全体の所要時間
+    met: bool
+    settings: Optional[str] = None       # 使った OCR 設定（履歴にあった場合などは None）
+    ocr_budget_ms: Optional[float] = None
+    predicted_ocr_ms: Optional[float] = None
+    actual_ocr_ms: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, object]:
+        return asdict(self)
+
+
+class LatencyBudgetPlanner:
+    """コストモデルで，予算内に収まる最も精度の高い OCR 設定を選ぶ"""
+
+    def __init__(self, model: Optional[LatencyCostModel] = None,
+                 candidates: Sequence[OCRSettings] = CANDIDATE_SETTINGS):
+        self.model = model or LatencyCostModel()
+        self.candidates = tuple(candidates)
+
+    def plan(self, image: np.ndarray, language: str, ocr_budget_ms: float) -> BudgetPlan:
+        """
+        設定を選ぶ
+
+        Args:
+            image (np.ndarray): OCR する画像
+            language (str): OCR の言語
+            ocr_budget_ms (float): OCR に使える時間（ミリ秒）
+
+        Returns:
+            BudgetPlan: 予算に収まる最初の候補。どれも収まらなければ最も速いと予測される候補
+        """
+        features = extract_features(image)
+        predictions: List[Tuple[float, OCRSettings]] = []
+        for settings in self.candidates:
+            predicted = self.model.predict_ms(settings, features, language)
+            if predicted <= ocr_budget_ms:
+                return BudgetPlan(settings, features, language, ocr_budget_ms, predicted)
+            predictions.append((predicted, settings))
+        predicted, settings = min(predictions, key=lambda item: item[0])
+        return BudgetPlan(settings, features, language, ocr_budget_ms, predicted)
+
+    def observe(self, plan: BudgetPlan, seconds: float) -> None:
+        """選んだ設定での実測値をコストモデルに反映する"""
+        self.model.observe(plan.settings, plan.features, plan.language, seconds)
+
+
+def default_latency_budget_ms() -> Optional[float]:
+    """環境変数 OCRTRANSLATOR_LATENCY_BUDGET_MS の値（未設定・不正なら None）"""
+    try:
+        value = float(os.environ.get(LATENCY_BUDGET_ENV, ""))
+    except ValueError:
+        return None
+    return value if value > 0 else None
+
+
+def create_budget_planner() -> LatencyBudgetPlanner:
+    """キャッシュディレクトリの計測値を読み込んだプランナーを作る"""
+    return LatencyBudgetPlanner(LatencyCostModel(get_user_cache_dir() / COST_MODEL_FILE))
@@ -1,20 +1,34 @@
-from typing import Dict, Any, List, Protocol
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Dict, Any, Iterable, List, Optional, Protocol
 import sys
 import os
 from pathlib import Path
 import subprocess
 import platform
-import pytesseract
-import numpy as np
+import re
+import threading
 
+from models.ocr.latency_budget import OCRSettings
+from models.ocr.ocr_result import LOW_CONFIDENCE, OCRResult
+from models.ocr.postcorrect import PostCorrector, get_post_corrector
 from models.ocr.preprocess import run_pipeline
-from models.utils.tesseract_locator import get_base_dir, find_tesseract_folder, assemble_tesseract_paths, configure_environment, probe_tesseract_version
+from models.utils.buffer_pool import get_default_pool
+from models.utils.cpu_budget import get_cpu_budget
+from models.utils.instrumentation import stage
+from models.ocr.script_detection import SCRIPT_TO_LANGUAGE, OSD_LANGUAGE, available_languages, detect_script, resolve_tessdata_dir
+from models.utils.tesseract_locator import get_base_dir, resolve_tesseract
+
+if TYPE_CHECKING:
+    # numpy / pytesseract は起動時間短縮のため実行時には遅延 import する
+    import numpy as np
 
 class IOCR(Protocol):
     """OCR インターフェース"""
 
     engine_name: str
     def extract_text(self, image: np.ndarray) -> str: ...
+    def extract_result(self, image: np.ndarray) -> OCRResult: ...
 
 
 class TesseractOCR(IOCR):
@@ -26,11 +40,14 @@ class TesseractOCR(IOCR):
     主なメソッド:
         - 画像から文字を抽出
     """
-    def __init__(self, language: str="eng", tess_bin: Path | None = None, tessdata_path: Path | None = None, tesseract_config: str = "--psm 3"):
+    def __init__(self, language: str="eng", tess_bin: Path | None = None, tessdata_path: Path | None = None, tesseract_config: str = "--psm 3",
+                 post_correction: bool = False):
         self.language = language
         self.tess_bin = Path(tess_bin) if tess_bin else None
         self.tessdata_path = Path(tessdata_path) if tessdata_path else None
         self.tesseract_config = tesseract_config
+        # 認識後に頻度辞書で綴りを補正するか（辞書が無い言語では何もしない）
+        self.post_correction = post_correction
 
         # pytesseract と環境変数の設定（もしファイルが与えられていれば）
         if self.tessdata_path and self.tessdata_path.exists():
@@ -45,6 +62,7 @@ class TesseractOCR(IOCR):
                 pass
             # pytesseract にバイナリを伝える
             try:
+                import pytesseract
                 pytesseract.pytesseract.tesseract_cmd = str(self.tess_bin)
             except Exception:
                 pass
@@ -62,12 +80,97 @@ class TesseractOCR(IOCR):
     def extract_text(self, image: np.ndarray) -> str:
         """画像から文字を抽出するメソッド
 
+        綴り補正が有効な場合は，信頼度の低い単語だけを補正できるよう extract_result の経路で認識します．
+
+        Returns:
+            str: 画像から抽出されたテキスト
+        """
+        return self._recognize_text(image, self.tesseract_config)
+
+    def extract_text_with(self, image: np.ndarray, settings: OCRSettings) -> str:
+        """指定した設定（traineddata の変種・倍率・PSM・二値化）で文字を抽出するメソッド
+
+        Args:
+            image (np.ndarray): 入力画像
+            settings (OCRSettings): LatencyBudgetPlanner が選んだ設定
+
         Returns:
             str: 画像から抽出されたテキスト
         """
-        processed_image, _ = run_pipeline(image)
-        # pytesseract.image_to_string(image, lang=..., config=...)
-        return pytesseract.image_to_string(processed_image, lang=self.language, config=self.tesseract_config)
+        return self._recognize_text(image, self._config_for(settings), scale=settings.scale,
+                                    binarize=settings.binarize, settings=settings.name)
+
+    def _recognize_text(self, image: np.ndarray, config: str, scale: float = 1.0, binarize: bool = False,
+                        **stage_args) -> str:
+        import pytesseract
+
+        correcting = self._post_corrector() is not None
+        pool = get_default_pool()
+        processed_image, _ = run_pipeline(image, pool=pool, scale=scale, binarize=binarize)
+        try:
+            # pytesseract.image_to_string(image, lang=..., config=...)
+            with stage("ocr_tesseract", language=self.language, **stage_args):
+                if correcting:
+                    tsv = pytesseract.image_to_data(processed_image, lang=self.language, config=config)
+                else:
+                    text = pytesseract.image_to_string(processed_image, lang=self.language, config=config)
+        finally:
+            # 前処理でプールから借りた配列を返却する（プール外の画像なら何もしない）
+            pool.release(processed_image)
+        if correcting:
+            return self.correct_result(OCRResult.from_tsv(tsv)).text
+        return text
+
+    def _config_for(self, settings: OCRSettings) -> str:
+        """tesseract_config の PSM と tessdata ディレクトリを settings のものに置き換える"""
+        config = re.sub(r"--psm\s+\d+", "", self.tesseract_config)
+        config = re.sub(r'--tessdata-dir\s+("[^"]*"|\S+)', "", config)
+        config = f"--psm {settings.psm} {' '.join(config.split())}".strip()
+        tessdata_dir = resolve_tessdata_dir(self.tessdata_path, self.language, settings.latency_preference)
+        if tessdata_dir:
+            config += f' --tessdata-dir "{tessdata_dir}"'
+        return config
+
+    def extract_result(self, image: np.ndarray) -> OCRResult:
+        """画像から単語の位置・信頼度つきで文字を抽出するメソッド
+
+        tesseract は1回（image_to_data）だけ実行します．プレーンテキストは結果の text で得られます．
+
+        Returns:
+            OCRResult: 構造化された OCR 結果
+        """
+        import pytesseract
+
+        pool = get_default_pool()
+        processed_image, _ = run_pipeline(image, pool=pool)
+        try:
+            with stage("ocr_tesseract", language=self.language):
+                tsv = pytesseract.image_to_data(processed_image, lang=self.language, config=self.tesseract_config)
+        finally:
+            pool.release(processed_image)
+        return self.correct_result(OCRResult.from_tsv(tsv))
+
+    def correct_result(self, result: OCRResult) -> OCRResult:
+        """
+        post_correction が有効なら，信頼度の低い単語だけ綴りを補正する
+
+        Args:
+            result (OCRResult): 認識結果
+
+        Returns:
+            OCRResult: 補正後の結果（位置・信頼度は元の配列を共有する）
+        """
+        corrector = self._post_corrector()
+        if corrector is None or not len(result):
+            return result
+        with stage("ocr_postcorrect", language=self.language):
+            return result.map_words(
+                lambda word, confidence: corrector.correct(word) if confidence < LOW_CONFIDENCE else word
+            )
+
+    def _post_corrector(self) -> Optional[PostCorrector]:
+        """post_correction が有効で，言語の辞書があれば補正器を返す"""
+        return get_post_corrector(self.language) if self.post_correction else None
 
     @property
     def engine_name(self) -> str:
@@ -75,35 +178,145 @@ class TesseractOCR(IOCR):
         return "Tesseract"
 
 
+class ScriptAwareOCR(IOCR):
+    """
+    文字体系を判定してから適切な言語の TesseractOCR に振り分けるOCR
+
+    まず OSD（osd.traineddata）でスクリプトを判定し，対応する traineddata が
+    配置されていればその言語のワーカーで認識します．判定できない場合や
+    traineddata が無い場合は既定の言語を使います．
+    ワーカーは言語ごとに生成して使い回し，preload() で事前に温めておけます．
+    """
+    def __init__(self, language: str = "eng", tess_bin: Path | None = None, tessdata_path: Path | None = None,
+                 tesseract_config: str = "--psm 3", latency_preference: str = "balanced",
+                 post_correction: bool = False):
+        self.language = language
+        self.tess_bin = Path(tess_bin) if tess_bin else None
+        self.tessdata_path = Path(tessdata_path) if tessdata_path else None
+        self.tesseract_config = tesseract_config
+        self.latency_preference = latency_preference
+        self.post_correction = post_correction
+        self._workers: Dict[str, TesseractOCR] = {}
+        self._workers_lock = threading.Lock()
+
+        installed = available_languages(self.tessdata_path)
+        self._osd_available = OSD_LANGUAGE in installed
+        # 判定結果のスクリプトのうち，traineddata が配置されているものだけを振り分け対象にする
+        self._routes = {script: lang for script, lang in SCRIPT_TO_LANGUAGE.items() if lang in installed}
+
+    def worker_for(self, language: str) -> TesseractOCR:
+        """
+        指定言語のワーカーを取得する（無ければ生成する）
+
+        Args:
+            language (str): "eng" などの言語名
+
+        Returns:
+            TesseractOCR: その言語用に設定済みのワーカー
+        """
+        with self._workers_lock:
+            worker = self._workers.get(language)
+            if worker is None:
+                tessdata_dir = resolve_tessdata_dir(self.tessdata_path, language, self.latency_preference)
+                config = self.tesseract_config
+                if tessdata_dir:
+                    config += f' --tessdata-dir "{tessdata_dir}"'
+                worker = TesseractOCR(language=language, tess_bin=self.tess_bin,
+                                      tessdata_path=self.tessdata_path, tesseract_config=config,
+                                      post_correction=self.post_correction)
+                self._workers[language] = worker
+            return worker
+
+    def preload(self, languages: Iterable[str] | None = None) -> None:
+        """
+        ワーカーを生成し，小さな画像で一度認識させて traineddata を読み込ませておく
+
+        Args:
+            languages (Iterable[str] | None): 対象言語。None なら既定の言語のみ
+        """
+        import numpy as np
+
+        blank = np.full((32, 32, 3), 255, dtype=np.uint8)
+        for language in languages or [self.language]:
+            try:
+                self.worker_for(language).extract_text(blank)
+            except Exception:
+                # 温められなくても実際の認識時に改めて読み込まれる
+                pass
+
+    def route(self, image: np.ndarray) -> str:
+        """
+        画像の文字体系から使用する言語を決める
+
+        Args:
+            image (np.ndarray): 入力画像
+
+        Returns:
+            str: 使用する言語名
+        """
+        if not self._osd_available:
+            return self.language
+        with stage("ocr_script_detection"):
+            script = detect_script(image, self.tessdata_path)
+        return self._routes.get(script, self.language)
+
+    def extract_text(self, image: np.ndarray) -> str:
+        """画像の文字体系に合ったワーカーで文字を抽出するメソッド
+
+        Returns:
+            str: 画像から抽出されたテキスト
+        """
+        return self.worker_for(self.route(image)).extract_text(image)
+
+    def extract_text_with(self, image: np.ndarray, settings: OCRSettings) -> str:
+        """画像の文字体系に合ったワーカーで，指定した設定で文字を抽出するメソッド
+
+        Returns:
+            str: 画像から抽出されたテキスト
+        """
+        return self.worker_for(self.route(image)).extract_text_with(image, settings)
+
+    def extract_result(self, image: np.ndarray) -> OCRResult:
+        """画像の文字体系に合ったワーカーで，位置・信頼度つきで文字を抽出するメソッド
+
+        Returns:
+            OCRResult: 構造化された OCR 結果
+        """
+        return self.worker_for(self.route(image)).extract_result(image)
+
+    @property
+    def engine_name(self) -> str:
+        """OCRエンジンの名前"""
+        return "Tesseract (script-aware)"
+
+
 class OCRFactory:
     """OCRエンジンのファクトリークラス"""
     _ocr_engines = {
         "tesseract": TesseractOCR,
+        "tesseract_auto": ScriptAwareOCR,
     }
 
     @staticmethod
-    def create_ocr(engine_type: str, language: str = "eng",  base_dir_override: str | Path | None = None, require_tesseract: bool = True) -> IOCR:
+    def create_ocr(engine_type: str, language: str = "eng",  base_dir_override: str | Path | None = None, require_tesseract: bool = True, **engine_options: Any) -> IOCR:
         if engine_type not in OCRFactory._ocr_engines:
             raise ValueError(f"サポートされていないエンジンタイプです: {engine_type}")
 
         engine_class = OCRFactory._ocr_engines[engine_type]
-        # tesseract 用の探索と環境設定
+        # tesseract の OpenMP スレッド数を CPU 配分に合わせる（以降に起動する子プロセスに引き継がれる）
+        get_cpu_budget().apply()
+        # tesseract 用の探索と環境設定（プロセス内・ファイルにキャッシュされる）
         base_dir = get_base_dir(base_dir_override)
-        tess_root = find_tesseract_folder(base_dir)
+        installation = resolve_tesseract(base_dir)
 
-        if tess_root:
-            info = assemble_tesseract_paths(tess_root)
-            tess_bin = info.get("tess_bin")
-            tess_lib_dir = info.get("tess_lib_dir")
-            tessdata = info.get("tessdata", base_dir / "tessdata")
-            # 環境変数や LD_LIBRARY_PATH, pytesseract 設定を行う
-            configure_environment(tessdata, tess_lib_dir, tess_bin, set_pytesseract=True)
+        if installation:
+            tess_bin = installation.tess_bin
+            tessdata = installation.tessdata
 
             if require_tesseract:
                 if tess_bin is None:
                     raise RuntimeError("tesseract_bin が None です。base_dir の設定を確認してください。")
-                ver = probe_tesseract_version(tess_bin)
-                if not ver:
+                if not installation.version:
                     raise RuntimeError("tesseract が見つかったが実行できません。依存ライブラリを確認してください。")
         else:
             tess_bin = None
@@ -112,7 +325,8 @@ class OCRFactory:
                 raise RuntimeError(f"tesseract_bin が見つかりません。base_dir={base_dir}")
 
         # OCR インスタンス生成（最低限の情報だけ渡す）
-        return engine_class(language=language, tess_bin=tess_bin, tessdata_path=tessdata)
+        # engine_options（latency_preference など）はエンジン固有の設定としてそのまま渡す
+        return engine_class(language=language, tess_bin=tess_bin, tessdata_path=tessdata, **engine_options)
 
     @staticmethod
     def get_available_engines() -> List[str]:
@@ -133,6 +347,10 @@ class OCREngine:
         """現在のエンジンでテキスト抽出"""
         return self._strategy.extract_text(image)
 
+    def extract_result(self, image: np.ndarray) -> OCRResult:
+        """現在のエンジンで構造化された結果を抽出"""
+        return self._strategy.extract_result(image)
+
     def get_engine_info(self) -> Dict[str, Any]:
         """OCRエンジンの情報を取得"""
         return {
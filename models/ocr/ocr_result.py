@@ -0,0 +1,233 @@
+"""
+構造化された OCR 結果
+
+tesseract の image_to_data（TSV）を1回だけ実行し，単語ごとの位置・信頼度・ブロック/段落/行の番号を
+numpy 配列にまとめて保持します．行・ブロック単位の情報やプレーンテキストはこの配列から組み立てるため，
+位置や信頼度が必要になっても OCR をやり直す必要はありません．
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, List, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# TSV の列（tesseract 4 以降）
+TSV_COLUMNS = ("level", "page_num", "block_num", "par_num", "line_num", "word_num",
+               "left", "top", "width", "height", "conf", "text")
+WORD_LEVEL = 5
+
+# この信頼度（0〜100）未満の単語を「低信頼度」とみなす
+LOW_CONFIDENCE = 60.0
+
+
+@dataclass(frozen=True)
+class BoundingBox:
+    """画像上の矩形（ピクセル）"""
+    left: int
+    top: int
+    width: int
+    height: int
+
+
+@dataclass(frozen=True)
+class OCRWord:
+    """認識された単語"""
+    text: str
+    box: BoundingBox
+    confidence: float
+
+
+@dataclass(frozen=True)
+class OCRLine:
+    """認識された1行"""
+    text: str
+    box: BoundingBox
+    confidence: float   # 行内の単語の信頼度の平均
+    block_num: int
+    par_num: int
+    line_num: int
+
+
+@dataclass(frozen=True)
+class OCRBlock:
+    """認識されたテキストブロック"""
+    block_num: int
+    box: BoundingBox
+    lines: Tuple[OCRLine, ...]
+
+    @property
+    def text(self) -> str:
+        return "\n".join(line.text for line in self.lines)
+
+
+class OCRResult:
+    """
+    1枚の画像の OCR 結果
+
+    単語ごとの値は次の配列で保持します（n は単語数）．
+        boxes (n, 4) int32: left, top, width, height
+        confidences (n,) float32: 0〜100
+        layout (n, 3) int32: block_num, par_num, line_num（3つの組で行が決まる）
+    単語の文字列だけは Python の文字列のタプルです．
+    """
+
+    __slots__ = ("words", "boxes", "confidences", "layout", "_text")
+
+    def __init__(self, words: Sequence[str], boxes: np.ndarray, confidences: np.ndarray, layout: np.ndarray):
+        self.words: Tuple[str, ...] = tuple(words)
+        self.boxes = boxes
+        self.confidences = confidences
+        self.layout = layout
+        self._text: Optional[str] = None
+
+    @classmethod
+    def empty(cls) -> "OCRResult":
+        import numpy as np
+
+        return cls((), np.zeros((0, 4), np.int32), np.zeros(0, np.float32), np.zeros((0, 3), np.int32))
+
+    @classmethod
+    def from_tsv(cls, tsv: str) -> "OCRResult":
+        """
+        image_to_data の TSV 出力から結果を作る
+
+        Args:
+            tsv (str): pytesseract.image_to_data(..., output_type="string") の戻り値
+
+        Returns:
+            OCRResult: 空白だけの単語を除いた結果
+        """
+        import numpy as np
+
+        lines = tsv.splitlines()
+        if not lines:
+            return cls.empty()
+        header = lines[0].split("\t")
+        index = {name: header.index(name) for name in TSV_COLUMNS}
+        text_index = index["text"]
+        words: List[str] = []
+        numbers: List[Tuple[int, ...]] = []
+        confidences: List[float] = []
+        for line in lines[1:]:
+            fields = line.split("\t")
+            if len(fields) <= text_index or int(fields[index["level"]]) != WORD_LEVEL:
+                continue
+            text = fields[text_index].strip()
+            if not text:
+                continue
+            words.append(text)
+            numbers.append(tuple(int(fields[index[name]]) for name in
+                                 ("left", "top", "width", "height", "block_num", "par_num", "line_num")))
+            confidences.append(float(fields[index["conf"]]))
+        if not words:
+            return cls.empty()
+        table = np.array(numbers, dtype=np.int32)
+        return cls(words, np.ascontiguousarray(table[:, :4]), np.array(confidences, dtype=np.float32),
+                   np.ascontiguousarray(table[:, 4:]))
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    @property
+    def text(self) -> str:
+        """
+        プレーンテキスト（行内は空白，行は改行，段落・ブロックの間は空行で区切る）
+
+        初回に組み立てた文字列を保持するので，2回目以降は O(1) です．
+        """
+        if self._text is None:
+            parts: List[str] = []
+            previous: Optional[Tuple[int, int, int]] = None
+            for word, key in zip(self.words, map(tuple, self.layout.tolist())):
+                if previous is None:
+                    pass
+                elif key[:2] != previous[:2]:
+                    parts.append("\n\n")
+                elif key != previous:
+                    parts.append("\n")
+                else:
+                    parts.append(" ")
+                parts.append(word)
+                previous = key
+            self._text = "".join(parts)
+        return self._text
+
+    def mean_confidence(self) -> float:
+        """単語の信頼度の平均（単語が無ければ 0）"""
+        return float(self.confidences.mean()) if len(self) else 0.0
+
+    def word_at(self, i: int) -> OCRWord:
+        left, top, width, height = self.boxes[i].tolist()
+        return OCRWord(self.words[i], BoundingBox(left, top, width, height), float(self.confidences[i]))
+
+    def iter_words(self) -> List[OCRWord]:
+        return [self.word_at(i) for i in range(len(self))]
+
+    def _line_ranges(self) -> List[Tuple[int, int]]:
+        """同じ行の単語が連続する範囲 [start, end) の一覧"""
+        import numpy as np
+
+        if not len(self):
+            return []
+        changes = np.flatnonzero(np.any(self.layout[1:] != self.layout[:-1], axis=1)) + 1
+        bounds = [0, *changes.tolist(), len(self)]
+        return list(zip(bounds[:-1], bounds[1:]))
+
+    def lines(self) -> List[OCRLine]:
+        """行ごとのテキスト・外接矩形・平均信頼度"""
+        result = []
+        for start, end in self._line_ranges():
+            boxes = self.boxes[start:end]
+            left = int(boxes[:, 0].min())
+            top = int(boxes[:, 1].min())
+            right = int((boxes[:, 0] + boxes[:, 2]).max())
+            bottom = int((boxes[:, 1] + boxes[:, 3]).max())
+            block_num, par_num, line_num = self.layout[start].tolist()
+            result.append(OCRLine(
+                text=" ".join(self.words[start:end]),
+                box=BoundingBox(left, top, right - left, bottom - top),
+                confidence=float(self.confidences[start:end].mean()),
+                block_num=block_num,
+                par_num=par_num,
+                line_num=line_num,
+            ))
+        return result
+
+    def blocks(self) -> List[OCRBlock]:
+        """ブロックごとの行"""
+        result: List[OCRBlock] = []
+        current: List[OCRLine] = []
+        for line in self.lines():
+            if current and current[0].block_num != line.block_num:
+                result.append(_make_block(current))
+                current = []
+            current.append(line)
+        if current:
+            result.append(_make_block(current))
+        return result
+
+    def filter(self, min_confidence: float) -> "OCRResult":
+        """信頼度が min_confidence 以上の単語だけを残した結果（配列はコピーされる）"""
+        keep = self.confidences >= min_confidence
+        return OCRResult([w for w, k in zip(self.words, keep.tolist()) if k],
+                         self.boxes[keep], self.confidences[keep], self.layout[keep])
+
+    def map_words(self, function: Callable[[str, float], str]) -> "OCRResult":
+        """
+        単語の文字列だけを置き換えた結果（位置・信頼度の配列は共有する）
+
+        Args:
+            function: (単語, 信頼度) -> 新しい単語
+        """
+        words = [function(word, confidence) for word, confidence in zip(self.words, self.confidences.tolist())]
+        return OCRResult(words, self.boxes, self.confidences, self.layout)
+
+
+def _make_block(lines: List[OCRLine]) -> OCRBlock:
+    left = min(line.box.left for line in lines)
+    top = min(line.box.top for line in lines)
+    right = max(line.box.left + line.box.width for line in lines)
+    bottom = max(line.box.top + line.box.height for line in lines)
+    return OCRBlock(lines[0].block_num, BoundingBox(left, top, right - left, bottom - top), tuple(lines))
@@ -0,0 +1,456 @@
+"""
+OCR 後の綴り補正（SymSpell 方式の symmetric delete 索引）
+
+辞書の各単語から最大 max_distance 文字を削除した文字列（delete）を索引にしておき，
+入力語の delete と突き合わせて候補を求め，編集距離で検証します．
+候補の探索は辞書の大きさによらずハッシュ表の参照だけで済むため，辞書にある語の確認は1語あたり十マイクロ秒程度，
+補正が必要な語でも百マイクロ秒台で済みます．
+
+辞書は言語ごとの頻度辞書（1行に "単語 出現回数"）を dictionaries/<言語>.txt に置きます．
+索引は初回にキャッシュディレクトリへバイナリで書き出し，以降は mmap で読み込みます．
+"""
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+import hashlib
+import logging
+import mmap
+import os
+import re
+import struct
+import threading
+import zlib
+
+from models.utils.app_dirs import get_user_cache_dir
+from models.utils.metrics import get_metrics_registry
+from models.utils.tesseract_locator import get_base_dir
+
+logger = logging.getLogger(__name__)
+
+# 辞書ディレクトリを上書きする環境変数
+DICTIONARY_DIR_ENV = "OCRTRANSLATOR_DICTIONARY_DIR"
+DICTIONARY_DIR_NAME = "dictionaries"
+
+DEFAULT_MAX_DISTANCE = 2
+# 単語の先頭 PREFIX_LENGTH 文字だけから delete を作る（索引の大きさを抑える SymSpell の工夫）
+DEFAULT_PREFIX_LENGTH = 7
+# これより短い語は候補が多すぎて誤補正しやすいので補正しない
+MIN_CORRECTABLE_LENGTH = 3
+
+INDEX_MAGIC = b"SYMS"
+INDEX_VERSION = 1
+# magic, version, max_distance, prefix_length, word_count, bucket_count,
+# word_offsets_pos, counts_pos, words_pos, buckets_pos, postings_pos
+_INDEX_HEADER = struct.Struct("<4sIIIQQQQQQQ")
+
+# 単語として補正対象にする文字列（英字と，英字に混ざった数字）
+_TOKEN_PATTERN = re.compile(r"[^\W_]+(?:'[^\W_]+)?")
+
+# OCR で英字と取り違えやすい数字
+_DIGIT_CONFUSIONS = str.maketrans({"0": "o", "1": "l", "5": "s", "8": "b"})
+# 辞書の語にこれを付けただけの語は活用形とみなして補正しない（"saved" を "save" にしない）
+_INFLECTION_SUFFIXES = ("s", "es", "d", "ed", "ing", "er", "ers", "ly")
+# 英字に挟まれた取り違えやすい数字の並び（"W0rld" の 0。"10am" や "5ms" のような数値＋単位は含まない）
+_INNER_DIGITS = re.compile(r"(?<=[^\W\d_])[0158]+(?=[^\W\d_])")
+
+
+def _slot(key: int, mask: int) -> int:
+    # adler32 は短い文字列で下位ビットが偏るので，crc32 側をバケット位置に使う
+    return (key >> 32) & mask
+
+
+def _key(text: str) -> int:
+    """delete 文字列の 64bit キー（プロセスをまたいで同じ値になる。0 は空きバケットを表すので使わない）"""
+    data = text.encode("utf-8")
+    key = (zlib.crc32(data) << 32) | zlib.adler32(data)
+    return key or 1
+
+
+def _delete_levels(word: str, max_distance: int) -> Iterator[set]:
+    """word から 0, 1, ..., max_distance 文字を削除した文字列の集合を，削除数の順に返す"""
+    seen = {word}
+    frontier = {word}
+    yield frontier
+    for _ in range(max_distance):
+        next_frontier = set()
+        for item in frontier:
+            if len(item) <= 1:
+                continue
+            for i in range(len(item)):
+                deleted = item[:i] + item[i + 1:]
+                if deleted not in seen:
+                    next_frontier.add(deleted)
+        seen |= next_frontier
+        frontier = next_frontier
+        yield frontier
+
+
+def _deletes(word: str, max_distance: int) -> set:
+    """word から最大 max_distance 文字を削除した文字列の集合（word 自身を含む）"""
+    return set().union(*_delete_levels(word, max_distance))
+
+
+def damerau_levenshtein(a: str, b: str, limit: int) -> int:
+    """
+    隣接文字の入れ替えを1操作とみなす編集距離（limit を超えたら limit + 1 を返す）
+    """
+    # 共通の先頭・末尾は距離に影響しないので除いてから表を作る
+    start = 0
+    while start < len(a) and start < len(b) and a[start] == b[start]:
+        start += 1
+    end_a, end_b = len(a), len(b)
+    while end_a > start and end_b > start and a[end_a - 1] == b[end_b - 1]:
+        end_a -= 1
+        end_b -= 1
+    a, b = a[start:end_a], b[start:end_b]
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    if not a or not b:
+        return max(len(a), len(b))
+
+    previous_previous: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = i
+        char_a = a[i - 1]
+        for j in range(1, len(b) + 1):
+            value = previous[j - 1] if char_a == b[j - 1] else previous[j - 1] + 1
+            if previous[j] + 1 < value:
+                value = previous[j] + 1
+            if current[j - 1] + 1 < value:
+                value = current[j - 1] + 1
+            if i > 1 and j > 1 and char_a == b[j - 2] and a[i - 2] == b[j - 1] \
+                    and previous_previous[j - 2] + 1 < value:
+                value = previous_previous[j - 2] + 1
+            current[j] = value
+            if value < row_min:
+                row_min = value
+        if row_min > limit:
+            return limit + 1
+        previous_previous, previous = previous, current
+    return previous[-1] if previous[-1] <= limit else limit + 1
+
+
+def load_frequency_dictionary(path: Path) -> Dict[str, int]:
+    """
+    頻度辞書を読み込む
+
+    Args:
+        path (Path): 1行に "単語 出現回数" のテキストファイル（回数が無い行は 1 とみなす）
+
+    Returns:
+        Dict[str, int]: 小文字にした単語 → 出現回数
+    """
+    words: Dict[str, int] = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            parts = line.split()
+            if not parts:
+                continue
+            word = parts[0].lower()
+            count = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else 1
+            words[word] = words.get(word, 0) + count
+    return words
+
+
+def build_index(words: Dict[str, int], path: Path, max_distance: int = DEFAULT_MAX_DISTANCE,
+                prefix_length: int = DEFAULT_PREFIX_LENGTH) -> None:
+    """
+    symmetric delete 索引をバイナリファイルとして書き出す
+
+    ファイルは固定長ヘッダー，単語の表（オフセット・出現回数・UTF-8 文字列），
+    delete キーのオープンアドレス法ハッシュ表，単語番号のポスティングからなり，
+    mmap したまま memoryview で参照できる形にしてあります．
+
+    Args:
+        words (Dict[str, int]): 単語 → 出現回数
+        path (Path): 出力先（一時ファイル経由で置き換える）
+        max_distance (int): 補正できる最大の編集距離
+        prefix_length (int): delete を作る単語の先頭文字数
+    """
+    vocabulary = sorted(words)
+    postings: Dict[int, List[int]] = {}
+    for word_id, word in enumerate(vocabulary):
+        for deleted in _deletes(word[:prefix_length], max_distance):
+            postings.setdefault(_key(deleted), []).append(word_id)
+
+    bucket_count = 1
+    while bucket_count < len(postings) * 2:
+        bucket_count <<= 1
+
+    encoded = [word.encode("utf-8") for word in vocabulary]
+    word_offsets = [0]
+    for data in encoded:
+        word_offsets.append(word_offsets[-1] + len(data))
+
+    buckets = [0] * (bucket_count * 2)
+    posting_values: List[int] = []
+    mask = bucket_count - 1
+    for key, ids in postings.items():
+        slot = _slot(key, mask)
+        while buckets[slot * 2]:
+            slot = (slot + 1) & mask
+        buckets[slot * 2] = key
+        buckets[slot * 2 + 1] = (len(posting_values) << 24) | len(ids)
+        posting_values.extend(ids)
+
+    header_size = _INDEX_HEADER.size
+    word_offsets_pos = header_size
+    counts_pos = word_offsets_pos + 4 * len(word_offsets)
+    counts_pos += -counts_pos % 8
+    buckets_pos = counts_pos + 8 * len(vocabulary)
+    postings_pos = buckets_pos + 16 * bucket_count
+    words_pos = postings_pos + 4 * len(posting_values)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(_INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, max_distance, prefix_length, len(vocabulary),
+                                   bucket_count, word_offsets_pos, counts_pos, words_pos, buckets_pos, postings_pos))
+        f.write(struct.pack(f"<{len(word_offsets)}I", *word_offsets))
+        f.write(b"\0" * (counts_pos - f.tell()))
+        f.write(struct.pack(f"<{len(vocabulary)}Q", *(words[w] for w in vocabulary)))
+        f.write(struct.pack(f"<{len(buckets)}Q", *buckets))
+        f.write(struct.pack(f"<{len(posting_values)}I", *posting_values))
+        f.write(b"".join(encoded))
+    os.replace(tmp_path, path)
+
+
+@dataclass(frozen=True)
+class Suggestion:
+    """補正候補"""
+    term: str
+    distance: int
+    count: int
+
+
+class SymSpellIndex:
+    """
+    mmap した symmetric delete 索引
+
+    ファイル全体を mmap し，各表は memoryview として参照するだけなので，
+    読み込みは索引の大きさによらずほぼ一瞬で，複数プロセスでページキャッシュを共有できます．
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+        (magic, version, self.max_distance, self.prefix_length, word_count, bucket_count,
+         word_offsets_pos, counts_pos, words_pos, buckets_pos, postings_pos) = _INDEX_HEADER.unpack_from(view)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            raise ValueError(f"索引の形式が違います: {self.path}")
+        self.word_count = word_count
+        self._mask = bucket_count - 1
+        self._word_offsets = view[word_offsets_pos:word_offsets_pos + 4 * (word_count + 1)].cast("I")
+        self._counts = view[counts_pos:counts_pos + 8 * word_count].cast("Q")
+        self._buckets = view[buckets_pos:buckets_pos + 16 * bucket_count].cast("Q")
+        self._postings = view[postings_pos:words_pos].cast("I")
+        self._words = view[words_pos:]
+        self._word_cache: Dict[int, str] = {}
+
+    def close(self) -> None:
+        for name in ("_word_offsets", "_counts", "_buckets", "_postings", "_words"):
+            getattr(self, name).release()
+        self._mmap.close()
+
+    def _word(self, word_id: int) -> str:
+        word = self._word_cache.get(word_id)
+        if word is None:
+            word = bytes(self._words[self._word_offsets[word_id]:self._word_offsets[word_id + 1]]).decode("utf-8")
+            self._word_cache[word_id] = word
+        return word
+
+    def _postings_for(self, key: int) -> Iterator[int]:
+        buckets = self._buckets
+        slot = _slot(key, self._mask)
+        while True:
+            stored = buckets[slot * 2]
+            if stored == 0:
+                return
+            if stored == key:
+                value = buckets[slot * 2 + 1]
+                start = value >> 24
+                yield from self._postings[start:start + (value & 0xFFFFFF)]
+                return
+            slot = (slot + 1) & self._mask
+
+    def lookup(self, term: str, max_distance: Optional[int] = None) -> Optional[Suggestion]:
+        """
+        最も近い辞書語を返す（距離が小さく，同じ距離なら出現回数が多いもの）
+
+        Args:
+            term (str): 小文字にした入力語
+            max_distance (Optional[int]): 許す編集距離（索引の max_distance 以下）
+
+        Returns:
+            Optional[Suggestion]: 候補が無ければ None
+        """
+        limit = self.max_distance if max_distance is None else min(max_distance, self.max_distance)
+        candidates: Dict[int, str] = {}
+        # 距離 0, 1, 2 の順に探し，見つかった時点で打ち切る（近い語があれば遠い候補は検証しない）
+        for distance_limit, deletes in enumerate(_delete_levels(term[:self.prefix_length], limit)):
+            for deleted in deletes:
+                for word_id in self._postings_for(_key(deleted)):
+                    if word_id not in candidates:
+                        candidates[word_id] = self._word(word_id)
+            best: Optional[Suggestion] = None
+            for word_id, candidate in candidates.items():
+                if abs(len(candidate) - len(term)) > distance_limit:
+                    continue
+                distance = 0 if candidate == term else damerau_levenshtein(term, candidate, distance_limit)
+                if distance > distance_limit:
+                    continue
+                count = self._counts[word_id]
+                if best is None or (distance, -count) < (best.distance, -best.count):
+                    best = Suggestion(candidate, distance, count)
+            if best is not None:
+                return best
+        return None
+
+
+def _match_case(original: str, corrected: str) -> str:
+    if original.isupper() and len(original) > 1:
+        return corrected.upper()
+    if original[:1].isupper():
+        return corrected[:1].upper() + corrected[1:]
+    return corrected
+
+
+class PostCorrector:
+    """
+    OCR結果の綴り補正
+
+    TesseractOCR からは信頼度の低い単語だけが渡されます．辞書に無い語を対象に，
+    英字に挟まれた数字と英字の取り違えを先に試し，それでも無ければ索引で最も近い語に置き換えます．
+    数字だけの語・短い語・数字を含む語・大文字で始まる語は索引で補正しません．
+    """
+
+    def __init__(self, index: SymSpellIndex):
+        self.index = index
+
+    def correct_word(self, word: str) -> str:
+        """
+        1語を補正する（補正できなければそのまま返す）
+
+        英字に挟まれた数字は英字に戻して辞書にあれば採用します．
+        それ以外で数字を含む語（数値や型番）と，大文字で始まる語（固有名詞の可能性が高い）は索引で補正しません．
+        """
+        if len(word) < MIN_CORRECTABLE_LENGTH or word.isdigit():
+            return word
+        term = word.lower()
+        if any(ch.isdigit() for ch in term):
+            swapped = _INNER_DIGITS.sub(lambda match: match.group(0).translate(_DIGIT_CONFUSIONS), term)
+            if swapped != term and not any(ch.isdigit() for ch in swapped):
+                hit = self.index.lookup(swapped, 0)
+                if hit:
+                    return _match_case(word, hit.term)
+            return word
+        if word[:1].isupper():
+            return word
+        # 短い語ほど誤補正しやすいので許す距離を小さくする
+        limit = 1 if len(term) <= 4 else self.index.max_distance
+        suggestion = self.index.lookup(term, limit)
+        if suggestion is None or suggestion.distance == 0:
+            return word
+        if term.startswith(suggestion.term) and term[len(suggestion.term):] in _INFLECTION_SUFFIXES:
+            return word
+        return _match_case(word, suggestion.term)
+
+    def correct(self, text: str) -> str:
+        """
+        テキスト中の語を補正する（空白・記号・改行はそのまま残す）
+
+        Args:
+            text (str): OCR結果
+
+        Returns:
+            str: 補正後のテキスト
+        """
+        corrected = 0
+
+        def replace(match: "re.Match[str]") -> str:
+            nonlocal corrected
+            word = match.group(0)
+            result = self.correct_word(word)
+            if result != word:
+                corrected += 1
+            return result
+
+        result = _TOKEN_PATTERN.sub(replace, text)
+        if corrected:
+            get_metrics_registry().increment("ocr_postcorrect_words", corrected)
+        return result
+
+
+def find_dictionary(language: str) -> Optional[Path]:
+    """
+    言語の頻度辞書を探す
+
+    OCRTRANSLATOR_DICTIONARY_DIR，プロジェクトの dictionaries/ の順に <言語>.txt を探します．
+
+    Args:
+        language (str): "eng" などの tesseract の言語名
+
+    Returns:
+        Optional[Path]: 見つからなければ None
+    """
+    directories = []
+    if os.environ.get(DICTIONARY_DIR_ENV):
+        directories.append(Path(os.environ[DICTIONARY_DIR_ENV]))
+    base_dir = get_base_dir()
+    directories += [base_dir / DICTIONARY_DIR_NAME, base_dir.parent / DICTIONARY_DIR_NAME]
+    for directory in directories:
+        candidate = directory / f"{language}.txt"
+        if candidate.is_file():
+            return candidate
+    return None
+
+
+def _index_path(dictionary: Path, max_distance: int, prefix_length: int) -> Path:
+    stat = dictionary.stat()
+    signature = hashlib.blake2b(
+        repr((str(dictionary.resolve()), stat.st_mtime_ns, stat.st_size, max_distance, prefix_length,
+              INDEX_VERSION)).encode(),
+        digest_size=8,
+    ).hexdigest()
+    return get_user_cache_dir() / "symspell" / f"{dictionary.stem}-{signature}.idx"
+
+
+_correctors: Dict[Tuple[str, int], Optional[PostCorrector]] = {}
+_correctors_lock = threading.Lock()
+
+
+def get_post_corrector(language: str, max_distance: int = DEFAULT_MAX_DISTANCE) -> Optional[PostCorrector]:
+    """
+    言語ごとのプロセス共有の補正器を取得する
+
+    辞書が無い言語（空白で語を区切らない jpn など）では None を返します．
+    索引が無ければ辞書から作成してキャッシュディレクトリに保存します．
+
+    Args:
+        language (str): "eng" などの tesseract の言語名
+        max_distance (int): 補正できる最大の編集距離
+
+    Returns:
+        Optional[PostCorrector]: 補正器
+    """
+    key = (language, max_distance)
+    with _correctors_lock:
+        if key in _correctors:
+            return _correctors[key]
+        corrector = None
+        dictionary = find_dictionary(language)
+        if dictionary:
+            try:
+                index_path = _index_path(dictionary, max_distance, DEFAULT_PREFIX_LENGTH)
+                if not index_path.exists():
+                    logger.info(f"PostCorrector: 綴り補正の索引を作成しています: {dictionary}")
+                    build_index(load_frequency_dictionary(dictionary), index_path, max_distance, DEFAULT_PREFIX_LENGTH)
+                corrector = PostCorrector(SymSpellIndex(index_path))
+            except (OSError, ValueError) as e:
+                logger.warning(f"PostCorrector: 綴り補正を使えません ({language}): {e}")
+        _correctors[key] = corrector
+        return corrector
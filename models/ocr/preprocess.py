@@ -1,48 +1,130 @@
-from typing import Callable, List, Dict, Any
-import numpy as np
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Callable, List, Dict, Any, Optional
+from functools import partial
 import time
-import cv2
 
+from models.utils.buffer_pool import FrameBufferPool
+from models.utils.cpu_budget import get_cpu_budget
 from models.utils.image_converter import convert_cv2_to_pil
+from models.utils.instrumentation import memory_stage, record_stage
+from models.utils.metrics import get_metrics_registry
+
+if TYPE_CHECKING:
+    # numpy / cv2 は起動時間短縮のため関数内で遅延 import する
+    import numpy as np
+
+def run_pipeline(image: np.ndarray, pool: Optional[FrameBufferPool] = None, scale: float = 1.0,
+                 binarize: bool = False) -> tuple:
+    """
+    画像前処理パイプラインを実行する関数
 
-def run_pipeline(image: np.ndarray) -> tuple:
-    """画像前処理パイプラインを実行する関数"""
-    pipeline = Pipeline()
-    pipeline.add_step("grayscale", apply_grayscale)
-    pipeline.add_step("LIT", apply_lit)
+    pool を渡した場合，途中の配列はプールから借りて使い回す。
+    戻り値の画像がプールの配列であれば，使い終わったら pool.release() で返却する。
+
+    Args:
+        scale (float): 1 以外ならグレースケール化の後に拡大・縮小する
+        binarize (bool): True なら階調変換の後に大津の方法で二値化する
+    """
+    # OpenCV のスレッド数を CPU 配分に合わせる（2回目以降は何もしない）
+    get_cpu_budget().apply()
+    pipeline = Pipeline(pool=pool)
+    pipeline.add_step("grayscale", partial(apply_grayscale, pool=pool))
+    if scale != 1.0:
+        pipeline.add_step("resize", partial(apply_resize, scale=scale, pool=pool))
+    pipeline.add_step("LIT", partial(apply_lit, pool=pool))
+    if binarize:
+        pipeline.add_step("binarize", partial(apply_binarize, pool=pool))
     pipeline.add_step("convert_cv2_to_pil", convert_cv2_to_pil)
     return pipeline.execute(image=image)
 
-def apply_grayscale(image: np.ndarray) -> np.ndarray:
+def apply_grayscale(image: np.ndarray, pool: Optional[FrameBufferPool] = None) -> np.ndarray:
     """画像をグレイスケール化
 
     Args:
         image (np.ndarray): 入力画像
+        pool (Optional[FrameBufferPool]): 出力配列を借りるバッファプール
 
     Returns:
         np.ndarray: グレースケール画像
     """
-    return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    import cv2
 
-def apply_lit(image: np.ndarray, alpha: float = 1, beta: float = 0) -> np.ndarray:
+    out = pool.acquire(image.shape[:2], image.dtype) if pool else None
+    return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY, dst=out)
+
+def apply_lit(image: np.ndarray, alpha: float = 1, beta: float = 0, pool: Optional[FrameBufferPool] = None) -> np.ndarray:
     """線形階調変換を画像に適用
 
     Args:
         image (np.ndarray): 入力画像
         alpha (float): コントラスト調整係数 (default: 1)
         beta (float): 明るさ調整係数 (default: 0)
+        pool (Optional[FrameBufferPool]): 出力配列を借りるバッファプール
 
     Returns:
         np.ndarray: 階調変換後の画像
     """
-    look_up_table = alpha * np.arange(256) + beta
-    look_up_table = np.clip(look_up_table, 0, 255).astype(np.uint8)
-    return cv2.LUT(image, look_up_table)
+    import cv2
+    import numpy as np
+
+    look_up_table = _lookup_table(alpha, beta)
+    out = pool.acquire(image.shape, np.uint8) if pool else None
+    return cv2.LUT(image, look_up_table, dst=out)
+
+def apply_resize(image: np.ndarray, scale: float, pool: Optional[FrameBufferPool] = None) -> np.ndarray:
+    """画像を拡大・縮小
+
+    Args:
+        image (np.ndarray): 入力画像
+        scale (float): 倍率（縮小は INTER_AREA，拡大は INTER_CUBIC で補間する）
+        pool (Optional[FrameBufferPool]): 出力配列を借りるバッファプール
+
+    Returns:
+        np.ndarray: 拡大・縮小後の画像
+    """
+    import cv2
+
+    height, width = image.shape[:2]
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    out = pool.acquire((size[1], size[0]) + image.shape[2:], image.dtype) if pool else None
+    interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_CUBIC
+    return cv2.resize(image, size, dst=out, interpolation=interpolation)
+
+def apply_binarize(image: np.ndarray, pool: Optional[FrameBufferPool] = None) -> np.ndarray:
+    """グレースケール画像を大津の方法で二値化
+
+    Args:
+        image (np.ndarray): グレースケール画像
+        pool (Optional[FrameBufferPool]): 出力配列を借りるバッファプール
+
+    Returns:
+        np.ndarray: 二値画像
+    """
+    import cv2
+
+    out = pool.acquire(image.shape, image.dtype) if pool else None
+    _, binary = cv2.threshold(image, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU, dst=out)
+    return binary
+
+_lookup_tables: Dict[tuple, Any] = {}
+
+def _lookup_table(alpha: float, beta: float) -> np.ndarray:
+    """線形階調変換のルックアップテーブルを (alpha, beta) ごとに一度だけ作る"""
+    import numpy as np
+
+    table = _lookup_tables.get((alpha, beta))
+    if table is None:
+        table = np.clip(alpha * np.arange(256) + beta, 0, 255).astype(np.uint8)
+        _lookup_tables[(alpha, beta)] = table
+    return table
 
 
 class Pipeline:
-    def __init__(self):
+    def __init__(self, pool: Optional[FrameBufferPool] = None):
         self.steps: List[Dict[str, Any]] = []
+        # 途中の画像をプールから借りている場合，次のステップが終わった時点で返却する
+        self.pool = pool
 
     def add_step(self, name: str, function: Callable):
         self.steps.append({"name": name, "function": function})
@@ -50,18 +132,30 @@ class Pipeline:
     def execute(self, image: np.ndarray):
 
         log = []
-        current_image = image.copy()
+        metrics = get_metrics_registry()
+        if self.pool:
+            current_image = self.pool.acquire(image.shape, image.dtype)
+            current_image[...] = image
+        else:
+            current_image = image.copy()
 
         for step in self.steps:
-            t0 = time.time()
+            t0 = time.perf_counter()
             try:
-                current_image = step["function"](current_image)
+                previous_image = current_image
+                with memory_stage(f"preprocess_{step['name']}"):
+                    current_image = step["function"](current_image)
+                if self.pool and current_image is not previous_image:
+                    self.pool.release(previous_image)
+                elapsed = time.perf_counter() - t0
+                record_stage(f"preprocess_{step['name']}", t0, elapsed)
                 log.append({
                     "step": step["name"],
                     "status": "success",
-                    "time": time.time() - t0
+                    "time": elapsed
                 })
             except Exception as e:
+                metrics.increment(f"preprocess_{step['name']}_errors")
                 log.append({
                     "step": step["name"],
                     "status": "failed",
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Dict, Set
+from pathlib import Path
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# tesseract OSD が返すスクリプト名 → 使用する traineddata
+SCRIPT_TO_LANGUAGE: Dict[str, str] = {
+    "Latin": "eng",
+    "Japanese": "jpn",
+    "Hiragana": "jpn",
+    "Katakana": "jpn",
+    "Han": "chi_sim",
+    "HanS": "chi_sim",
+    "HanT": "chi_tra",
+    "Hangul": "kor",
+    "Cyrillic": "rus",
+    "Greek": "ell",
+    "Arabic": "ara",
+    "Hebrew": "heb",
+    "Thai": "tha",
+    "Devanagari": "hin",
+}
+
+# レイテンシ優先度 → 優先して使う tessdata ディレクトリ名（見つからなければ通常の tessdata）
+TESSDATA_VARIANTS: Dict[str, str | None] = {
+    "fast": "tessdata_fast",
+    "balanced": None,
+    "accurate": "tessdata_best",
+}
+
+OSD_LANGUAGE = "osd"
+
+
+def available_languages(tessdata_dir: Path | None) -> Set[str]:
+    """
+    tessdata ディレクトリに配置されている traineddata の言語名一覧を返す
+
+    Args:
+        tessdata_dir (Path | None): tessdata ディレクトリ
+
+    Returns:
+        Set[str]: "eng" や "jpn" などの言語名
+    """
+    if not tessdata_dir or not tessdata_dir.is_dir():
+        return set()
+    return {p.stem for p in tessdata_dir.glob("*.traineddata")}
+
+
+def resolve_tessdata_dir(tessdata_dir: Path | None, language: str, latency_preference: str = "balanced") -> Path | None:
+    """
+    レイテンシ優先度に応じて tessdata_fast / tessdata_best / tessdata を選ぶ
+
+    tessdata_fast と tessdata_best は tessdata と同じ階層（tesseract_bin/<os>/）に置く想定です．
+    優先する変種に language の traineddata が揃っていなければ通常の tessdata を使います．
+
+    Args:
+        tessdata_dir (Path | None): 通常の tessdata ディレクトリ
+        language (str): "eng" や "eng+jpn" などの言語指定
+        latency_preference (str): "fast" / "balanced" / "accurate"
+
+    Returns:
+        Path | None: 使用する tessdata ディレクトリ
+    """
+    if latency_preference not in TESSDATA_VARIANTS:
+        raise ValueError(f"サポートされていないレイテンシ優先度です: {latency_preference}")
+
+    variant = TESSDATA_VARIANTS[latency_preference]
+    if tessdata_dir and variant:
+        candidate = tessdata_dir.parent / variant
+        if set(language.split("+")) <= available_languages(candidate):
+            return candidate
+    return tessdata_dir
+
+
+def detect_script(image: np.ndarray, tessdata_dir: Path | None = None) -> str | None:
+    """
+    tesseract の OSD（--psm 0）で画像の文字体系を判定する
+
+    osd.traineddata が無い場合や文字が少なすぎて判定できない場合は None を返します．
+
+    Args:
+        image (np.ndarray): 入力画像
+        tessdata_dir (Path | None): osd.traineddata を含む tessdata ディレクトリ
+
+    Returns:
+        str | None: "Latin" や "Japanese" などのスクリプト名
+    """
+    import pytesseract
+
+    config = "--psm 0"
+    if tessdata_dir:
+        config += f' --tessdata-dir "{tessdata_dir}"'
+    try:
+        osd = pytesseract.image_to_osd(image, config=config, output_type=pytesseract.Output.DICT)
+    except Exception:
+        return None
+    return osd.get("script") or None
@@ -0,0 +1,301 @@
+"""
+用語集（製品名・UI ラベルなどの固定訳）の適用
+
+用語集は翻訳先言語ごとに glossaries/<翻訳先言語>.tsv に置き，1行に "用語<TAB>訳語" を書きます．
+訳語を省いた行の用語は翻訳せず原文のまま残します．
+用語集は Aho-Corasick オートマトンにまとめるので，用語の数によらず原文を1回なぞるだけで全ての用語が見つかります．
+オートマトンはファイルの更新時刻と大きさが変わったときだけ作り直します．
+
+翻訳エンジンに渡す前に，用語を置き換えます．
+    - protect: 用語を ⟦番号⟧ の目印に置き換えて翻訳させ，訳文の目印を用語集の訳語に戻す
+    - substitute: 用語を訳語に置き換えてから翻訳させる
+用語以外に文字が無い文（ラベルだけのキャプチャなど）は翻訳エンジンを呼ばずに訳語をそのまま返します．
+"""
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+import logging
+import os
+import re
+import threading
+
+from models.utils.tesseract_locator import get_base_dir
+
+logger = logging.getLogger(__name__)
+
+# 用語集ディレクトリを上書きする環境変数
+GLOSSARY_DIR_ENV = "OCRTRANSLATOR_GLOSSARY_DIR"
+GLOSSARY_DIR_NAME = "glossaries"
+
+GLOSSARY_PROTECT = "protect"
+GLOSSARY_SUBSTITUTE = "substitute"
+GLOSSARY_OFF = "off"
+GLOSSARY_MODES = (GLOSSARY_PROTECT, GLOSSARY_SUBSTITUTE, GLOSSARY_OFF)
+
+# 翻訳後の目印（翻訳エンジンが空白を足しても戻せるようにする）
+_PLACEHOLDER = "⟦{}⟧"
+_PLACEHOLDER_PATTERN = re.compile(r"⟦\s*(\d+)\s*⟧")
+
+
+@dataclass(frozen=True)
+class GlossaryMatch:
+    """原文中の用語の位置"""
+    start: int
+    end: int
+    term: str
+    translation: str
+
+
+def _is_word_char(char: str) -> bool:
+    # 英数字どうしが続く位置だけを語の途中とみなす（日本語などは語の境界を判定しない）
+    return char.isascii() and char.isalnum()
+
+
+class AhoCorasick:
+    """
+    Aho-Corasick オートマトン
+
+    ノードごとの遷移 dict，失敗リンク，そのノードで終わる最長の用語と，
+    失敗リンクをたどって次に用語が終わるノード（出力リンク）を持ちます．
+    """
+
+    def __init__(self, terms: List[str]):
+        self.terms = terms
+        self._goto: List[Dict[str, int]] = [{}]
+        self._output: List[int] = [-1]
+        for term_id, term in enumerate(terms):
+            node = 0
+            for char in term:
+                next_node = self._goto[node].get(char)
+                if next_node is None:
+                    next_node = len(self._goto)
+                    self._goto[node][char] = next_node
+                    self._goto.append({})
+                    self._output.append(-1)
+                node = next_node
+            self._output[node] = term_id
+
+        self._fail = [0] * len(self._goto)
+        self._output_link = [-1] * len(self._goto)
+        queue = list(self._goto[0].values())
+        for node in queue:
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail_child = self._goto[fail].get(char, 0)
+                self._fail[child] = fail_child if fail_child != child else 0
+                target = self._fail[child]
+                self._output_link[child] = target if self._output[target] >= 0 else self._output_link[target]
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int, int]]:
+        """
+        text 中の全ての用語の出現を返す（重なりも含む）
+
+        Yields:
+            Tuple[int, int, int]: (開始位置, 終了位置, 用語番号)
+        """
+        goto, fail, output, output_link, terms = self._goto, self._fail, self._output, self._output_link, self.terms
+        node = 0
+        for index, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            match = node if output[node] >= 0 else output_link[node]
+            while match >= 0:
+                term_id = output[match]
+                yield index + 1 - len(terms[term_id]), index + 1, term_id
+                match = output_link[match]
+
+
+class Glossary:
+    """用語集（用語 → 訳語）と，それをまとめたオートマトン"""
+
+    def __init__(self, entries: Dict[str, str]):
+        self.entries = entries
+        self._terms = list(entries)
+        self._automaton = AhoCorasick(self._terms)
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    def find(self, text: str) -> List[GlossaryMatch]:
+        """
+        text 中の用語を，重ならないように左から最長一致で選んで返す
+
+        英数字で始まる・終わる用語は，前後に英数字が続く位置（語の途中）では一致とみなしません．
+
+        Returns:
+            List[GlossaryMatch]: 出現順の一致
+        """
+        candidates = []
+        for start, end, term_id in self._automaton.iter_matches(text):
+            term = self._terms[term_id]
+            if start > 0 and _is_word_char(term[0]) and _is_word_char(text[start - 1]):
+                continue
+            if end < len(text) and _is_word_char(term[-1]) and _is_word_char(text[end]):
+                continue
+            candidates.append((start, -end, term))
+        matches = []
+        position = 0
+        for start, negative_end, term in sorted(candidates):
+            if start >= position:
+                matches.append(GlossaryMatch(start, -negative_end, term, self.entries[term]))
+                position = -negative_end
+        return matches
+
+
+@dataclass
+class GlossaryRequest:
+    """用語を置き換えた翻訳の依頼"""
+    text: str                         # 翻訳エンジンに渡す文（用語は目印か訳語に置き換え済み）
+    placeholders: List[str]           # protect で ⟦番号⟧ に戻す訳語
+    glossary_only: bool               # 用語以外に文字が無い（翻訳エンジンを呼ばずに text を返せる）
+    matches: int
+
+
+def prepare(glossary: Glossary, text: str, mode: str) -> GlossaryRequest:
+    """
+    原文の用語を置き換えて翻訳の依頼を作る
+
+    Args:
+        glossary (Glossary): 用語集
+        text (str): 原文
+        mode (str): GLOSSARY_PROTECT / GLOSSARY_SUBSTITUTE
+
+    Returns:
+        GlossaryRequest: 翻訳エンジンに渡す文と，訳文を戻すための情報
+    """
+    matches = glossary.find(text)
+    if not matches:
+        return GlossaryRequest(text, [], False, 0)
+    pieces: List[str] = []
+    substituted: List[str] = []
+    placeholders: List[str] = []
+    position = 0
+    for match in matches:
+        pieces.append(text[position:match.start])
+        substituted.append(text[position:match.start])
+        pieces.append(_PLACEHOLDER.format(len(placeholders)))
+        substituted.append(match.translation)
+        placeholders.append(match.translation)
+        position = match.end
+    pieces.append(text[position:])
+    substituted.append(text[position:])
+
+    # 用語の間に文字（数字や記号以外）が残っていなければ翻訳は要らない
+    remainder = "".join(text[start:end] for start, end in _gaps(matches, len(text)))
+    if not any(char.isalpha() for char in remainder):
+        return GlossaryRequest("".join(substituted), [], True, len(matches))
+    if mode == GLOSSARY_SUBSTITUTE:
+        return GlossaryRequest("".join(substituted), [], False, len(matches))
+    return GlossaryRequest("".join(pieces), placeholders, False, len(matches))
+
+
+def _gaps(matches: List[GlossaryMatch], length: int) -> Iterator[Tuple[int, int]]:
+    position = 0
+    for match in matches:
+        yield position, match.start
+        position = match.end
+    yield position, length
+
+
+def restore(request: GlossaryRequest, translated: str) -> Tuple[str, int]:
+    """
+    訳文の目印を用語集の訳語に戻す
+
+    Returns:
+        Tuple[str, int]: (訳文, 翻訳エンジンが崩して戻せなかった目印の数)
+    """
+    if not request.placeholders:
+        return translated, 0
+    restored = set()
+
+    def replace(match: "re.Match[str]") -> str:
+        number = int(match.group(1))
+        if number >= len(request.placeholders):
+            return match.group(0)
+        restored.add(number)
+        return request.placeholders[number]
+
+    return _PLACEHOLDER_PATTERN.sub(replace, translated), len(request.placeholders) - len(restored)
+
+
+def load_glossary_source(path: Path) -> Dict[str, str]:
+    """
+    用語集を読み込む
+
+    Args:
+        path (Path): 1行に "用語<TAB>訳語"（訳語を省くと原文のまま残す）のテキストファイル。# で始まる行は無視する
+
+    Returns:
+        Dict[str, str]: 用語 → 訳語
+    """
+    entries: Dict[str, str] = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip() or line.startswith("#"):
+                continue
+            term, _, translation = line.rstrip("\r\n").partition("\t")
+            term = term.strip()
+            if term and term not in entries:
+                entries[term] = translation.strip() or term
+    return entries
+
+
+def find_glossary_file(target_language: str) -> Optional[Path]:
+    """
+    翻訳先言語の用語集を探す
+
+    OCRTRANSLATOR_GLOSSARY_DIR，プロジェクトの glossaries/ の順に <翻訳先言語>.tsv を探します．
+
+    Returns:
+        Optional[Path]: 見つからなければ None
+    """
+    directories = []
+    if os.environ.get(GLOSSARY_DIR_ENV):
+        directories.append(Path(os.environ[GLOSSARY_DIR_ENV]))
+    base_dir = get_base_dir()
+    directories += [base_dir / GLOSSARY_DIR_NAME, base_dir.parent / GLOSSARY_DIR_NAME]
+    for directory in directories:
+        candidate = directory / f"{target_language}.tsv"
+        if candidate.is_file():
+            return candidate
+    return None
+
+
+# 翻訳先言語 → (用語集ファイル, (更新時刻, 大きさ), 用語集)
+_glossaries: Dict[str, Tuple[Optional[Path], Optional[Tuple[int, int]], Optional[Glossary]]] = {}
+_glossaries_lock = threading.Lock()
+
+
+def get_glossary(target_language: str) -> Optional[Glossary]:
+    """
+    翻訳先言語ごとのプロセス共有の用語集を取得する
+
+    呼ばれるたびにファイルの更新時刻と大きさだけを確かめ，変わっていればオートマトンを作り直します．
+
+    Returns:
+        Optional[Glossary]: 用語集が無い・空・読めない場合は None
+    """
+    path = find_glossary_file(target_language)
+    try:
+        stat = path.stat() if path else None
+    except OSError:
+        stat = None
+    signature = (stat.st_mtime_ns, stat.st_size) if stat else None
+    with _glossaries_lock:
+        cached = _glossaries.get(target_language)
+        if cached and cached[0] == path and cached[1] == signature:
+            return cached[2]
+        glossary = None
+        if path and signature:
+            try:
+                entries = load_glossary_source(path)
+                glossary = Glossary(entries) if entries else None
+                logger.info(f"Glossary: 用語集を読み込みました: {path} ({len(entries)} 語)")
+            except (OSError, ValueError) as e:
+                logger.warning(f"Glossary: 用語集を使えません ({target_language}): {e}")
+        _glossaries[target_language] = (path, signature, glossary)
+        return glossary
@@ -0,0 +1,344 @@
+"""
+オフラインの対訳辞書による語句の置き換え翻訳（Lexicon エンジン）
+
+対訳辞書は言語の組ごとに，1行に "見出し語<TAB>訳語" のテキスト（lexicons/<元言語>-<翻訳先言語>.tsv）を用意し，
+事前に `python -m models.translator.lexicon 辞書.tsv 出力.lex` でバイナリ（.lex）に変換しておきます．
+.lex は見出し語を UTF-8 のバイト順に並べた表とオフセット表からなり，mmap したまま二分探索するので，
+読み込みは辞書の大きさによらず一瞬で，複数プロセスでページキャッシュを共有できます．
+.tsv しか無い場合は初回にキャッシュディレクトリへ変換します．
+
+文脈を考えた翻訳ではなく，複数語の成句を最長一致で優先しながら語ごとに訳語へ置き換えるだけですが，
+通信せずに1ミリ秒未満で結果を返せるため，オンラインの翻訳エンジンが使えないときの代わりに使います．
+"""
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import argparse
+import bisect
+import hashlib
+import logging
+import mmap
+import os
+import re
+import struct
+import sys
+import threading
+
+from models.utils.app_dirs import get_user_cache_dir
+from models.utils.tesseract_locator import get_base_dir
+
+logger = logging.getLogger(__name__)
+
+# 対訳辞書ディレクトリを上書きする環境変数
+LEXICON_DIR_ENV = "OCRTRANSLATOR_LEXICON_DIR"
+LEXICON_DIR_NAME = "lexicons"
+
+LEXICON_MAGIC = b"LEXI"
+LEXICON_VERSION = 1
+# magic, version, max_phrase_words, entry_count, key_offsets_pos, value_offsets_pos, keys_pos, values_pos
+_LEXICON_HEADER = struct.Struct("<4sIIQQQQQ")
+
+# 訳語を空白で区切らずにつなげる翻訳先言語
+UNSPACED_LANGUAGES = frozenset({"ja", "zh-cn", "zh-tw", "zh"})
+
+# 語（英字・数字と，語中のアポストロフィ・ハイフン）と，それ以外の文字の並び
+_TOKEN_PATTERN = re.compile(r"[^\W_]+(?:['\-][^\W_]+)*|[^\w\s]+|\s+")
+
+
+def _normalize(phrase: str) -> str:
+    """見出し語の正規化（小文字にして空白を1つにまとめる）"""
+    return " ".join(phrase.lower().split())
+
+
+def load_lexicon_source(path: Path) -> Dict[str, str]:
+    """
+    テキストの対訳辞書を読み込む
+
+    Args:
+        path (Path): 1行に "見出し語<TAB>訳語" のテキストファイル（# で始まる行は無視する）
+
+    Returns:
+        Dict[str, str]: 正規化した見出し語 → 訳語（同じ見出し語は最初の行を使う）
+    """
+    entries: Dict[str, str] = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip() or line.startswith("#"):
+                continue
+            key, _, value = line.rstrip("\r\n").partition("\t")
+            key = _normalize(key)
+            value = value.strip()
+            if key and value and key not in entries:
+                entries[key] = value
+    return entries
+
+
+def build_lexicon(entries: Dict[str, str], path: Path) -> None:
+    """
+    対訳辞書をバイナリファイルとして書き出す
+
+    ファイルは固定長ヘッダー，見出し語と訳語それぞれのオフセット表（uint32），
+    バイト順に並べた見出し語の UTF-8 列，訳語の UTF-8 列からなります．
+
+    Args:
+        entries (Dict[str, str]): 正規化した見出し語 → 訳語
+        path (Path): 出力先（一時ファイル経由で置き換える）
+    """
+    encoded = sorted((key.encode("utf-8"), value.encode("utf-8")) for key, value in entries.items())
+    max_phrase_words = max((key.count(b" ") + 1 for key, _ in encoded), default=1)
+
+    key_offsets = [0]
+    value_offsets = [0]
+    for key, value in encoded:
+        key_offsets.append(key_offsets[-1] + len(key))
+        value_offsets.append(value_offsets[-1] + len(value))
+    if key_offsets[-1] > 0xFFFFFFFF or value_offsets[-1] > 0xFFFFFFFF:
+        raise ValueError("対訳辞書が大きすぎます（4GiB まで）")
+
+    key_offsets_pos = _LEXICON_HEADER.size
+    value_offsets_pos = key_offsets_pos + 4 * len(key_offsets)
+    keys_pos = value_offsets_pos + 4 * len(value_offsets)
+    values_pos = keys_pos + key_offsets[-1]
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(_LEXICON_HEADER.pack(LEXICON_MAGIC, LEXICON_VERSION, max_phrase_words, len(encoded),
+                                     key_offsets_pos, value_offsets_pos, keys_pos, values_pos))
+        f.write(struct.pack(f"<{len(key_offsets)}I", *key_offsets))
+        f.write(struct.pack(f"<{len(value_offsets)}I", *value_offsets))
+        f.write(b"".join(key for key, _ in encoded))
+        f.write(b"".join(value for _, value in encoded))
+    os.replace(tmp_path, path)
+
+
+class _Keys:
+    """mmap した見出し語の列を bisect で探せるようにする読み取り専用のシーケンス"""
+
+    def __init__(self, offsets: memoryview, data: memoryview):
+        self._offsets = offsets
+        self._data = data
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index: int) -> bytes:
+        return self._data[self._offsets[index]:self._offsets[index + 1]].tobytes()
+
+
+class Lexicon:
+    """
+    mmap した対訳辞書
+
+    見出し語の検索はオフセット表上の二分探索で，比較のたびに見出し語1つ分だけを読みます．
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+        (magic, version, self.max_phrase_words, entry_count, key_offsets_pos, value_offsets_pos,
+         keys_pos, values_pos) = _LEXICON_HEADER.unpack_from(view)
+        if magic != LEXICON_MAGIC or version != LEXICON_VERSION:
+            raise ValueError(f"対訳辞書の形式が違います: {self.path}")
+        self.entry_count = entry_count
+        self._key_offsets = view[key_offsets_pos:key_offsets_pos + 4 * (entry_count + 1)].cast("I")
+        self._value_offsets = view[value_offsets_pos:value_offsets_pos + 4 * (entry_count + 1)].cast("I")
+        self._key_data = view[keys_pos:values_pos]
+        self._value_data = view[values_pos:]
+        self._keys = _Keys(self._key_offsets, self._key_data)
+
+    def close(self) -> None:
+        for name in ("_key_offsets", "_value_offsets", "_key_data", "_value_data"):
+            getattr(self, name).release()
+        self._mmap.close()
+
+    def lookup(self, phrase: str) -> Optional[str]:
+        """
+        見出し語の訳語を返す
+
+        Args:
+            phrase (str): 正規化した見出し語
+
+        Returns:
+            Optional[str]: 辞書に無ければ None
+        """
+        key = phrase.encode("utf-8")
+        index = bisect.bisect_left(self._keys, key)
+        if index == self.entry_count or self._keys[index] != key:
+            return None
+        return self._value_data[self._value_offsets[index]:self._value_offsets[index + 1]].tobytes().decode("utf-8")
+
+    def gloss(self, text: str, joiner: str = " ") -> Tuple[str, int]:
+        """
+        テキストの語句を訳語に置き換える
+
+        語の並びごとに max_phrase_words 語からの最長一致で辞書を引き，見つからない語は原文のまま残します．
+        改行・空白・記号は原文のまま残し，訳語どうしの間の空白だけを joiner に置き換えます．
+
+        Args:
+            text (str): 原文
+            joiner (str): 訳語どうしの区切り（日本語など空白で区切らない言語では ""）
+
+        Returns:
+            Tuple[str, int]: (置き換えたテキスト, 辞書で置き換えた語の数)
+        """
+        lines = []
+        matched = 0
+        for line in text.splitlines():
+            pieces, line_matched = self._gloss_line(line, joiner)
+            lines.append(pieces)
+            matched += line_matched
+        return "\n".join(lines), matched
+
+    def _gloss_line(self, line: str, joiner: str) -> Tuple[str, int]:
+        tokens = _TOKEN_PATTERN.findall(line)
+        # (文字列, 訳語か) の列。空白は原文のまま残し，訳語どうしの間の空白だけを joiner にする
+        output: List[Tuple[str, bool]] = []
+        matched = 0
+        i = 0
+        while i < len(tokens):
+            if not tokens[i][0].isalnum():
+                output.append((tokens[i], False))
+                i += 1
+                continue
+            # 空白だけを挟んで続く語（記号はまたがない）を集め，長い成句から順に引く
+            words = [i]
+            j = i + 1
+            while len(words) < self.max_phrase_words and j + 1 < len(tokens) \
+                    and tokens[j].isspace() and tokens[j + 1][0].isalnum():
+                words.append(j + 1)
+                j += 2
+            translation = None
+            for count in range(len(words), 0, -1):
+                translation = self.lookup(_normalize(" ".join(tokens[k] for k in words[:count])))
+                if translation is not None:
+                    break
+            if translation is None:
+                output.append((tokens[i], False))
+                i += 1
+            else:
+                output.append((translation, True))
+                matched += count
+                i = words[count - 1] + 1
+        return _join_tokens(output, joiner), matched
+
+
+def _join_tokens(tokens: List[Tuple[str, bool]], joiner: str) -> str:
+    """(文字列, 訳語か) の列をつなげる（訳語に挟まれた空白は joiner に置き換える）"""
+    pieces = []
+    for index, (token, translated) in enumerate(tokens):
+        if token.isspace() and 0 < index < len(tokens) - 1 and tokens[index - 1][1] and tokens[index + 1][1]:
+            token = joiner
+        pieces.append(token)
+    return "".join(pieces)
+
+
+def _lexicon_directories() -> List[Path]:
+    directories = []
+    if os.environ.get(LEXICON_DIR_ENV):
+        directories.append(Path(os.environ[LEXICON_DIR_ENV]))
+    base_dir = get_base_dir()
+    return directories + [base_dir / LEXICON_DIR_NAME, base_dir.parent / LEXICON_DIR_NAME]
+
+
+def find_lexicon_source(source_language: str, target_language: str) -> Optional[Path]:
+    """
+    言語の組の対訳辞書（.lex，無ければ .tsv）を探す
+
+    OCRTRANSLATOR_LEXICON_DIR，プロジェクトの lexicons/ の順に <元言語>-<翻訳先言語>.lex / .tsv を探します．
+
+    Args:
+        source_language (str): "en" などの元言語
+        target_language (str): "ja" などの翻訳先言語
+
+    Returns:
+        Optional[Path]: 見つからなければ None
+    """
+    for suffix in (".lex", ".tsv"):
+        for directory in _lexicon_directories():
+            candidate = directory / f"{source_language}-{target_language}{suffix}"
+            if candidate.is_file():
+                return candidate
+    return None
+
+
+def available_source_languages(target_language: str) -> List[str]:
+    """翻訳先言語への対訳辞書がある元言語の一覧"""
+    languages = set()
+    for directory in _lexicon_directories():
+        if not directory.is_dir():
+            continue
+        for path in directory.iterdir():
+            source, _, target = path.stem.partition("-")
+            if target == target_language and path.suffix in (".lex", ".tsv"):
+                languages.add(source)
+    return sorted(languages)
+
+
+def _compiled_path(source: Path) -> Path:
+    stat = source.stat()
+    signature = hashlib.blake2b(
+        repr((str(source.resolve()), stat.st_mtime_ns, stat.st_size, LEXICON_VERSION)).encode(),
+        digest_size=8,
+    ).hexdigest()
+    return get_user_cache_dir() / "lexicon" / f"{source.stem}-{signature}.lex"
+
+
+_lexicons: Dict[Tuple[str, str], Optional[Lexicon]] = {}
+_lexicons_lock = threading.Lock()
+
+
+def get_lexicon(source_language: str, target_language: str) -> Optional[Lexicon]:
+    """
+    言語の組ごとのプロセス共有の対訳辞書を取得する
+
+    .tsv しか無ければキャッシュディレクトリに .lex を作成して使います．
+
+    Returns:
+        Optional[Lexicon]: 対訳辞書が無い・読めない場合は None
+    """
+    key = (source_language, target_language)
+    with _lexicons_lock:
+        if key in _lexicons:
+            return _lexicons[key]
+        lexicon = None
+        source = find_lexicon_source(source_language, target_language)
+        if source:
+            try:
+                path = source
+                if source.suffix == ".tsv":
+                    path = _compiled_path(source)
+                    if not path.exists():
+                        logger.info(f"Lexicon: 対訳辞書を変換しています: {source}")
+                        build_lexicon(load_lexicon_source(source), path)
+                lexicon = Lexicon(path)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Lexicon: 対訳辞書を使えません ({source_language}-{target_language}): {e}")
+        _lexicons[key] = lexicon
+        return lexicon
+
+
+def has_lexicon(target_language: str, source_language: str = "auto") -> bool:
+    """翻訳先言語（と元言語）の対訳辞書があるか"""
+    if source_language == "auto":
+        return bool(available_source_languages(target_language))
+    return find_lexicon_source(source_language, target_language) is not None
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="テキストの対訳辞書（見出し語<TAB>訳語）を .lex に変換する")
+    parser.add_argument("source", help="対訳辞書のテキストファイル（lexicons/<元言語>-<翻訳先言語>.tsv）")
+    parser.add_argument("output", nargs="?", default=None, help="出力先（省略時は同じ場所の .lex）")
+    args = parser.parse_args(argv)
+
+    source = Path(args.source)
+    output = Path(args.output) if args.output else source.with_suffix(".lex")
+    entries = load_lexicon_source(source)
+    build_lexicon(entries, output)
+    print(f"{output}: {len(entries)} 語")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,19 @@
-from typing import Optional, List, Protocol
+from typing import Callable, Optional, List, Protocol, Sequence
 from abc import abstractmethod
 from dataclasses import dataclass
-from googletrans import Translator
-from langdetect import detect
+import asyncio
+import re
+
+from models.translator.glossary import (
+    GLOSSARY_OFF, GLOSSARY_PROTECT, GLOSSARY_SUBSTITUTE, Glossary, get_glossary, prepare, restore,
+)
+from models.translator.lexicon import UNSPACED_LANGUAGES, available_source_languages, get_lexicon
+from models.utils.instrumentation import stage
+from models.utils.metrics import get_metrics_registry
+
+# 複数の文を1回で翻訳するときに挟む区切り（記号だけの行は翻訳後もそのまま残る）
+SEGMENT_SEPARATOR = "\n|||\n"
+_SEGMENT_SPLIT = re.compile(r"\s*\|\|\|\s*")
 
 class TranslationError(Exception):
     """翻訳例外クラス"""
@@ -12,6 +23,10 @@ class TranslationConfig:
     """翻訳設定クラス"""
     source_language: str = "auto"
     target_language: str = "ja"
+    # 翻訳APIの接続先の上書き（"http://127.0.0.1:8765" など。負荷試験用のモックサーバー向け）
+    service_endpoint: Optional[str] = None
+    # 用語集（glossaries/<翻訳先言語>.tsv）の適用方法: "protect" / "substitute" / "off"
+    glossary_mode: str = GLOSSARY_PROTECT
 
 class ITranslator(Protocol):
     """翻訳エンジン インターフェース"""
@@ -61,29 +76,228 @@ class GoogleTranslator(ITranslator):
             if not text or not text.strip():
                 return ""
 
-            translator = Translator()
+            from googletrans import Translator
+            from langdetect import detect
+
+            # raise_exception=True: 429 などの応答を原文のまま成功扱いにせず例外にする
+            with stage("translation_google_client"):
+                translator = Translator(raise_exception=True)
+                if self.config.service_endpoint:
+                    # 元のクライアントは閉じてから差し替える（トークン取得も同じクライアントを使う）
+                    default_client = translator.client
+                    translator.client = _create_redirected_client(self.config.service_endpoint,
+                                                                  default_client.headers)
+                    translator.token_acquirer.client = translator.client
+                    await default_client.aclose()
 
             # 言語検出
             if self.config.source_language == "auto":
-                self._detected_language = detect(text)
+                with stage("language_detection"):
+                    self._detected_language = detect(text)
             else:
                 self._detected_language = self.config.source_language
 
-            result = await translator.translate(
-                text,
-                src=self._detected_language,
-                dest=self.config.target_language
-            )
+            async with translator:
+                with stage("translation_google"):
+                    result = await translator.translate(
+                        text,
+                        src=self._detected_language,
+                        dest=self.config.target_language
+                    )
 
             return result.text
 
         except Exception as e:
-            raise TranslationError(f"google翻訳エラー: {e}")
+            get_metrics_registry().increment("translation_google_errors")
+            raise TranslationError(f"google翻訳エラー: {e}") from e
+
+class LexiconTranslator(ITranslator):
+    """対訳辞書（models.translator.lexicon）で語句を訳語に置き換える，通信しない翻訳エンジン"""
+    def __init__(self, config: Optional[TranslationConfig] = None):
+        self.config = config or TranslationConfig()
+        self._translated_text = ""
+        self._detected_language = ""
+
+    @property
+    def translated_text(self) -> str:
+        return self._translated_text
+
+    @property
+    def translator_engine_name(self) -> str:
+        return "Lexicon"
+
+    @property
+    def source_language(self) -> str:
+        return self._detected_language
+
+    async def translate(self, text) -> str:
+        """
+        テキストを訳語に置き換える
+
+        元言語が "auto" の場合は，翻訳先言語への対訳辞書のうち最も多くの語が見つかったものを使い，
+        その元言語を source_language とします．
+        """
+        if not text or not text.strip():
+            return ""
+        target = self.config.target_language
+        joiner = "" if target in UNSPACED_LANGUAGES else " "
+        if self.config.source_language == "auto":
+            sources = available_source_languages(target)
+        else:
+            sources = [self.config.source_language]
+
+        best = None
+        with stage("translation_lexicon"):
+            for source in sources:
+                lexicon = get_lexicon(source, target)
+                if lexicon is None:
+                    continue
+                glossed, matched = lexicon.gloss(text, joiner)
+                if best is None or matched > best[0]:
+                    best = (matched, source, glossed)
+        if best is None:
+            get_metrics_registry().increment("translation_lexicon_errors")
+            raise TranslationError(f"対訳辞書がありません: {self.config.source_language} → {target}")
+
+        get_metrics_registry().increment("translation_lexicon_words", best[0])
+        _, self._detected_language, self._translated_text = best
+        return self._translated_text
+
+class GlossaryTranslator(ITranslator):
+    """用語集の用語を置き換えてから翻訳エンジンに渡す翻訳エンジン（用語だけの文は翻訳エンジンを呼ばない）"""
+    def __init__(self, translator: ITranslator, glossary: Glossary, config: TranslationConfig):
+        self._translator = translator
+        self._glossary = glossary
+        self.config = config
+        self._translated_text = ""
+        self._glossary_only = False
+
+    @property
+    def translated_text(self) -> str:
+        return self._translated_text
+
+    @property
+    def translator_engine_name(self) -> str:
+        return self._translator.translator_engine_name
+
+    @property
+    def source_language(self) -> str:
+        # 用語だけの文は言語を検出していないので，指定された元言語（"auto" のこともある）を返す
+        return self.config.source_language if self._glossary_only else self._translator.source_language
+
+    async def translate(self, text) -> str:
+        """用語集を適用してテキストを翻訳する"""
+        if not text or not text.strip():
+            return ""
+        metrics = get_metrics_registry()
+        with stage("glossary_match"):
+            request = prepare(self._glossary, text, self.config.glossary_mode)
+        metrics.increment("glossary_terms", request.matches)
+        self._glossary_only = request.glossary_only
+        if request.glossary_only:
+            metrics.record_cache_access("glossary", True)
+            self._translated_text = request.text
+            return self._translated_text
+        metrics.record_cache_access("glossary", False)
+
+        translated = await self._translator.translate(request.text)
+        self._translated_text, lost = restore(request, translated)
+        if lost:
+            # 翻訳エンジンが目印を崩した場合は，用語を訳語に置き換えた文で翻訳し直す
+            metrics.increment("glossary_placeholders_lost", lost)
+            retry = prepare(self._glossary, text, GLOSSARY_SUBSTITUTE)
+            self._translated_text = await self._translator.translate(retry.text)
+        return self._translated_text
+
+async def translate_segments(translator: ITranslator, segments: Sequence[str],
+                             create: Optional[Callable[[], ITranslator]] = None) -> List[str]:
+    """
+    複数の文をまとめて翻訳する
+
+    区切りの行を挟んで連結し1回の翻訳で訳してから，訳文を区切りで分けます．
+    翻訳で区切りが崩れて数が合わない場合は，文ごとに翻訳し直します．
+    翻訳エンジンはインスタンスごとに状態（検出したソース言語など）を持つため，
+    create があれば文ごとに作った翻訳エンジンで並行に，無ければ translator で1文ずつ順に訳します．
+
+    Args:
+        translator (ITranslator): 翻訳エンジン
+        segments (Sequence[str]): 空でない文の列
+        create (Optional[Callable[[], ITranslator]]): 文ごとの翻訳エンジンを作る関数
+
+    Returns:
+        List[str]: segments の順の訳文
+    """
+    if len(segments) <= 1:
+        return [await translator.translate(segment) for segment in segments]
+    translated = await translator.translate(SEGMENT_SEPARATOR.join(segments))
+    parts = _SEGMENT_SPLIT.split(translated.strip())
+    if len(parts) == len(segments):
+        return parts
+    get_metrics_registry().increment("translation_batch_split_failures")
+    if create is None:
+        return [await translator.translate(segment) for segment in segments]
+    return list(await asyncio.gather(*(create().translate(segment) for segment in segments)))
+
+def _create_redirected_client(endpoint: str, headers):
+    """
+    すべての要求を endpoint へ送る httpx.AsyncClient を作る
+
+    googletrans は接続先を https://{host}/... に固定しているため，
+    トランスポート層で URL のスキーム・ホスト・ポートを書き換えます．
+
+    Args:
+        endpoint (str): 接続先（"http://127.0.0.1:8765" など）
+        headers: 元のクライアントのヘッダー
+
+    Returns:
+        httpx.AsyncClient: 接続先を書き換えるクライアント
+    """
+    import httpx
+
+    target = httpx.URL(endpoint)
+
+    class RedirectTransport(httpx.AsyncHTTPTransport):
+        async def handle_async_request(self, request):
+            request.url = request.url.copy_with(scheme=target.scheme, host=target.host, port=target.port)
+            return await super().handle_async_request(request)
+
+    # http の接続先では証明書の読み込み（1回数十ms）を省く
+    transport = RedirectTransport(verify=target.scheme == "https")
+    return httpx.AsyncClient(transport=transport, headers=headers)
+
+def detect_language(text: str) -> Optional[str]:
+    """
+    文の言語を推定する（langdetect）
+
+    Returns:
+        Optional[str]: "en" などの言語コード。推定できなければ None
+    """
+    from langdetect import LangDetectException, detect
+
+    with stage("language_detection"):
+        try:
+            return detect(text)
+        except LangDetectException:
+            return None
+
+def preload_translator_modules() -> None:
+    """
+    翻訳で使う重いモジュールを事前に読み込む
+
+    googletrans（httpx を含む）と langdetect の import，および langdetect の
+    言語プロファイル読み込みを済ませ，初回翻訳時の待ち時間を減らします．
+    起動直後のバックグラウンドウォームアップから呼ばれることを想定しています．
+    """
+    import googletrans  # noqa: F401
+    from langdetect.detector_factory import init_factory
+
+    init_factory()
 
 class TranslatorFactory:
     """翻訳エンジンのファクトリークラス"""
     _translator_engines = {
         "Google": GoogleTranslator,
+        "Lexicon": LexiconTranslator,
     }
 
     def __init__(self, engine_type: str = "Google"):
@@ -93,14 +307,35 @@ class TranslatorFactory:
         self.engine_type = engine_type
 
     def create(self, config: Optional[TranslationConfig] = None) -> ITranslator:
-        """指定されたエンジンで翻訳インスタンスを作成"""
-        return self._engine_class(config=config)
+        """
+        指定されたエンジンで翻訳インスタンスを作成
+
+        翻訳先言語の用語集があれば，用語を置き換えてからエンジンに渡す GlossaryTranslator で包みます．
+        """
+        translator = self._engine_class(config=config)
+        config = config or TranslationConfig()
+        if config.glossary_mode != GLOSSARY_OFF:
+            glossary = get_glossary(config.target_language)
+            if glossary is not None:
+                return GlossaryTranslator(translator, glossary, config)
+        return translator
 
     @staticmethod
     def get_available_engines() -> List[str]:
         """利用可能なエンジン一覧を取得"""
         return list(TranslatorFactory._translator_engines.keys())
 
+    @staticmethod
+    def register_engine(engine_type: str, engine_class: type) -> None:
+        """
+        翻訳エンジンを追加する（ベンチマーク用のスタブなど）
+
+        Args:
+            engine_type (str): エンジンタイプ名
+            engine_class (type): config を受け取って ITranslator を返すクラス
+        """
+        TranslatorFactory._translator_engines[engine_type] = engine_class
+
 class TranslationEngine:
     """翻訳エンジンのコンテキストクラス"""
 
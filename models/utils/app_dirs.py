@@ -0,0 +1,31 @@
+import os
+import platform
+from pathlib import Path
+
+APP_NAME = "OCRTranslator"
+
+
+def get_user_cache_dir() -> Path:
+    """
+    アプリケーション用のキャッシュディレクトリを取得する（なければ作成する）
+
+    - Windows: %LOCALAPPDATA%/OCRTranslator/Cache
+    - その他: $XDG_CACHE_HOME/OCRTranslator（未設定なら ~/.cache/OCRTranslator）
+
+    環境変数 OCRTRANSLATOR_CACHE_DIR が設定されていればそれを優先します．
+
+    Returns:
+        Path: キャッシュディレクトリのパス
+    """
+    override = os.environ.get("OCRTRANSLATOR_CACHE_DIR")
+    if override:
+        cache_dir = Path(override)
+    elif platform.system() == "Windows":
+        base = os.environ.get("LOCALAPPDATA") or str(Path.home() / "AppData" / "Local")
+        cache_dir = Path(base) / APP_NAME / "Cache"
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or str(Path.home() / ".cache")
+        cache_dir = Path(base) / APP_NAME
+
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    return cache_dir
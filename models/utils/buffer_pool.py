@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, List, Tuple
+import os
+import threading
+
+from models.utils.metrics import get_metrics_registry
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# 既定のメモリ上限（MB）。環境変数 OCRTRANSLATOR_BUFFER_POOL_MB で変更できる
+DEFAULT_POOL_MEGABYTES = 256
+
+
+@dataclass(frozen=True)
+class BufferPoolStats:
+    """バッファプールの統計情報"""
+    acquires: int
+    reuses: int
+    over_budget: int
+    pooled_bytes: int
+    in_use_bytes: int
+    peak_bytes: int
+
+    @property
+    def reuse_rate(self) -> float:
+        """acquire のうち既存バッファを再利用できた割合"""
+        return self.reuses / self.acquires if self.acquires else 0.0
+
+
+class FrameBufferPool:
+    """
+    形状・dtype ごとに ndarray を再利用するバッファプール
+
+    キャプチャや前処理で毎回確保していたフルサイズの配列を使い回し，
+    大きな画面での確保・解放の繰り返しによるヒープの断片化を防ぎます．
+    プールが保持する配列（貸し出し中＋待機中）の合計は max_bytes を超えないようにし，
+    超える場合は古い待機中バッファから破棄します．それでも足りない場合は
+    プール管理外の配列を返します（release しても保持されません）．
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_POOL_MEGABYTES * 1024 * 1024):
+        self.max_bytes = max_bytes
+        # (shape, dtype) → 待機中バッファ。先頭ほど長く使われていない
+        self._free: "OrderedDict[Tuple[Tuple[int, ...], str], List[np.ndarray]]" = OrderedDict()
+        # id(配列) → 貸し出し中の配列
+        self._in_use: Dict[int, np.ndarray] = {}
+        self._pooled_bytes = 0
+        self._in_use_bytes = 0
+        self._peak_bytes = 0
+        self._acquires = 0
+        self._reuses = 0
+        self._over_budget = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, shape: Tuple[int, ...], dtype: str = "uint8") -> np.ndarray:
+        """
+        指定形状の配列を貸し出す（中身は未初期化）
+
+        Args:
+            shape (Tuple[int, ...]): 配列の形状
+            dtype (str): 配列の dtype
+
+        Returns:
+            np.ndarray: 使い終わったら release() で返却する配列
+        """
+        import numpy as np
+
+        key = (tuple(shape), np.dtype(dtype).str)
+        with self._lock:
+            self._acquires += 1
+            free_list = self._free.get(key)
+            hit = bool(free_list)
+            get_metrics_registry().record_cache_access("buffer_pool", hit=hit)
+            if hit:
+                array = free_list.pop()
+                if not free_list:
+                    del self._free[key]
+                self._pooled_bytes -= array.nbytes
+                self._reuses += 1
+            else:
+                nbytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+                self._evict_until_fits(nbytes)
+                if self._pooled_bytes + self._in_use_bytes + nbytes > self.max_bytes:
+                    # 予算超過：プール管理外の配列を返す
+                    self._over_budget += 1
+                    return np.empty(shape, dtype=dtype)
+                array = np.empty(shape, dtype=dtype)
+
+            self._in_use[id(array)] = array
+            self._in_use_bytes += array.nbytes
+            self._peak_bytes = max(self._peak_bytes, self._pooled_bytes + self._in_use_bytes)
+            return array
+
+    def release(self, array: object) -> None:
+        """
+        貸し出した配列を返却する。プールが貸し出した配列以外は何もしない
+
+        Args:
+            array (object): acquire() で取得した配列
+        """
+        with self._lock:
+            owned = self._in_use.pop(id(array), None)
+            if owned is None:
+                return
+            self._in_use_bytes -= owned.nbytes
+            key = (owned.shape, owned.dtype.str)
+            self._free.setdefault(key, []).append(owned)
+            self._free.move_to_end(key)
+            self._pooled_bytes += owned.nbytes
+
+    def owns(self, array: object) -> bool:
+        """配列がこのプールから貸し出し中かどうか"""
+        with self._lock:
+            return id(array) in self._in_use
+
+    def clear(self) -> None:
+        """待機中のバッファをすべて破棄する（貸し出し中のものはそのまま）"""
+        with self._lock:
+            self._free.clear()
+            self._pooled_bytes = 0
+
+    @property
+    def stats(self) -> BufferPoolStats:
+        """再利用率やピークバイト数などの統計情報"""
+        with self._lock:
+            return BufferPoolStats(
+                acquires=self._acquires,
+                reuses=self._reuses,
+                over_budget=self._over_budget,
+                pooled_bytes=self._pooled_bytes,
+                in_use_bytes=self._in_use_bytes,
+                peak_bytes=self._peak_bytes,
+            )
+
+    def _evict_until_fits(self, nbytes: int) -> None:
+        """nbytes を確保できるまで長く使われていない待機中バッファを破棄する（ロック取得済みで呼ぶ）"""
+        while self._free and self._pooled_bytes + self._in_use_bytes + nbytes > self.max_bytes:
+            key, free_list = next(iter(self._free.items()))
+            array = free_list.pop(0)
+            self._pooled_bytes -= array.nbytes
+            if not free_list:
+                del self._free[key]
+
+
+_default_pool: FrameBufferPool | None = None
+_default_pool_lock = threading.Lock()
+
+
+def get_default_pool() -> FrameBufferPool:
+    """
+    プロセス共有のバッファプールを取得する
+
+    メモリ上限は環境変数 OCRTRANSLATOR_BUFFER_POOL_MB（既定 256MB）で指定します．
+    """
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            megabytes = int(os.environ.get("OCRTRANSLATOR_BUFFER_POOL_MB", DEFAULT_POOL_MEGABYTES))
+            _default_pool = FrameBufferPool(max_bytes=megabytes * 1024 * 1024)
+        return _default_pool
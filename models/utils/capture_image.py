@@ -1,12 +1,28 @@
-from dataclasses import dataclass
-from typing import Callable, Dict, Optional, Union
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass, field
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
 import datetime
+import hashlib
+import json
+import logging
+import os
 from pathlib import Path
-import numpy as np
-import mss
-from mss.screenshot import ScreenShot
+import queue
+import struct
+import threading
+import time
 
+from models.utils.buffer_pool import FrameBufferPool
 from models.utils.image_converter import convert_mss_to_cv2
+from models.utils.instrumentation import stage
+
+logger = logging.getLogger(__name__)
+
+if TYPE_CHECKING:
+    # numpy / mss は起動時間短縮のため実行時には遅延 import する
+    import numpy as np
+    from mss.screenshot import ScreenShot
 
 @dataclass
 class RectangleCoordinates:
@@ -20,26 +36,356 @@ class RectangleCoordinates:
         return {"left": self.x, "top": self.y, "width": self.width, "height": self.height}
 
 # --- 純粋関数群 ---
-def capture_with_mss(rect: RectangleCoordinates, mss_instance: Optional[object] = None) -> np.ndarray:
-    """mss の grab を使って画像を取得する（副作用）。"""
+def capture_with_mss(rect: RectangleCoordinates, mss_instance: Optional[object] = None,
+                     pool: Optional[FrameBufferPool] = None) -> np.ndarray:
+    """
+    mss の grab を使って画像を取得する（副作用）。
+
+    pool を渡した場合，返す配列はプールから借りたもの。使い終わったら pool.release() で返却する。
+    """
+    import mss
+
     if mss_instance is None:
         mss_instance = mss.mss()
 
     # デバッグ用：mssで実際に使用される座標をログ出力
     mss_coords = rect.mss_coordinates
-    print(f"MSS: Capturing area - left={mss_coords['left']}, top={mss_coords['top']}, width={mss_coords['width']}, height={mss_coords['height']}")
+    logger.debug(f"MSS: Capturing area - left={mss_coords['left']}, top={mss_coords['top']}, width={mss_coords['width']}, height={mss_coords['height']}")
 
-    # スクリーン情報も出力
-    with mss.mss() as sct:
-        monitors = sct.monitors
-        print(f"MSS: Available monitors - {len(monitors)} monitors")
+    # スクリーン情報も出力（mss インスタンスの列挙が必要なのでデバッグ時のみ）
+    if logger.isEnabledFor(logging.DEBUG):
+        monitors = mss_instance.monitors
+        logger.debug(f"MSS: Available monitors - {len(monitors)} monitors")
         for i, monitor in enumerate(monitors):
-            print(f"MSS: Monitor {i} - {monitor}")
+            logger.debug(f"MSS: Monitor {i} - {monitor}")
 
-    shot: ScreenShot = mss_instance.grab(rect.mss_coordinates)
-    print(f"MSS: Captured image size - {shot.width}x{shot.height}")
+    with stage("capture"):
+        shot: ScreenShot = mss_instance.grab(rect.mss_coordinates)
+        out = pool.acquire((shot.height, shot.width, 3)) if pool else None
+        cv2_img = convert_mss_to_cv2(shot, out=out)
+    logger.debug(f"MSS: Captured image size - {shot.width}x{shot.height}")
 
-    cv2_img = convert_mss_to_cv2(shot)
     # shot を明示的に破棄
     del shot
-    return cv2_img  # numpy array を返す（ミュータブルだが外側で扱う）
\ No newline at end of file
+    return cv2_img  # numpy array を返す（ミュータブルだが外側で扱う）
+
+@dataclass
+class ScreenSnapshot:
+    """モニター全体のスナップショットと，その左上の物理座標"""
+    image: np.ndarray
+    origin_x: int
+    origin_y: int
+
+    def crop(self, rect: RectangleCoordinates) -> np.ndarray:
+        """
+        物理座標の矩形を切り出す。コピーせずスナップショットのビューを返す。
+
+        Args:
+            rect (RectangleCoordinates): 画面上の物理座標
+
+        Returns:
+            np.ndarray: 切り出した画像（スナップショットと領域を共有する）
+        """
+        height, width = self.image.shape[:2]
+        left = min(max(rect.x - self.origin_x, 0), width)
+        top = min(max(rect.y - self.origin_y, 0), height)
+        right = min(left + rect.width, width)
+        bottom = min(top + rect.height, height)
+        return self.image[top:bottom, left:right]
+
+
+def capture_screen_snapshot(monitor_index: int = 1, mss_instance: Optional[object] = None) -> ScreenSnapshot:
+    """
+    モニター全体を一度だけキャプチャする（副作用）。
+
+    オーバーレイ表示時に撮っておき，選択範囲はここから切り出すことで
+    マウスを離した後の再キャプチャを不要にする。
+
+    Args:
+        monitor_index (int): mss のモニター番号（1 がプライマリ）
+        mss_instance (Optional[object]): 再利用する mss インスタンス
+
+    Returns:
+        ScreenSnapshot: BGR 画像とモニター左上の物理座標
+    """
+    import mss
+
+    if mss_instance is None:
+        mss_instance = mss.mss()
+
+    monitor = mss_instance.monitors[monitor_index]
+    with stage("capture_snapshot"):
+        shot: ScreenShot = mss_instance.grab(monitor)
+        cv2_img = convert_mss_to_cv2(shot)
+    del shot
+    return ScreenSnapshot(image=cv2_img, origin_x=monitor["left"], origin_y=monitor["top"])
+
+
+def bounding_rect(rects: Sequence[RectangleCoordinates]) -> RectangleCoordinates:
+    """
+    複数の矩形をすべて含む最小の矩形
+
+    Args:
+        rects (Sequence[RectangleCoordinates]): 1つ以上の矩形
+
+    Returns:
+        RectangleCoordinates: 外接矩形
+    """
+    if not rects:
+        raise ValueError("矩形が指定されていません")
+    left = min(rect.x for rect in rects)
+    top = min(rect.y for rect in rects)
+    right = max(rect.x + rect.width for rect in rects)
+    bottom = max(rect.y + rect.height for rect in rects)
+    return RectangleCoordinates(x=left, y=top, width=right - left, height=bottom - top)
+
+
+def capture_regions_with_mss(rects: Sequence[RectangleCoordinates], mss_instance: Optional[object] = None,
+                             pool: Optional[FrameBufferPool] = None) -> Tuple[ScreenSnapshot, List[np.ndarray]]:
+    """
+    複数の領域を外接矩形の1回の grab でキャプチャする（副作用）。
+
+    各領域はスナップショットをコピーせずに切り出したビューなので，
+    pool を渡した場合は領域の処理が終わってから snapshot.image を pool.release() で返却する。
+
+    Args:
+        rects (Sequence[RectangleCoordinates]): キャプチャする画面領域（物理座標）
+        mss_instance (Optional[object]): 再利用する mss インスタンス
+        pool (Optional[FrameBufferPool]): 外接矩形の画像を借りるバッファプール
+
+    Returns:
+        Tuple[ScreenSnapshot, List[np.ndarray]]: (外接矩形のスナップショット, rects の順の各領域のビュー)
+    """
+    bounds = bounding_rect(rects)
+    image = capture_with_mss(bounds, mss_instance=mss_instance, pool=pool)
+    snapshot = ScreenSnapshot(image=image, origin_x=bounds.x, origin_y=bounds.y)
+    return snapshot, [snapshot.crop(rect) for rect in rects]
+
+
+# --- キャプチャの記録 ---
+RECORDING_MAGIC = b"OCRTREC\x01"
+# レコード: 種類(1) | ペイロード長(uint32)
+_RECORD_HEADER = struct.Struct("<BI")
+RECORD_FRAME = 1     # ペイロード: ハッシュ(FRAME_HASH_SIZE) + PNG
+RECORD_CAPTURE = 2   # ペイロード: UTF-8 JSON（領域・フレームのハッシュ・ステージの所要時間など）
+FRAME_HASH_SIZE = 16
+
+# 記録先を指定する環境変数（設定されていればキャプチャを記録する）
+RECORDING_ENV = "OCRTRANSLATOR_RECORD"
+
+
+def frame_hash(image: np.ndarray) -> str:
+    """フレームの重複判定に使うハッシュ（形状と全画素から求める）"""
+    import numpy as np
+
+    digest = hashlib.blake2b(repr((image.shape, image.dtype.str)).encode(), digest_size=FRAME_HASH_SIZE)
+    digest.update(memoryview(np.ascontiguousarray(image)).cast("B"))
+    return digest.hexdigest()
+
+
+@dataclass
+class CaptureEvent:
+    """記録された1回のキャプチャ"""
+    timestamp: float                 # キャプチャ開始時刻（UNIX 時刻）
+    rect: RectangleCoordinates
+    frame: Optional[str]             # フレームのハッシュ（フレームが無ければ None）
+    source_language: str
+    target_language: str
+    stages: List[Tuple[str, float, float]] = field(default_factory=list)  # (名前, 開始からの秒, 所要秒)
+    original_text: Optional[str] = None
+    translated_text: Optional[str] = None
+    error: Optional[str] = None
+
+    def to_json(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["rect"] = [self.rect.x, self.rect.y, self.rect.width, self.rect.height]
+        return data
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]) -> "CaptureEvent":
+        data = dict(data)
+        data["rect"] = RectangleCoordinates(*data["rect"])
+        data["stages"] = [tuple(item) for item in data.get("stages", [])]
+        return cls(**data)
+
+
+class CaptureRecorder:
+    """
+    キャプチャのフレーム・領域・ステージの所要時間を追記専用のファイルに記録するクラス
+
+    フレームは可逆圧縮（PNG）し，同じ画素のフレームは1回だけ書き込みます．
+    PNG への変換と書き込みはバックグラウンドのスレッドで行うので，キャプチャの処理は待たされません．
+    既存のファイルに追記する場合は，記録済みのフレームを読み取って重複判定に使います．
+    途中で異常終了しても，最後の書きかけのレコード以外は読み出せます．
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._frames = set()
+        if self.path.exists() and self.path.stat().st_size:
+            existing = read_recording(self.path)
+            self._frames = set(existing.frames)
+            # 書きかけのレコードが残っていれば，その手前から追記する
+            if existing.valid_length < self.path.stat().st_size:
+                os.truncate(self.path, existing.valid_length)
+        self._file = open(self.path, "ab")
+        if self._file.tell() == 0:
+            self._file.write(RECORDING_MAGIC)
+            self._file.flush()
+        self._queue: "queue.Queue[Optional[Tuple[CaptureEvent, Optional[np.ndarray]]]]" = queue.Queue()
+        self._writer = threading.Thread(target=self._run, name="CaptureRecorder", daemon=True)
+        self._writer.start()
+
+    def record(self, rect: RectangleCoordinates, image: Optional[np.ndarray], source_language: str,
+               target_language: str, stages: Sequence[Tuple[str, float, float]],
+               result: Optional[Tuple[str, str, str]] = None, error: Optional[str] = None) -> None:
+        """
+        キャプチャを1件記録する（書き込みはバックグラウンドで行う）
+
+        Args:
+            rect (RectangleCoordinates): キャプチャした領域
+            image (Optional[np.ndarray]): フレーム（呼び出し側で再利用しないもの。プールの配列ならコピーを渡す）
+            source_language (str): 翻訳元の言語設定
+            target_language (str): 翻訳先の言語
+            stages: collect_stages() で集めた (ステージ名, 開始時刻, 所要時間)
+            result (Optional[Tuple[str, str, str]]): (翻訳済みテキスト, 元テキスト, 検出されたソース言語)
+            error (Optional[str]): 失敗した場合のエラー
+        """
+        now = time.perf_counter()
+        start = min((s[1] for s in stages), default=now)
+        event = CaptureEvent(
+            timestamp=time.time() - (now - start),
+            rect=rect,
+            frame=None,
+            source_language=source_language,
+            target_language=target_language,
+            stages=[(name, begin - start, duration) for name, begin, duration in stages],
+            original_text=result[1] if result else None,
+            translated_text=result[0] if result else None,
+            error=error,
+        )
+        self._queue.put((event, image))
+
+    def _write_record(self, record_type: int, payload: bytes) -> None:
+        self._file.write(_RECORD_HEADER.pack(record_type, len(payload)) + payload)
+
+    def _run(self) -> None:
+        import cv2
+
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                event, image = item
+                if image is not None and image.size:
+                    event.frame = frame_hash(image)
+                    if event.frame not in self._frames:
+                        ok, png = cv2.imencode(".png", image)
+                        if ok:
+                            self._write_record(RECORD_FRAME, bytes.fromhex(event.frame) + png.tobytes())
+                            self._frames.add(event.frame)
+                        else:
+                            event.frame = None
+                self._write_record(RECORD_CAPTURE, json.dumps(event.to_json(), ensure_ascii=False).encode("utf-8"))
+                self._file.flush()
+            except Exception as e:
+                logger.warning(f"CaptureRecorder: 記録に失敗しました: {e}")
+            finally:
+                self._queue.task_done()
+
+    def flush(self) -> None:
+        """キューにある記録をすべて書き込むまで待つ"""
+        self._queue.join()
+
+    def close(self) -> None:
+        """残りを書き込んでファイルを閉じる"""
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join()
+        self._file.close()
+
+
+@dataclass
+class Recording:
+    """読み込んだ記録"""
+    frames: Dict[str, bytes]        # ハッシュ → PNG
+    captures: List[CaptureEvent]
+    valid_length: int               # 読み出せたレコードの末尾までのバイト数
+
+    def decode_frame(self, frame: str) -> np.ndarray:
+        """PNG を BGR の画像に戻す"""
+        import cv2
+        import numpy as np
+
+        return cv2.imdecode(np.frombuffer(self.frames[frame], dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+
+
+def read_recording(path: Union[str, Path]) -> Recording:
+    """
+    CaptureRecorder が書いたファイルを読み込む（末尾の書きかけのレコードは無視する）
+
+    Raises:
+        ValueError: 記録のファイルではない場合
+    """
+    frames: Dict[str, bytes] = {}
+    captures: List[CaptureEvent] = []
+    with open(path, "rb") as f:
+        data = f.read()
+    if not data.startswith(RECORDING_MAGIC):
+        raise ValueError(f"キャプチャの記録ではありません: {path}")
+    position = len(RECORDING_MAGIC)
+    while position < len(data):
+        end = position + _RECORD_HEADER.size
+        length = _RECORD_HEADER.unpack_from(data, position)[1] if end <= len(data) else 0
+        if end > len(data) or end + length > len(data):
+            logger.warning(f"記録の末尾が途中で切れています: {path}")
+            break
+        record_type = data[position]
+        payload = data[end:end + length]
+        position = end + length
+        if record_type == RECORD_FRAME:
+            frames[payload[:FRAME_HASH_SIZE].hex()] = payload[FRAME_HASH_SIZE:]
+        elif record_type == RECORD_CAPTURE:
+            captures.append(CaptureEvent.from_json(json.loads(payload.decode("utf-8"))))
+    return Recording(frames=frames, captures=captures, valid_length=position)
+
+
+_capture_recorder: Optional[CaptureRecorder] = None
+_capture_recorder_lock = threading.Lock()
+
+
+def start_capture_recording(path: Union[str, Path]) -> CaptureRecorder:
+    """
+    キャプチャの記録を開始する（既に記録中ならそのレコーダーを返す）
+
+    Args:
+        path (Union[str, Path]): 記録先（既存のファイルには追記する）
+    """
+    global _capture_recorder
+    with _capture_recorder_lock:
+        if _capture_recorder is None:
+            _capture_recorder = CaptureRecorder(path)
+            logger.info(f"CaptureRecorder: キャプチャを記録します: {path}")
+        return _capture_recorder
+
+
+def stop_capture_recording() -> None:
+    """記録を終了してファイルを閉じる"""
+    global _capture_recorder
+    with _capture_recorder_lock:
+        recorder, _capture_recorder = _capture_recorder, None
+    if recorder is not None:
+        recorder.close()
+
+
+def get_capture_recorder() -> Optional[CaptureRecorder]:
+    """
+    記録中のレコーダーを取得する（記録していなければ None）
+
+    環境変数 OCRTRANSLATOR_RECORD にファイルパスが設定されていれば，初回の呼び出しで記録を開始します．
+    """
+    if _capture_recorder is None and os.environ.get(RECORDING_ENV):
+        return start_capture_recording(os.environ[RECORDING_ENV])
+    return _capture_recorder
@@ -0,0 +1,205 @@
+"""
+CPU コア数の配分
+
+tesseract は内部で OpenMP のスレッドを使い，OpenCV も独自のスレッドプールを持ちます．
+その上で OCR を並列に実行するとスレッド数が掛け算で増え，コアの取り合いでかえって遅くなるため，
+1つのコア数の予算から次の3つを決めてプロセス全体で共有します．
+
+    - tesseract の子プロセスの OpenMP スレッド数（OMP_THREAD_LIMIT）
+    - OpenCV のスレッド数（cv2.setNumThreads）
+    - 並列処理に使うワーカースレッド数（executor()）
+
+モードは2つあります．
+    interactive: 1回のキャプチャの待ち時間を優先し，1件の OCR に複数コアを使う
+    batch: 処理件数を優先し，1件は1コアで処理してワーカーをコア数だけ並べる
+"""
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, replace
+from typing import Dict, Optional
+import logging
+import os
+import threading
+
+from models.utils.metrics import get_metrics_registry
+
+logger = logging.getLogger(__name__)
+
+# コア数の予算とモードを上書きする環境変数
+CPU_BUDGET_ENV = "OCRTRANSLATOR_CPU_BUDGET"
+CPU_MODE_ENV = "OCRTRANSLATOR_CPU_MODE"
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+MODES = (INTERACTIVE, BATCH)
+
+# tesseract の LSTM はこれより多くのスレッドを与えてもほとんど速くならない
+MAX_OMP_THREADS_PER_OCR = 4
+
+
+@dataclass(frozen=True)
+class CPUAllocation:
+    """予算から決めた実際の配分"""
+    mode: str
+    cores: int
+    workers: int        # 並列に実行する OCR の数
+    omp_threads: int    # OCR 1件（tesseract 子プロセス）あたりの OpenMP スレッド数
+    cv2_threads: int    # OpenCV のスレッド数
+
+    @property
+    def total_threads(self) -> int:
+        """すべてのワーカーが同時に動いたときの計算スレッド数の目安"""
+        return self.workers * max(self.omp_threads, self.cv2_threads)
+
+
+def available_cores() -> int:
+    """このプロセスが使えるコア数（CPU アフィニティを考慮する）"""
+    if hasattr(os, "sched_getaffinity"):
+        try:
+            return max(1, len(os.sched_getaffinity(0)))
+        except OSError:
+            pass
+    return max(1, os.cpu_count() or 1)
+
+
+def plan_allocation(cores: int, mode: str) -> CPUAllocation:
+    """
+    コア数の予算とモードから配分を決める
+
+    Args:
+        cores (int): 使ってよいコア数
+        mode (str): "interactive" または "batch"
+
+    Returns:
+        CPUAllocation: workers × スレッド数がコア数を超えない配分
+    """
+    if mode not in MODES:
+        raise ValueError(f"サポートされていないモードです: {mode}")
+    cores = max(1, cores)
+    if mode == BATCH:
+        return CPUAllocation(mode=mode, cores=cores, workers=cores, omp_threads=1, cv2_threads=1)
+    omp_threads = min(cores, MAX_OMP_THREADS_PER_OCR)
+    workers = max(1, cores // omp_threads)
+    return CPUAllocation(mode=mode, cores=cores, workers=workers, omp_threads=omp_threads,
+                         cv2_threads=max(1, cores // workers))
+
+
+class CPUBudget:
+    """
+    プロセス全体の CPU 配分
+
+    apply() で OMP_THREAD_LIMIT（以降に起動する tesseract に引き継がれる）と cv2.setNumThreads を設定します．
+    起動前から OMP_THREAD_LIMIT が設定されていれば，それを上限として尊重します．
+    """
+
+    def __init__(self, cores: Optional[int] = None, mode: str = INTERACTIVE):
+        self._user_omp_limit = _positive_int(os.environ.get("OMP_THREAD_LIMIT"))
+        self._cores = cores or available_cores()
+        self._allocation = self._plan(mode)
+        self._applied = False
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _plan(self, mode: str) -> CPUAllocation:
+        # 起動前の OMP_THREAD_LIMIT を上限にした，実際に使われる配分
+        allocation = plan_allocation(self._cores, mode)
+        if self._user_omp_limit and allocation.omp_threads > self._user_omp_limit:
+            allocation = replace(allocation, omp_threads=self._user_omp_limit)
+        return allocation
+
+    @property
+    def allocation(self) -> CPUAllocation:
+        """現在の配分（OpenMP スレッド数は OMP_THREAD_LIMIT の上限を反映済み）"""
+        with self._lock:
+            return self._allocation
+
+    def set_mode(self, mode: str, cores: Optional[int] = None) -> CPUAllocation:
+        """
+        モード（とコア数の予算）を切り替え，配分をやり直す
+
+        ワーカー数が変わった場合，既存の executor は実行中の処理が終わってから破棄されます．
+
+        Returns:
+            CPUAllocation: 新しい配分
+        """
+        with self._lock:
+            if cores:
+                self._cores = cores
+            allocation = self._plan(mode)
+            if self._executor is not None and allocation.workers != self._allocation.workers:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+            self._allocation = allocation
+            self._applied = False
+        self.apply()
+        return allocation
+
+    def apply(self) -> None:
+        """配分を環境変数と OpenCV に反映する（反映済みなら何もしない）"""
+        with self._lock:
+            if self._applied:
+                return
+            allocation = self._allocation
+            os.environ["OMP_THREAD_LIMIT"] = str(allocation.omp_threads)
+            try:
+                import cv2
+                cv2.setNumThreads(allocation.cv2_threads)
+            except ImportError:
+                pass
+            self._applied = True
+        registry = get_metrics_registry()
+        for name, value in asdict(allocation).items():
+            if name != "mode":
+                registry.set_gauge(f"cpu_budget_{name}", value)
+        logger.info(f"CPUBudget: {allocation.mode} cores={allocation.cores} workers={allocation.workers} "
+                    f"omp={allocation.omp_threads} cv2={allocation.cv2_threads}")
+
+    def executor(self) -> ThreadPoolExecutor:
+        """配分のワーカー数で作ったプロセス共有の ThreadPoolExecutor"""
+        self.apply()
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self._allocation.workers,
+                                                    thread_name_prefix="CPUBudgetWorker")
+            return self._executor
+
+    def describe(self) -> Dict[str, object]:
+        """実際の配分（ログや統計の表示用）"""
+        allocation = self.allocation
+        return {**asdict(allocation), "omp_thread_limit": os.environ.get("OMP_THREAD_LIMIT")}
+
+    def shutdown(self) -> None:
+        """executor を停止する"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+
+def _positive_int(value: Optional[str]) -> Optional[int]:
+    try:
+        number = int(value) if value else 0
+    except ValueError:
+        return None
+    return number if number > 0 else None
+
+
+_cpu_budget: Optional[CPUBudget] = None
+_cpu_budget_lock = threading.Lock()
+
+
+def get_cpu_budget() -> CPUBudget:
+    """
+    プロセス共有の CPU 配分を取得する
+
+    コア数は環境変数 OCRTRANSLATOR_CPU_BUDGET（既定は使えるコア数），
+    モードは OCRTRANSLATOR_CPU_MODE（既定 interactive）で指定します．
+    """
+    global _cpu_budget
+    with _cpu_budget_lock:
+        if _cpu_budget is None:
+            mode = os.environ.get(CPU_MODE_ENV, INTERACTIVE)
+            if mode not in MODES:
+                logger.warning(f"CPUBudget: 不明なモード {mode!r} のため {INTERACTIVE} を使います")
+                mode = INTERACTIVE
+            _cpu_budget = CPUBudget(cores=_positive_int(os.environ.get(CPU_BUDGET_ENV)), mode=mode)
+        return _cpu_budget
@@ -1,7 +1,12 @@
-import numpy as np
-from PIL import Image
-import cv2
-from mss.screenshot import ScreenShot
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    # 重いモジュールは起動時間短縮のため関数内で遅延 import する
+    import numpy as np
+    from PIL import Image
+    from mss.screenshot import ScreenShot
 
 def convert_cv2_to_pil(image: np.ndarray) -> Image.Image:
     """
@@ -13,6 +18,9 @@ def convert_cv2_to_pil(image: np.ndarray) -> Image.Image:
     Returns:
         Image.Image: PIL形式の画像
     """
+    import cv2
+    from PIL import Image
+
     rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
     pil_image = Image.fromarray(rgb_image)
 
@@ -21,18 +29,23 @@ def convert_cv2_to_pil(image: np.ndarray) -> Image.Image:
 
     return pil_image
 
-def convert_mss_to_cv2(image: ScreenShot) -> np.ndarray:
+def convert_mss_to_cv2(image: ScreenShot, out: np.ndarray | None = None) -> np.ndarray:
     """
     mss形式 (ScreenShotクラス)の画像をOpenCV形式（NumPy配列）に変換する関数
 
     Args:
         image (ScreenShot): mss形式 (ScreenShotクラス)の画像
+        out (np.ndarray | None): 変換結果を書き込む (高さ, 幅, 3) の uint8 配列。None なら新規確保
 
     Returns:
         np.ndarray: OpenCV形式の画像
     """
-    image_array = np.array(image)
-    bgr_image = cv2.cvtColor(image_array, cv2.COLOR_BGRA2BGR)
+    import cv2
+    import numpy as np
+
+    # 生のBGRAバッファをコピーせずに配列として参照する
+    image_array = np.frombuffer(image.raw, dtype=np.uint8).reshape(image.height, image.width, 4)
+    bgr_image = cv2.cvtColor(image_array, cv2.COLOR_BGRA2BGR, dst=out)
 
     # メモリ開放
     del image_array
@@ -0,0 +1,85 @@
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Any, ContextManager, Iterator, List, Optional, Tuple
+import time
+
+from models.utils.memory_profiler import get_memory_profiler
+from models.utils.metrics import get_metrics_registry
+from models.utils.tracing import current_trace_id, get_trace_recorder
+
+# collect_stages() の中で完了したステージ (名前, 開始時刻, 所要時間) の集め先
+_collected_stages: ContextVar[Optional[List[Tuple[str, float, float]]]] = ContextVar(
+    "ocrtranslator_collected_stages", default=None
+)
+
+
+@contextmanager
+def stage(name: str, **args: Any) -> Iterator[None]:
+    """
+    処理ステージの計測
+
+    with ブロックの所要時間をメトリクスのレイテンシヒストグラムに記録し，
+    同時に現在のトレースIDのスパンとしてトレースにも残します．
+    メモリプロファイリングが有効な場合はメモリの増減も記録します．
+
+    Args:
+        name (str): ステージ名（"capture" や "ocr_tesseract" など）
+        **args: トレースに添える追加情報
+    """
+    start = time.perf_counter()
+    try:
+        with memory_stage(name):
+            yield
+    finally:
+        duration = time.perf_counter() - start
+        _record(name, start, duration, args)
+
+
+def record_stage(name: str, start: float, duration: float, **args: Any) -> None:
+    """
+    計測済みのステージを記録する（with で囲めない処理用）
+
+    Args:
+        name (str): ステージ名
+        start (float): 開始時刻（time.perf_counter()）
+        duration (float): 所要時間（秒）
+    """
+    _record(name, start, duration, args)
+
+
+def _record(name: str, start: float, duration: float, args: Any) -> None:
+    get_metrics_registry().observe(name, duration)
+    get_trace_recorder().add_span(name, start, duration, current_trace_id(), args)
+    collected = _collected_stages.get()
+    if collected is not None:
+        collected.append((name, start, duration))
+
+
+@contextmanager
+def collect_stages() -> Iterator[List[Tuple[str, float, float]]]:
+    """
+    with ブロック内で完了したステージを集める
+
+    ContextVar で集め先を渡すため，ブロック内で作った asyncio のタスクや
+    asyncio.to_thread で呼んだ処理のステージも集まります．
+
+    Yields:
+        List[Tuple[str, float, float]]: (ステージ名, 開始時刻, 所要時間) のリスト（完了順）
+    """
+    stages: List[Tuple[str, float, float]] = []
+    token = _collected_stages.set(stages)
+    try:
+        yield stages
+    finally:
+        _collected_stages.reset(token)
+
+
+def memory_stage(name: str) -> ContextManager[None]:
+    """
+    メモリプロファイリングが有効なら with ブロックのメモリ増減を記録する（無効なら何もしない）
+
+    Args:
+        name (str): ステージ名
+    """
+    profiler = get_memory_profiler()
+    return profiler.measure(name) if profiler else nullcontext()
@@ -0,0 +1,346 @@
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+import linecache
+import logging
+import os
+import platform
+import threading
+import tracemalloc
+
+from models.utils.metrics import get_metrics_registry
+
+logger = logging.getLogger(__name__)
+
+# 有効化する環境変数（"1" でオン）と，スナップショットの間隔（秒）
+MEMPROFILE_ENV = "OCRTRANSLATOR_MEMPROFILE"
+MEMPROFILE_INTERVAL_ENV = "OCRTRANSLATOR_MEMPROFILE_INTERVAL"
+DEFAULT_SNAPSHOT_INTERVAL = 60.0
+
+# 呼び出し元として記録するスタックの深さ
+TRACEBACK_FRAMES = 10
+# レポートに載せる呼び出し元の数と，残すレポートファイルの数
+TOP_ALLOCATIONS = 15
+MAX_REPORT_FILES = 20
+
+# 割り当て元の集計から除外するモジュール（計測自体の割り当て）
+_SNAPSHOT_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, linecache.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+
+def current_rss_bytes() -> Optional[int]:
+    """現在の RSS（取得できない環境では None）"""
+    if platform.system() == "Windows":
+        counters = _windows_memory_counters()
+        return counters.WorkingSetSize if counters else None
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """プロセス開始以来の最大 RSS（取得できない環境では None）"""
+    if platform.system() == "Windows":
+        counters = _windows_memory_counters()
+        return counters.PeakWorkingSetSize if counters else None
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux は KB，macOS はバイト単位
+    return peak if platform.system() == "Darwin" else peak * 1024
+
+
+def _windows_memory_counters():
+    try:
+        import ctypes
+        from ctypes import wintypes
+
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [
+                ("cb", wintypes.DWORD),
+                ("PageFaultCount", wintypes.DWORD),
+                ("PeakWorkingSetSize", ctypes.c_size_t),
+                ("WorkingSetSize", ctypes.c_size_t),
+                ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                ("PagefileUsage", ctypes.c_size_t),
+                ("PeakPagefileUsage", ctypes.c_size_t),
+            ]
+
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if not ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return None
+        return counters
+    except Exception:
+        return None
+
+
+@dataclass
+class StageMemoryStats:
+    """ステージごとのメモリ集計"""
+    count: int = 0
+    total_delta: int = 0      # 終了時点で残った割り当ての合計（リークの目安）
+    max_delta: int = 0
+    max_peak: int = 0         # ステージ中に一時的に増えた量の最大（コピーの目安）
+    rss_growth: int = 0       # ステージ中に最大 RSS を押し上げた量の合計
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "mean_delta": self.total_delta / self.count if self.count else 0.0,
+            "max_delta": self.max_delta,
+            "max_peak": self.max_peak,
+            "rss_growth": self.rss_growth,
+        }
+
+
+class _Frame:
+    """計測中のステージ（入れ子の外側へピークを伝えるため）"""
+    __slots__ = ("start", "peak")
+
+    def __init__(self, start: int):
+        self.start = start
+        self.peak = start
+
+
+class MemoryProfiler:
+    """
+    処理ステージごとのメモリ計測
+
+    tracemalloc で各ステージ前後の割り当て量の差分と一時的なピークを記録し，
+    プロセスの最大 RSS がどのステージで増えたかも集計します．
+    一定間隔でスナップショットを取り，割り当ての多い呼び出し元と
+    前回からの増加分をテキストレポートとして書き出します．
+
+    tracemalloc のピークはプロセス全体で1つなので，複数のスレッドで同時に
+    ステージが動いている場合のピークは互いの割り当てを含みます．
+    計測のオーバーヘッドが大きいため，明示的に有効化したときだけ使います．
+    """
+
+    def __init__(self, directory: Path, snapshot_interval: float = DEFAULT_SNAPSHOT_INTERVAL,
+                 top_n: int = TOP_ALLOCATIONS):
+        self.directory = Path(directory)
+        self.snapshot_interval = snapshot_interval
+        self.top_n = top_n
+        self._stats: Dict[str, StageMemoryStats] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._previous_snapshot: Optional[tracemalloc.Snapshot] = None
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """計測と定期スナップショットを開始する"""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEBACK_FRAMES)
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="MemoryProfiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """定期スナップショットを停止し，最後のレポートを書き出して計測を終える"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=self.snapshot_interval)
+            self._thread = None
+        try:
+            self.write_report()
+        except Exception as e:
+            logger.warning(f"MemoryProfiler: レポートの書き出しに失敗しました: {e}")
+        tracemalloc.stop()
+
+    @contextmanager
+    def measure(self, name: str) -> Iterator[None]:
+        """
+        with ブロックのメモリ増減を name のステージとして記録する
+
+        Args:
+            name (str): ステージ名
+        """
+        if not tracemalloc.is_tracing():
+            yield
+            return
+
+        stack: List[_Frame] = self._local.__dict__.setdefault("stack", [])
+        current, peak = tracemalloc.get_traced_memory()
+        if stack:
+            # 外側のステージのピークをリセット前に引き継ぐ
+            stack[-1].peak = max(stack[-1].peak, peak)
+        tracemalloc.reset_peak()
+        frame = _Frame(current)
+        stack.append(frame)
+        rss_before = peak_rss_bytes()
+        try:
+            yield
+        finally:
+            current, peak = tracemalloc.get_traced_memory()
+            frame.peak = max(frame.peak, peak)
+            stack.pop()
+            if stack:
+                stack[-1].peak = max(stack[-1].peak, frame.peak)
+            rss_after = peak_rss_bytes()
+            self._record(name, current - frame.start, frame.peak - frame.start,
+                         (rss_after - rss_before) if rss_before is not None and rss_after is not None else 0)
+
+    def _record(self, name: str, delta: int, peak: int, rss_growth: int) -> None:
+        with self._lock:
+            stats = self._stats.setdefault(name, StageMemoryStats())
+            stats.count += 1
+            stats.total_delta += delta
+            stats.max_delta = max(stats.max_delta, delta)
+            stats.max_peak = max(stats.max_peak, peak)
+            stats.rss_growth += rss_growth
+        metrics = get_metrics_registry()
+        metrics.set_gauge(f"memory_{name}_delta_bytes", delta)
+        metrics.set_gauge(f"memory_{name}_peak_bytes", peak)
+
+    def stage_stats(self) -> Dict[str, Dict[str, float]]:
+        """ステージごとの集計"""
+        with self._lock:
+            return {name: stats.as_dict() for name, stats in self._stats.items()}
+
+    def top_allocations(self, snapshot: Optional[tracemalloc.Snapshot] = None, limit: Optional[int] = None) -> List[str]:
+        """
+        現在残っている割り当てが多い呼び出し元
+
+        Args:
+            snapshot (Optional[tracemalloc.Snapshot]): 対象のスナップショット（省略時は新しく取る）
+            limit (Optional[int]): 件数（省略時は top_n）
+
+        Returns:
+            List[str]: "ファイル:行: サイズ (件数)" の一覧
+        """
+        snapshot = snapshot or tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+        lines = []
+        for stat in snapshot.statistics("lineno")[:limit or self.top_n]:
+            frame = stat.traceback[0]
+            lines.append(f"{frame.filename}:{frame.lineno}: {_format_bytes(stat.size)} ({stat.count} blocks)")
+        return lines
+
+    def write_report(self) -> Optional[Path]:
+        """
+        スナップショットを取り，テキストレポートを書き出す
+
+        Returns:
+            Optional[Path]: 書き出したファイル（計測中でなければ None）
+        """
+        if not tracemalloc.is_tracing():
+            return None
+        snapshot = tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+        traced_current, traced_peak = tracemalloc.get_traced_memory()
+        rss = current_rss_bytes()
+        peak_rss = peak_rss_bytes()
+        get_metrics_registry().set_gauge("memory_traced_bytes", traced_current)
+        if rss is not None:
+            get_metrics_registry().set_gauge("memory_rss_bytes", rss)
+
+        lines = [
+            f"メモリレポート {datetime.now().isoformat(timespec='seconds')}",
+            f"tracemalloc: 現在 {_format_bytes(traced_current)} / ピーク {_format_bytes(traced_peak)}",
+            f"RSS: 現在 {_format_bytes(rss)} / 最大 {_format_bytes(peak_rss)}",
+            "",
+            f"{'ステージ':<30} {'回数':>6} {'平均残存':>10} {'最大残存':>10} {'最大一時':>10} {'RSS増加':>10}",
+        ]
+        for name, stats in sorted(self.stage_stats().items()):
+            lines.append(
+                f"{name:<30} {stats['count']:>6} {_format_bytes(stats['mean_delta']):>10} "
+                f"{_format_bytes(stats['max_delta']):>10} {_format_bytes(stats['max_peak']):>10} "
+                f"{_format_bytes(stats['rss_growth']):>10}"
+            )
+
+        lines += ["", f"割り当ての多い呼び出し元（上位 {self.top_n}）"]
+        lines += self.top_allocations(snapshot)
+
+        if self._previous_snapshot is not None:
+            lines += ["", "前回のスナップショットからの増加"]
+            for stat in snapshot.compare_to(self._previous_snapshot, "lineno")[:self.top_n]:
+                if stat.size_diff <= 0:
+                    continue
+                frame = stat.traceback[0]
+                lines.append(f"{frame.filename}:{frame.lineno}: +{_format_bytes(stat.size_diff)} "
+                             f"({stat.count_diff:+d} blocks, 計 {_format_bytes(stat.size)})")
+        self._previous_snapshot = snapshot
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f"memory-{datetime.now():%Y%m%d-%H%M%S}.txt"
+        path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        self._remove_old_reports()
+        return path
+
+    def _remove_old_reports(self) -> None:
+        reports = sorted(self.directory.glob("memory-*.txt"))
+        for old in reports[:-MAX_REPORT_FILES]:
+            try:
+                old.unlink()
+            except OSError:
+                pass
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.snapshot_interval):
+            try:
+                path = self.write_report()
+                logger.debug(f"MemoryProfiler: レポートを書き出しました: {path}")
+            except Exception as e:
+                logger.warning(f"MemoryProfiler: レポートの書き出しに失敗しました: {e}")
+
+
+def _format_bytes(value: Optional[float]) -> str:
+    if value is None:
+        return "-"
+    for unit in ("B", "KB", "MB"):
+        if abs(value) < 1024:
+            return f"{value:.0f}{unit}" if unit == "B" else f"{value:.1f}{unit}"
+        value /= 1024
+    return f"{value:.1f}GB"
+
+
+_profiler: Optional[MemoryProfiler] = None
+
+
+def get_memory_profiler() -> Optional[MemoryProfiler]:
+    """有効化されたメモリプロファイラを取得する（無効な場合は None）"""
+    return _profiler
+
+
+def enable_memory_profiling(directory: Path, snapshot_interval: Optional[float] = None) -> MemoryProfiler:
+    """
+    メモリプロファイラを有効化して開始する
+
+    以降 instrumentation.stage() で囲まれた処理のメモリ増減が記録されます．
+
+    Args:
+        directory (Path): レポートの出力先
+        snapshot_interval (Optional[float]): スナップショットの間隔（秒）。省略時は環境変数または既定値
+
+    Returns:
+        MemoryProfiler: 開始したプロファイラ
+    """
+    global _profiler
+    if _profiler is None:
+        if snapshot_interval is None:
+            snapshot_interval = float(os.environ.get(MEMPROFILE_INTERVAL_ENV, DEFAULT_SNAPSHOT_INTERVAL))
+        _profiler = MemoryProfiler(directory, snapshot_interval=snapshot_interval)
+        _profiler.start()
+    return _profiler
+
+
+def memory_profiling_requested() -> bool:
+    """環境変数でメモリプロファイリングが要求されているか"""
+    return os.environ.get(MEMPROFILE_ENV, "").lower() in ("1", "true", "yes", "on")
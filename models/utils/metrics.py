@@ -0,0 +1,288 @@
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# 2のべき乗ごとの区間をさらに 2**SUB_BUCKET_BITS 個に分割する（相対誤差 約3%）
+SUB_BUCKET_BITS = 5
+SUB_BUCKET_COUNT = 1 << SUB_BUCKET_BITS
+
+# 集計表示・エクスポートするパーセンタイル
+REPORTED_PERCENTILES = (50.0, 95.0, 99.0)
+
+
+class LatencyHistogram:
+    """
+    HDR Histogram 風の対数・線形バケットによるレイテンシヒストグラム
+
+    値はマイクロ秒単位の整数で保持し，2のべき乗の区間ごとに
+    SUB_BUCKET_COUNT 個の等幅バケットへ数え上げます．
+    バケットは疎な dict で持つため，記録は O(1) でメモリも使った分だけです．
+    """
+
+    def __init__(self):
+        self._counts: Dict[int, int] = {}
+        self.count = 0
+        self.total_us = 0
+        self.min_us: Optional[int] = None
+        self.max_us: Optional[int] = None
+
+    @staticmethod
+    def _bucket_index(value_us: int) -> int:
+        if value_us < SUB_BUCKET_COUNT:
+            return value_us
+        shift = value_us.bit_length() - 1 - SUB_BUCKET_BITS
+        return (shift + 1) * SUB_BUCKET_COUNT + ((value_us >> shift) - SUB_BUCKET_COUNT)
+
+    @staticmethod
+    def _bucket_upper_bound(index: int) -> int:
+        if index < SUB_BUCKET_COUNT:
+            return index
+        shift = index // SUB_BUCKET_COUNT - 1
+        sub = index % SUB_BUCKET_COUNT
+        return ((sub + SUB_BUCKET_COUNT + 1) << shift) - 1
+
+    def record(self, seconds: float) -> None:
+        """
+        レイテンシを1件記録する
+
+        Args:
+            seconds (float): 経過時間（秒）
+        """
+        value_us = max(int(seconds * 1_000_000), 0)
+        index = self._bucket_index(value_us)
+        self._counts[index] = self._counts.get(index, 0) + 1
+        self.count += 1
+        self.total_us += value_us
+        self.min_us = value_us if self.min_us is None else min(self.min_us, value_us)
+        self.max_us = value_us if self.max_us is None else max(self.max_us, value_us)
+
+    def percentile(self, percent: float) -> float:
+        """
+        パーセンタイル値を返す
+
+        Args:
+            percent (float): 0〜100 のパーセント
+
+        Returns:
+            float: レイテンシ（秒）。記録が無ければ 0.0
+        """
+        if not self.count:
+            return 0.0
+        target = max(1, int(round(self.count * percent / 100.0)))
+        seen = 0
+        for index in sorted(self._counts):
+            seen += self._counts[index]
+            if seen >= target:
+                return min(self._bucket_upper_bound(index), self.max_us) / 1_000_000
+        return self.max_us / 1_000_000
+
+    def summary(self) -> Dict[str, float]:
+        """件数・平均・最小・最大・主要パーセンタイル（秒）の dict"""
+        result = {
+            "count": self.count,
+            "mean": (self.total_us / self.count / 1_000_000) if self.count else 0.0,
+            "min": (self.min_us or 0) / 1_000_000,
+            "max": (self.max_us or 0) / 1_000_000,
+        }
+        for percent in REPORTED_PERCENTILES:
+            result[f"p{percent:g}"] = self.percentile(percent)
+        return result
+
+
+class MetricsRegistry:
+    """
+    カウンタ・ゲージ・レイテンシヒストグラムをまとめて管理するレジストリ
+
+    キャプチャ・前処理・OCR・言語検出・翻訳の各処理から記録され，
+    JSON / Prometheus テキスト形式で出力できます．
+    """
+
+    def __init__(self):
+        self._counters: Dict[str, int] = {}
+        self._gauges: Dict[str, float] = {}
+        self._histograms: Dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+
+    def increment(self, name: str, amount: int = 1) -> None:
+        """カウンタを加算する"""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def set_gauge(self, name: str, value: float) -> None:
+        """ゲージ（現在値）を設定する"""
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, name: str, seconds: float) -> None:
+        """レイテンシを記録する"""
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = LatencyHistogram()
+            histogram.record(seconds)
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        """with ブロックの実行時間を name のヒストグラムに記録する"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def latency_summary(self, name: str) -> Optional[Dict[str, float]]:
+        """name のレイテンシの summary()（記録が無ければ None）"""
+        with self._lock:
+            histogram = self._histograms.get(name)
+            return histogram.summary() if histogram is not None and histogram.count else None
+
+    def record_cache_access(self, name: str, hit: bool) -> None:
+        """キャッシュのヒット／ミスを記録する（name_hits / name_misses カウンタ）"""
+        self.increment(f"{name}_hits" if hit else f"{name}_misses")
+
+    def cache_hit_ratio(self, name: str) -> float:
+        """record_cache_access で記録したキャッシュのヒット率"""
+        with self._lock:
+            hits = self._counters.get(f"{name}_hits", 0)
+            misses = self._counters.get(f"{name}_misses", 0)
+        return hits / (hits + misses) if hits + misses else 0.0
+
+    def _cache_names(self) -> List[str]:
+        with self._lock:
+            names = {name[:-len("_hits")] for name in self._counters if name.endswith("_hits")}
+            names |= {name[:-len("_misses")] for name in self._counters if name.endswith("_misses")}
+        return sorted(names)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """
+        現在の値をまとめた dict を返す
+
+        Returns:
+            Dict[str, Dict]: counters / gauges / cache_hit_ratios / latencies（秒）
+        """
+        cache_ratios = {name: self.cache_hit_ratio(name) for name in self._cache_names()}
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+                "cache_hit_ratios": cache_ratios,
+                "latencies": {name: h.summary() for name, h in self._histograms.items()},
+            }
+
+    def to_json(self) -> str:
+        """スナップショットを JSON 文字列にする"""
+        return json.dumps({"timestamp": time.time(), **self.snapshot()}, ensure_ascii=False, indent=2)
+
+    def to_prometheus(self, prefix: str = "ocrtranslator") -> str:
+        """
+        Prometheus のテキスト形式（text exposition format）にする
+
+        レイテンシは summary 型として quantile ラベル付きで出力します．
+        """
+        snapshot = self.snapshot()
+        lines: List[str] = []
+        for name, value in sorted(snapshot["counters"].items()):
+            metric = _prometheus_name(prefix, name) + "_total"
+            lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+        for name, value in sorted(snapshot["gauges"].items()):
+            metric = _prometheus_name(prefix, name)
+            lines += [f"# TYPE {metric} gauge", f"{metric} {value}"]
+        for name, value in sorted(snapshot["cache_hit_ratios"].items()):
+            metric = _prometheus_name(prefix, name) + "_cache_hit_ratio"
+            lines += [f"# TYPE {metric} gauge", f"{metric} {value}"]
+        for name, summary in sorted(snapshot["latencies"].items()):
+            metric = _prometheus_name(prefix, name) + "_seconds"
+            lines.append(f"# TYPE {metric} summary")
+            for percent in REPORTED_PERCENTILES:
+                lines.append(f'{metric}{{quantile="{percent / 100:g}"}} {summary[f"p{percent:g}"]}')
+            lines.append(f"{metric}_sum {summary['mean'] * summary['count']}")
+            lines.append(f"{metric}_count {summary['count']}")
+        return "\n".join(lines) + "\n"
+
+    def format_summary(self) -> List[str]:
+        """統計パネル表示用に，ステージごとの p50/p95/p99（ms）とキャッシュヒット率を行単位で返す"""
+        snapshot = self.snapshot()
+        lines = []
+        for name, summary in sorted(snapshot["latencies"].items()):
+            lines.append(
+                f"{name:<30} n={summary['count']:<5} "
+                f"p50={summary['p50'] * 1000:7.1f} p95={summary['p95'] * 1000:7.1f} p99={summary['p99'] * 1000:7.1f} ms"
+            )
+        for name, ratio in sorted(snapshot["cache_hit_ratios"].items()):
+            lines.append(f"{name:<30} hit={ratio * 100:5.1f}%")
+        return lines
+
+
+def _prometheus_name(prefix: str, name: str) -> str:
+    """Prometheus のメトリクス名に使えない文字を _ に置き換える"""
+    return re.sub(r"[^a-zA-Z0-9_:]", "_", f"{prefix}_{name}")
+
+
+def _write_atomically(path: Path, text: str) -> None:
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    tmp_path.write_text(text, encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+class MetricsExporter:
+    """
+    一定間隔でメトリクスを JSON ファイルと Prometheus テキストファイルに書き出すクラス
+
+    Prometheus の node_exporter textfile collector などからそのまま読めるよう，
+    ファイルは一時ファイル経由で置き換えます．
+    """
+
+    def __init__(self, registry: "MetricsRegistry", directory: Path, interval: float = 10.0):
+        self.registry = registry
+        self.directory = Path(directory)
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def export(self) -> None:
+        """現在のメトリクスを書き出す"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        _write_atomically(self.directory / "metrics.json", self.registry.to_json())
+        _write_atomically(self.directory / "metrics.prom", self.registry.to_prometheus())
+
+    def start(self) -> None:
+        """バックグラウンドでの定期書き出しを開始する"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="MetricsExporter", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """定期書き出しを停止し，最後に一度書き出す"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval)
+            self._thread = None
+        try:
+            self.export()
+        except Exception:
+            pass
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.export()
+            except Exception as e:
+                logger.warning(f"MetricsExporter: メトリクスの書き出しに失敗しました: {e}")
+
+
+_registry = MetricsRegistry()
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    """プロセス共有のメトリクスレジストリを取得する"""
+    return _registry
@@ -0,0 +1,62 @@
+import threading
+import time
+from typing import List, Optional, Tuple
+
+
+class StartupTimer:
+    """
+    起動処理の各フェーズの経過時間を記録するクラス
+
+    mark() で区間の終わりを記録し，report() で起点からの経過時間と
+    直前のマークからの差分を一覧にした文字列を返します．
+    ウォームアップスレッドからも呼ばれるためスレッドセーフにしています．
+    """
+
+    def __init__(self, origin: Optional[float] = None):
+        self._origin = origin if origin is not None else time.perf_counter()
+        self._marks: List[Tuple[str, float]] = []
+        self._lock = threading.Lock()
+
+    def mark(self, name: str) -> float:
+        """
+        現在時刻をフェーズの終了時刻として記録する
+
+        Args:
+            name (str): フェーズ名
+
+        Returns:
+            float: 起点からの経過時間（秒）
+        """
+        elapsed = time.perf_counter() - self._origin
+        with self._lock:
+            self._marks.append((name, elapsed))
+        return elapsed
+
+    @property
+    def marks(self) -> List[Tuple[str, float]]:
+        """記録済みの (フェーズ名, 経過秒) のリスト"""
+        with self._lock:
+            return list(self._marks)
+
+    def report(self) -> str:
+        """
+        起動時間レポートを作成する
+
+        Returns:
+            str: フェーズごとの差分と累積時間（ミリ秒）を並べた文字列
+        """
+        lines = ["起動時間レポート:"]
+        previous = 0.0
+        for name, elapsed in self.marks:
+            lines.append(f"  {name:<28} +{(elapsed - previous) * 1000:8.1f} ms  (累計 {elapsed * 1000:8.1f} ms)")
+            previous = elapsed
+        return "\n".join(lines)
+
+
+# プロセス全体で共有するタイマー．モジュールの import 時刻を起点とする
+_startup_timer = StartupTimer()
+
+
+def get_startup_timer() -> StartupTimer:
+    """プロセス共有の StartupTimer を取得する"""
+    return _startup_timer
@@ -1,9 +1,18 @@
-from typing import Optional
+from typing import Dict, Optional
+from dataclasses import dataclass
 from pathlib import Path
+import json
 import sys
 import os
 import platform
 import subprocess
+import threading
+
+from models.utils.app_dirs import get_user_cache_dir
+from models.utils.metrics import get_metrics_registry
+
+# 永続キャッシュのファイル名（キャッシュディレクトリ直下に置く）
+TESSERACT_CACHE_FILE = "tesseract_locator.json"
 
 def get_base_dir(override: Optional[str | Path] = None) -> Path:
     """
@@ -98,7 +107,9 @@ def configure_environment(tessdata_path: Path | None,
     system = platform.system()
     if tess_lib_dir and tess_lib_dir.exists() and system == "Linux":
         old = os.environ.get("LD_LIBRARY_PATH", "")
-        os.environ["LD_LIBRARY_PATH"] = str(tess_lib_dir) + (":" + old if old else "")
+        # 既に含まれていれば重複して追加しない
+        if str(tess_lib_dir) not in old.split(":"):
+            os.environ["LD_LIBRARY_PATH"] = str(tess_lib_dir) + (":" + old if old else "")
 
     if tess_bin and tess_bin.exists():
         if ensure_executable and system != "Windows":
@@ -124,3 +135,136 @@ def probe_tesseract_version(tess_bin: Path) -> str | None:
         return out.stdout.strip().splitlines()[0] if out.stdout else None
     except Exception:
         return None
+
+
+@dataclass(frozen=True)
+class TesseractInstallation:
+    """解決済みの tesseract 配置情報"""
+    tess_root: Path
+    tess_bin: Path | None
+    tess_lib_dir: Path | None
+    tessdata: Path | None
+    version: str | None
+
+
+# プロセス内キャッシュ（base_dir ごとに一度だけ解決する）
+_resolved: Dict[str, TesseractInstallation | None] = {}
+_resolve_lock = threading.Lock()
+
+
+def _binary_signature(tess_bin: Path | None) -> dict | None:
+    """キャッシュ検証用に tesseract バイナリのパス・mtime・サイズを返す。存在しなければ None。"""
+    if not tess_bin:
+        return None
+    try:
+        st = tess_bin.stat()
+    except OSError:
+        return None
+    return {"tess_bin": str(tess_bin), "mtime_ns": st.st_mtime_ns, "size": st.st_size}
+
+
+def _load_cache_file(cache_path: Path) -> dict:
+    try:
+        with open(cache_path, encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except Exception:
+        return {}
+
+
+def _save_cache_file(cache_path: Path, data: dict) -> None:
+    # 書き込み途中のファイルを読まれないよう一時ファイル経由で置き換える
+    try:
+        tmp_path = cache_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, cache_path)
+    except Exception:
+        # キャッシュが書けなくても動作には影響しない
+        pass
+
+
+def _lookup_cached_installation(entry: dict | None) -> TesseractInstallation | None:
+    """永続キャッシュのエントリを検証し，バイナリが変わっていなければ復元する。"""
+    if not entry:
+        return None
+    tess_bin = Path(entry["tess_bin"]) if entry.get("tess_bin") else None
+    if _binary_signature(tess_bin) != entry.get("signature"):
+        return None
+    tess_root = Path(entry["tess_root"])
+    if not tess_root.is_dir():
+        return None
+    return TesseractInstallation(
+        tess_root=tess_root,
+        tess_bin=tess_bin,
+        tess_lib_dir=Path(entry["tess_lib_dir"]) if entry.get("tess_lib_dir") else None,
+        tessdata=Path(entry["tessdata"]) if entry.get("tessdata") else None,
+        version=entry.get("version"),
+    )
+
+
+def resolve_tesseract(base_dir: Path, cache_path: Path | None = None) -> TesseractInstallation | None:
+    """
+    tesseract_bin の探索・パス組み立て・バージョン確認・環境設定をまとめて行う。
+
+    結果は見つからなかった・実行できなかった場合も含めてプロセス内でキャッシュし，
+    実行できたものだけをバイナリのパス・mtime・サイズをキーにキャッシュファイルへ保存する。次回起動時はバイナリの stat だけで検証できるため，
+    rglob による探索や tesseract --version のサブプロセスを省略できる。
+
+    Args:
+        base_dir (Path): 探索開始ディレクトリ
+        cache_path (Path | None): 永続キャッシュのパス。None ならユーザーキャッシュディレクトリを使う
+
+    Returns:
+        TesseractInstallation | None: 見つからなければ None。実行できない場合は version が None
+    """
+    key = str(Path(base_dir).resolve())
+    metrics = get_metrics_registry()
+    with _resolve_lock:
+        if key in _resolved:
+            metrics.record_cache_access("tesseract_locator", hit=True)
+            return _resolved[key]
+
+        if cache_path is None:
+            try:
+                cache_path = get_user_cache_dir() / TESSERACT_CACHE_FILE
+            except OSError:
+                cache_path = None
+        cache_data = _load_cache_file(cache_path) if cache_path else {}
+
+        installation = _lookup_cached_installation(cache_data.get(key))
+        metrics.record_cache_access("tesseract_locator", hit=installation is not None)
+        if installation is None:
+            tess_root = find_tesseract_folder(base_dir)
+            if not tess_root:
+                # 見つからなかったこともプロセス内では覚えておく（ファイルには保存しない）
+                _resolved[key] = None
+                return None
+            info = assemble_tesseract_paths(tess_root)
+            tess_bin = info.get("tess_bin")
+            tess_lib_dir = info.get("tess_lib_dir")
+            tessdata = info.get("tessdata", base_dir / "tessdata")
+            # LD_LIBRARY_PATH を設定してからでないと Linux ではバージョン確認が失敗する
+            configure_environment(tessdata, tess_lib_dir, tess_bin, set_pytesseract=True)
+            version = probe_tesseract_version(tess_bin) if tess_bin else None
+            installation = TesseractInstallation(tess_root, tess_bin, tess_lib_dir, tessdata, version)
+
+            # 実行できたものだけを永続化する（失敗時は次回も確認し直す）
+            if cache_path and version:
+                cache_data[key] = {
+                    "tess_root": str(tess_root),
+                    "tess_bin": str(tess_bin) if tess_bin else None,
+                    "tess_lib_dir": str(tess_lib_dir) if tess_lib_dir else None,
+                    "tessdata": str(tessdata) if tessdata else None,
+                    "version": version,
+                    "signature": _binary_signature(tess_bin),
+                }
+                _save_cache_file(cache_path, cache_data)
+        else:
+            # キャッシュから復元した場合も環境変数と pytesseract の設定は必要
+            configure_environment(installation.tessdata, installation.tess_lib_dir, installation.tess_bin,
+                                  set_pytesseract=True, ensure_executable=False)
+
+        # 実行できなかった場合もプロセス内では探索とバージョン確認を繰り返さない
+        _resolved[key] = installation
+        return installation
@@ -0,0 +1,124 @@
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional
+import json
+import os
+import threading
+import time
+import uuid
+
+# 1回のキャプチャ要求を識別するトレースID（スレッドや asyncio タスクをまたいで引き継ぐ）
+_current_trace_id: ContextVar[Optional[str]] = ContextVar("ocrtranslator_trace_id", default=None)
+
+# メモリに保持するスパン数の上限（古いものから捨てる）
+MAX_TRACE_EVENTS = 20000
+
+
+def new_trace_id() -> str:
+    """新しいトレースIDを発行する"""
+    return uuid.uuid4().hex[:16]
+
+
+def current_trace_id() -> Optional[str]:
+    """現在のコンテキストのトレースID。無ければ None"""
+    return _current_trace_id.get()
+
+
+@contextmanager
+def use_trace(trace_id: Optional[str]) -> Iterator[Optional[str]]:
+    """
+    with ブロック内のトレースIDを設定する
+
+    asyncio のタスクは作成時のコンテキストを引き継ぐため，
+    イベントループの実行をこのブロック内で行えばコルーチンにも伝わります．
+    """
+    token = _current_trace_id.set(trace_id)
+    try:
+        yield trace_id
+    finally:
+        _current_trace_id.reset(token)
+
+
+def run_in_trace(trace_id: Optional[str], function: Callable, *args: Any) -> Any:
+    """トレースIDを設定した状態で function を呼ぶ（別スレッドのターゲットに使う）"""
+    with use_trace(trace_id):
+        return function(*args)
+
+
+class TraceRecorder:
+    """
+    スパンを Chrome Trace Event 形式（chrome://tracing / Perfetto で表示可能）で記録するクラス
+
+    記録はメモリ上のリングバッファへの追加だけなので，キャプチャの処理中に I/O は発生しません．
+    ファイルへの書き出しは flush() を呼んだときに行います．
+    """
+
+    def __init__(self, max_events: int = MAX_TRACE_EVENTS):
+        self._events: Deque[Dict[str, Any]] = deque(maxlen=max_events)
+        self._origin = time.perf_counter()
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+
+    def add_span(self, name: str, start: float, duration: float, trace_id: Optional[str] = None,
+                 args: Optional[Dict[str, Any]] = None) -> None:
+        """
+        完了したスパンを1件記録する
+
+        Args:
+            name (str): ステージ名
+            start (float): 開始時刻（time.perf_counter()）
+            duration (float): 所要時間（秒）
+            trace_id (Optional[str]): トレースID
+            args (Optional[Dict[str, Any]]): 追加情報
+        """
+        event = {
+            "name": name,
+            "ph": "X",
+            "ts": (start - self._origin) * 1_000_000,
+            "dur": duration * 1_000_000,
+            "pid": self._pid,
+            "tid": threading.get_ident(),
+            "args": {"trace_id": trace_id, **(args or {})},
+        }
+        with self._lock:
+            self._events.append(event)
+
+    @property
+    def events(self) -> List[Dict[str, Any]]:
+        """記録済みのイベント一覧"""
+        with self._lock:
+            return list(self._events)
+
+    def flush(self, path: Path) -> None:
+        """
+        記録済みのスパンを JSON ファイルに書き出す
+
+        Args:
+            path (Path): 出力先（一時ファイル経由で置き換える）
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+
+_recorder = TraceRecorder()
+
+
+def get_trace_recorder() -> TraceRecorder:
+    """プロセス共有のトレースレコーダーを取得する"""
+    return _recorder
+
+
+@contextmanager
+def span(name: str, **args: Any) -> Iterator[None]:
+    """with ブロックを現在のトレースIDのスパンとして記録する"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _recorder.add_span(name, start, time.perf_counter() - start, current_trace_id(), args)
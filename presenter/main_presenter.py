@@ -1,18 +1,57 @@
+import logging
+
+from models.history.history import HistoryEntry
 from models.model_facade import ModelFacade
-from models.utils.capture_image import RectangleCoordinates
+from models.ocr.latency_budget import BudgetReport
+from models.utils.capture_image import RectangleCoordinates, ScreenSnapshot
+
+logger = logging.getLogger(__name__)
 
 class MainPresenter:
     def __init__(self, model: ModelFacade, view=None):
         self.model = model
         self.view = view
 
-    async def capture_and_translate(self, rect: RectangleCoordinates):
+    def prewarm(self):
+        """ホットキー押下時などに，OCRエンジンと翻訳の準備をバックグラウンドで始めます。"""
+        self.model.prewarm()
+
+    def get_metrics_summary(self) -> list[str]:
+        """統計パネルに表示する，ステージごとのレイテンシとキャッシュヒット率の行を返します。"""
+        return self.model.get_metrics().format_summary()
+
+    def record_hotkey_latency(self, seconds: float):
+        """ホットキー押下から結果表示までの時間をメトリクスに記録します。"""
+        self.model.get_metrics().observe("hotkey_to_result", seconds)
+
+    def search_history(self, query: str) -> list[HistoryEntry]:
+        """履歴パネルに表示する，検索語に一致するキャプチャ履歴を新しい順に返します。"""
+        return self.model.search_history(query)
+
+    @staticmethod
+    def _log_budget_report(report: BudgetReport):
+        """レイテンシ予算（OCRTRANSLATOR_LATENCY_BUDGET_MS）に対する結果をログに残します。"""
+        message = (f"レイテンシ予算 {report.budget_ms:.0f} ms に対して {report.total_ms:.1f} ms "
+                   f"(OCR 設定: {report.settings or '-'})")
+        if report.met:
+            logger.info(message)
+        else:
+            logger.warning(message + " — 予算を超えました")
+
+    def take_screen_snapshot(self) -> ScreenSnapshot:
+        """オーバーレイの背景にする画面スナップショットを取得します。"""
+        return self.model.capture_screen_snapshot()
+
+    async def capture_and_translate(self, rect: RectangleCoordinates, image=None):
         """
         指定された領域をキャプチャし、翻訳して結果を返します。
+        image（スナップショットから切り出した画像）が渡された場合は再キャプチャしません。
         PyQt6版では戻り値を返し、Flet版では直接ビューを更新します。
         """
         try:
-            translated_text, original_text, source_lang = await self.model.translate_image_from_screen(rect)
+            translated_text, original_text, source_lang = await self.model.translate_image_from_screen(
+                rect, image=image, report_sink=self._log_budget_report
+            )
 
             # ビューが設定されている場合は直接更新（Flet版との互換性）
             if self.view and hasattr(self.view, 'update_translation_display'):
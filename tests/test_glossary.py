@@ -0,0 +1,98 @@
+"""
+用語集（models.translator.glossary）と GlossaryTranslator のテスト
+
+    pytest tests
+
+オートマトンの一致（重なり・出力リンク）と総当たりの検索との突き合わせ，語の境界の判定，
+目印の置き換えと，翻訳エンジンが目印を崩した場合の訳し直しを確かめます．
+"""
+import asyncio
+import random
+
+from models.translator.glossary import (
+    GLOSSARY_PROTECT, GLOSSARY_SUBSTITUTE, AhoCorasick, Glossary, prepare, restore,
+)
+from models.translator.translator import GlossaryTranslator, TranslationConfig
+
+
+def _brute_force_matches(terms, text):
+    return sorted(
+        (start, start + len(term), term_id)
+        for term_id, term in enumerate(terms)
+        for start in range(len(text) - len(term) + 1)
+        if text.startswith(term, start)
+    )
+
+
+def test_automaton_reports_overlapping_matches():
+    automaton = AhoCorasick(["aa", "aaa"])
+    assert sorted(automaton.iter_matches("aaaa")) == [(0, 2, 0), (0, 3, 1), (1, 3, 0), (1, 4, 1), (2, 4, 0)]
+
+
+def test_automaton_follows_output_links():
+    # "she" で終わるノードから失敗リンクの先の "he" も出力し，"hers" は "he" の先で見つける
+    terms = ["he", "she", "his", "hers"]
+    matches = sorted(AhoCorasick(terms).iter_matches("ushers"))
+    assert [(start, end, terms[term_id]) for start, end, term_id in matches] == [
+        (1, 4, "she"), (2, 4, "he"), (2, 6, "hers"),
+    ]
+
+
+def test_automaton_without_terms_or_text():
+    assert list(AhoCorasick([]).iter_matches("abc")) == []
+    assert list(AhoCorasick(["abc"]).iter_matches("")) == []
+
+
+def test_automaton_matches_brute_force():
+    rng = random.Random(0)
+    for _ in range(300):
+        alphabet = "abc" if rng.random() < 0.5 else "ab設定"
+        terms = list(dict.fromkeys(
+            "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 5))) for _ in range(rng.randint(1, 12))
+        ))
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 60)))
+        assert sorted(AhoCorasick(terms).iter_matches(text)) == _brute_force_matches(terms, text)
+
+
+def test_find_prefers_leftmost_longest_whole_words():
+    glossary = Glossary({"Save": "保存", "Save As": "名前を付けて保存", "Log": "ログ"})
+    matches = glossary.find("Save As... or Save. Logs stay, Log goes")
+    assert [(m.term, m.translation) for m in matches] == [
+        ("Save As", "名前を付けて保存"), ("Save", "保存"), ("Log", "ログ"),
+    ]
+
+
+def test_find_rejects_matches_inside_words():
+    glossary = Glossary({"Log": "ログ", "設定": "Settings"})
+    assert glossary.find("Logs Catalog xLog") == []
+    assert [m.start for m in glossary.find("Log-in (Log) Log")] == [0, 8, 13]
+    # 英数字以外の文字は語の境界を判定しない
+    assert [(m.start, m.end) for m in glossary.find("詳細設定画面")] == [(2, 4)]
+
+
+def test_prepare_and_restore():
+    glossary = Glossary({"OCRTranslator": "OCRTranslator", "Settings": "設定"})
+    request = prepare(glossary, "Open Settings in OCRTranslator", GLOSSARY_PROTECT)
+    assert request.text == "Open ⟦0⟧ in ⟦1⟧"
+    assert restore(request, "⟦ 1 ⟧ で ⟦0⟧ を開く") == ("OCRTranslator で 設定 を開く", 0)
+    assert restore(request, "⟦1⟧ で設定を開く") == ("OCRTranslator で設定を開く", 1)
+    assert prepare(glossary, "Settings", GLOSSARY_PROTECT).glossary_only
+    assert prepare(glossary, "Open Settings", GLOSSARY_SUBSTITUTE).text == "Open 設定"
+
+
+class _RecordingTranslator:
+    """目印を崩して返す翻訳エンジン（受け取った文を記録する）"""
+
+    def __init__(self):
+        self.requests = []
+
+    async def translate(self, text):
+        self.requests.append(text)
+        return text.replace("⟦0⟧", "[0]")
+
+
+def test_lost_placeholders_are_translated_again_with_substitution():
+    engine = _RecordingTranslator()
+    translator = GlossaryTranslator(engine, Glossary({"Settings": "設定"}), TranslationConfig(target_language="ja"))
+    assert asyncio.run(translator.translate("Open Settings")) == "Open 設定"
+    assert engine.requests == ["Open ⟦0⟧", "Open 設定"]
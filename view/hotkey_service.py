@@ -0,0 +1,70 @@
+from typing import Callable, Dict, Optional
+from PyQt6.QtCore import QObject, pyqtSignal
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# 既定のホットキー（pynput の GlobalHotKeys 形式）
+DEFAULT_HOTKEYS: Dict[str, str] = {
+    "capture": "<ctrl>+<alt>+o",
+    "recapture": "<ctrl>+<alt>+r",
+}
+
+class HotkeyService(QObject):
+    """
+    pynput によるグローバルホットキーサービス
+
+    ホットキーは pynput のリスナースレッドで検出されるため，
+    押下時刻（time.perf_counter()）を付けた Qt シグナルとしてメインスレッドへ渡します．
+    on_key_down は押下直後にリスナースレッド上で呼ばれるので，
+    OCRエンジンや翻訳モジュールの事前準備など短時間で戻る処理だけを登録してください．
+    """
+    capture_requested = pyqtSignal(float)    # 範囲を選択してキャプチャ
+    recapture_requested = pyqtSignal(float)  # 前回の範囲を即座に再キャプチャ
+
+    def __init__(self, on_key_down: Optional[Callable[[], None]] = None, hotkeys: Optional[Dict[str, str]] = None):
+        super().__init__()
+        self.on_key_down = on_key_down
+        self.hotkeys = {**DEFAULT_HOTKEYS, **(hotkeys or {})}
+        self._listener = None
+
+    def start(self) -> bool:
+        """
+        ホットキーの監視を開始する
+
+        Returns:
+            bool: 開始できた場合 True（X サーバーが無いなど pynput が使えない環境では False）
+        """
+        if self._listener is not None:
+            return True
+        try:
+            from pynput import keyboard
+
+            self._listener = keyboard.GlobalHotKeys({
+                self.hotkeys["capture"]: lambda: self._on_activate(self.capture_requested),
+                self.hotkeys["recapture"]: lambda: self._on_activate(self.recapture_requested),
+            })
+            self._listener.daemon = True
+            self._listener.start()
+            return True
+        except Exception as e:
+            logger.warning(f"HotkeyService: ホットキーの登録に失敗しました: {e}")
+            self._listener = None
+            return False
+
+    def stop(self):
+        """ホットキーの監視を停止する"""
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+
+    def _on_activate(self, signal):
+        """ホットキー押下時（リスナースレッド）の処理"""
+        pressed_at = time.perf_counter()
+        if self.on_key_down:
+            try:
+                self.on_key_down()
+            except Exception as e:
+                logger.warning(f"HotkeyService: 事前準備に失敗しました: {e}")
+        signal.emit(pressed_at)
@@ -1,10 +1,23 @@
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QPushButton,
-                            QLabel, QFrame, QMessageBox, QTextEdit)
+                            QLabel, QFrame, QMessageBox, QTextEdit,
+                            QLineEdit, QListWidget, QListWidgetItem)
 from PyQt6.QtCore import Qt, QThread, pyqtSignal, QTimer
 from PyQt6.QtGui import QFont
 from models.utils.capture_image import RectangleCoordinates
+from models.utils.tracing import current_trace_id, new_trace_id, span, use_trace
+from view.hotkey_service import HotkeyService
 from view.screen_overlay import Overlay
 import asyncio
+import datetime
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# 統計パネルの更新間隔（ミリ秒）
+STATS_REFRESH_INTERVAL_MS = 1000
+# 履歴一覧の1行に表示する文字数
+HISTORY_PREVIEW_LENGTH = 40
 
 class AsyncWorkerThread(QThread):
     """非同期タスクを実行するワーカースレッド"""
@@ -12,10 +25,13 @@ class AsyncWorkerThread(QThread):
     finished = pyqtSignal(str, str, str)  # translated, original, source_lang
     error_occurred = pyqtSignal(str)
 
-    def __init__(self, presenter, rect):
+    def __init__(self, presenter, rect, image=None, trace_id=None):
         super().__init__()
         self.presenter = presenter
         self.rect = rect
+        self.image = image
+        # オーバーレイのスレッドから引き継いだトレースID
+        self.trace_id = trace_id
 
     def run(self):
         """非同期で翻訳処理を実行"""
@@ -25,9 +41,11 @@ class AsyncWorkerThread(QThread):
             loop = asyncio.new_event_loop()
             asyncio.set_event_loop(loop)
 
-            translated_text, original_text, source_lang = loop.run_until_complete(
-                self.presenter.capture_and_translate(self.rect)
-            )
+            # トレースIDを設定した状態でループを回し，コルーチン側にも引き継ぐ
+            with use_trace(self.trace_id), span("worker_thread"):
+                translated_text, original_text, source_lang = loop.run_until_complete(
+                    self.presenter.capture_and_translate(self.rect, self.image)
+                )
 
             self.finished.emit(translated_text, original_text, source_lang)
 
@@ -37,13 +55,24 @@ class AsyncWorkerThread(QThread):
             loop.close()
 
 class MainView(QWidget):
+    # ウォームアップ（履歴ストアを開く処理を含む）の完了。バックグラウンドのスレッドから emit する
+    warm_up_finished = pyqtSignal()
+
     def __init__(self):
         super().__init__()
         self.presenter = None
         self.overlay = None
         self.worker_thread = None
+        self.hotkey_service = None
+        # 直前に選択した範囲（ホットキーでの再キャプチャ用）
+        self.last_rect = None
+        # ホットキー押下時刻（time.perf_counter()）と，結果表示までにかかった時間
+        self._hotkey_pressed_at = None
+        self.last_hotkey_latency_ms = None
 
         self.init_ui()
+        # 履歴ストアは起動を遅らせないようウォームアップで開くので，一覧はその完了後に読み込む
+        self.warm_up_finished.connect(self.refresh_history)
 
     def init_ui(self):
         """UIコンポーネントの初期化"""
@@ -131,6 +160,42 @@ class MainView(QWidget):
         self.source_lang.setStyleSheet("QLabel { background-color: #e8f4fd; color: #2c3e50; padding: 10px; border: 1px solid #ccc; font-size: 12px; font-weight: bold; }")
         layout.addWidget(self.source_lang)
 
+        layout.addWidget(self.create_divider())
+
+        # 履歴パネル（入力するたびに OCR結果・翻訳結果を検索する）
+        history_label = QLabel("履歴:")
+        history_label.setFont(QFont("Arial", 10, QFont.Weight.Bold))
+        history_label.setStyleSheet("QLabel { color: #2c3e50; margin-bottom: 5px; }")
+        layout.addWidget(history_label)
+
+        self.history_search = QLineEdit(self)
+        self.history_search.setPlaceholderText("履歴を検索")
+        self.history_search.textChanged.connect(self.refresh_history)
+        layout.addWidget(self.history_search)
+
+        self.history_list = QListWidget(self)
+        self.history_list.setMaximumHeight(120)
+        self.history_list.itemClicked.connect(self.show_history_entry)
+        layout.addWidget(self.history_list)
+
+        layout.addWidget(self.create_divider())
+
+        # 統計パネル（ステージごとのレイテンシ p50/p95/p99 とキャッシュヒット率）
+        stats_label = QLabel("統計:")
+        stats_label.setFont(QFont("Arial", 10, QFont.Weight.Bold))
+        stats_label.setStyleSheet("QLabel { color: #2c3e50; margin-bottom: 5px; }")
+        layout.addWidget(stats_label)
+
+        self.stats_text = QLabel("まだ計測値はありません．")
+        self.stats_text.setFont(QFont("Courier New", 8))
+        self.stats_text.setStyleSheet("QLabel { color: #555555; padding: 5px; }")
+        self.stats_text.setTextInteractionFlags(Qt.TextInteractionFlag.TextSelectableByMouse)
+        layout.addWidget(self.stats_text)
+
+        self.stats_timer = QTimer(self)
+        self.stats_timer.timeout.connect(self.refresh_stats)
+        self.stats_timer.start(STATS_REFRESH_INTERVAL_MS)
+
         # レイアウトを下に伸ばす
         layout.addStretch()
 
@@ -144,9 +209,67 @@ class MainView(QWidget):
         return frame
 
     def set_presenter(self, presenter):
-        """プレゼンターを設定"""
+        """プレゼンターを設定（履歴一覧はウォームアップの完了後に読み込む）"""
         self.presenter = presenter
 
+    def refresh_stats(self):
+        """統計パネルを更新"""
+        if not self.presenter or not self.isVisible():
+            return
+        lines = self.presenter.get_metrics_summary()
+        if lines:
+            self.stats_text.setText("\n".join(lines))
+
+    def refresh_history(self):
+        """検索欄の内容で履歴一覧を更新"""
+        if not self.presenter:
+            return
+        try:
+            entries = self.presenter.search_history(self.history_search.text())
+        except Exception as e:
+            logger.warning(f"MainView: 履歴の検索に失敗しました: {e}")
+            return
+        self.history_list.clear()
+        for entry in entries:
+            timestamp = datetime.datetime.fromtimestamp(entry.created_at).strftime("%m/%d %H:%M")
+            preview = " ".join(entry.translated_text.split())[:HISTORY_PREVIEW_LENGTH]
+            item = QListWidgetItem(f"{timestamp}  {preview}")
+            item.setData(Qt.ItemDataRole.UserRole, entry)
+            self.history_list.addItem(item)
+
+    def show_history_entry(self, item: QListWidgetItem):
+        """選択した履歴の結果を表示"""
+        entry = item.data(Qt.ItemDataRole.UserRole)
+        if entry is None:
+            return
+        self.translated_text.setPlainText(entry.translated_text)
+        self.original_text.setPlainText(entry.ocr_text)
+        self.source_lang.setText(entry.source_language)
+
+    def set_hotkey_service(self, hotkey_service: HotkeyService):
+        """グローバルホットキーサービスを設定"""
+        self.hotkey_service = hotkey_service
+        hotkey_service.capture_requested.connect(self.on_capture_hotkey)
+        hotkey_service.recapture_requested.connect(self.on_recapture_hotkey)
+
+    def on_capture_hotkey(self, pressed_at: float):
+        """キャプチャ用ホットキー：範囲選択オーバーレイを開く"""
+        if not self.capture_button.isEnabled() or self.overlay:
+            return
+        self._hotkey_pressed_at = pressed_at
+        self.start_capture()
+
+    def on_recapture_hotkey(self, pressed_at: float):
+        """再キャプチャ用ホットキー：前回の範囲をオーバーレイなしで即座に処理する"""
+        if not self.capture_button.isEnabled() or self.overlay:
+            return
+        if self.last_rect is None:
+            # まだ範囲が選ばれていなければ通常のキャプチャと同じ動作にする
+            self.on_capture_hotkey(pressed_at)
+            return
+        self._hotkey_pressed_at = pressed_at
+        self.on_area_selected(self.last_rect)
+
     def start_capture(self):
         """画面キャプチャを開始"""
         if not self.presenter:
@@ -157,8 +280,8 @@ class MainView(QWidget):
             # メインウィンドウを一時的に隠す
             self.hide()
 
-            # 少し待ってからオーバーレイを表示
-            QTimer.singleShot(100, self.show_overlay)
+            # 非表示が反映された次のイベントループの周回でスナップショットを撮り，オーバーレイを表示
+            QTimer.singleShot(0, self.show_overlay)
 
         except Exception as e:
             self.show_error(f"キャプチャの開始に失敗しました: {e}")
@@ -167,19 +290,29 @@ class MainView(QWidget):
     def show_overlay(self):
         """オーバーレイを表示"""
         try:
-            self.overlay = Overlay(self.on_area_selected)
+            # ウィンドウが隠れた状態の画面を一度だけ撮り，オーバーレイの背景にする
+            try:
+                snapshot = self.presenter.take_screen_snapshot()
+            except Exception as e:
+                logger.warning(f"MainView: スナップショットの取得に失敗しました，選択後にキャプチャします: {e}")
+                snapshot = None
+            self.overlay = Overlay(self.on_area_selected, snapshot)
             self.overlay.closed.connect(self.on_overlay_closed)
             self.overlay.show()
         except Exception as e:
             self.show_error(f"オーバーレイの表示に失敗しました: {e}")
             self.show()
 
-    def on_area_selected(self, rect: RectangleCoordinates):
-        """エリア選択完了時のコールバック"""
+    def on_area_selected(self, rect: RectangleCoordinates, image=None):
+        """エリア選択完了時のコールバック（image はスナップショットから切り出した画像）"""
         try:
             if self.presenter:
+                self.last_rect = rect
+
                 # ワーカースレッドで非同期処理を実行
-                self.worker_thread = AsyncWorkerThread(self.presenter, rect)
+                # オーバーレイ経由ならそのトレースを引き継ぎ，ホットキー再キャプチャなら新規に発行する
+                trace_id = current_trace_id() or new_trace_id()
+                self.worker_thread = AsyncWorkerThread(self.presenter, rect, image, trace_id)
                 self.worker_thread.finished.connect(self.update_translation_display)
                 self.worker_thread.error_occurred.connect(self.show_error)
                 self.worker_thread.start()
@@ -193,9 +326,13 @@ class MainView(QWidget):
 
     def on_overlay_closed(self):
         """オーバーレイが閉じられた時のコールバック"""
-        print("MainView: オーバーレイが閉じられました，メインビューを表示します．")
+        logger.debug("MainView: オーバーレイが閉じられました，メインビューを表示します．")
         self.show()  # メインウィンドウを再表示
 
+        # 選択せずに閉じた場合は，ホットキーの押下時刻を次のキャプチャに持ち越さない
+        if not (self.overlay and self.overlay.selected):
+            self._hotkey_pressed_at = None
+
         # オーバーレイの参照をクリア
         if self.overlay:
             self.overlay.deleteLater()
@@ -212,6 +349,8 @@ class MainView(QWidget):
             self.translated_text.setPlainText(translated if translated else "テキストがありません．")
             self.original_text.setPlainText(original)
             self.source_lang.setText(source_lang)
+            self._report_hotkey_latency()
+            self.refresh_history()
 
             # ボタンを元に戻す
             self.capture_button.setText("OCR&翻訳開始")
@@ -225,8 +364,20 @@ class MainView(QWidget):
         except Exception as e:
             self.show_error(f"表示の更新に失敗しました: {e}")
 
+    def _report_hotkey_latency(self):
+        """ホットキー押下から結果表示までの時間を記録"""
+        if self._hotkey_pressed_at is None:
+            return
+        latency = time.perf_counter() - self._hotkey_pressed_at
+        self.last_hotkey_latency_ms = latency * 1000
+        self._hotkey_pressed_at = None
+        if self.presenter:
+            self.presenter.record_hotkey_latency(latency)
+        logger.info(f"MainView: ホットキーから結果表示まで {self.last_hotkey_latency_ms:.1f} ms")
+
     def show_error(self, message):
         """エラーメッセージを表示"""
+        self._hotkey_pressed_at = None
         try:
             # ボタンを元に戻す
             self.capture_button.setText("OCR&翻訳開始")
@@ -248,7 +399,7 @@ class MainView(QWidget):
                 self.worker_thread = None
 
         except Exception as e:
-            print(f"エラー表示に失敗しました: {e}")
+            logger.error(f"エラー表示に失敗しました: {e}")
 
     def closeEvent(self, event):
         """ウィンドウが閉じられる時の処理"""
@@ -260,5 +411,10 @@ class MainView(QWidget):
         # オーバーレイが開いている場合は閉じる
         if self.overlay:
             self.overlay.close()
+        self._hotkey_pressed_at = None
+
+        # ホットキーの監視を停止
+        if self.hotkey_service:
+            self.hotkey_service.stop()
 
         event.accept()
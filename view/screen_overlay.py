@@ -1,21 +1,36 @@
 from typing import Callable, Optional
 from PyQt6.QtWidgets import QApplication, QWidget
-from PyQt6.QtCore import Qt, QRect, pyqtSignal
-from PyQt6.QtGui import QPainter, QPen, QColor
+from PyQt6.QtCore import Qt, QRect, QRectF, pyqtSignal
+from PyQt6.QtGui import QPainter, QPen, QColor, QImage, QPixmap
+import logging
 import threading
 
-from models.utils.capture_image import RectangleCoordinates
+from models.utils.capture_image import RectangleCoordinates, ScreenSnapshot
+from models.utils.tracing import new_trace_id, run_in_trace, span, use_trace
+
+logger = logging.getLogger(__name__)
+
+# 選択矩形の枠線の太さ（再描画範囲の余白にも使う）
+SELECTION_PEN_WIDTH = 2
 
 class Overlay(QWidget):
-    """スクリーンオーバーレイ"""
+    """
+    スクリーンオーバーレイ
+
+    snapshot を渡すと，開いた時点の画面を固定した背景として表示し，
+    選択範囲はそのスナップショットから切り出してコールバックへ渡します．
+    """
     closed = pyqtSignal()
 
-    def __init__(self, callback: Optional[Callable] = None):
+    def __init__(self, callback: Optional[Callable] = None, snapshot: Optional[ScreenSnapshot] = None):
         super().__init__()
         self.callback = callback
+        self.snapshot = snapshot
         self.start_position = None
         self.current_position = None
         self.selecting = False
+        self.selected = False   # 範囲を選択してコールバックを呼んだか（Esc などで閉じた場合は False）
+        self._snapshot_pixmap: Optional[QPixmap] = None
 
         # スクリーン情報をデバッグ出力
         app = QApplication.instance()
@@ -24,23 +39,56 @@ class Overlay(QWidget):
             if primary_screen:
                 geometry = primary_screen.geometry()
                 device_pixel_ratio = primary_screen.devicePixelRatio()
-                print(f"PyQt6スクリーン情報: 幅={geometry.width()}高さ={geometry.height()}, DPI比率={device_pixel_ratio}")
+                logger.debug(f"PyQt6スクリーン情報: 幅={geometry.width()}高さ={geometry.height()}, DPI比率={device_pixel_ratio}")
 
         # 画面設定
         self.setWindowFlags(Qt.WindowType.FramelessWindowHint | Qt.WindowType.WindowStaysOnTopHint | Qt.WindowType.Tool)
-        self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground)
+        if snapshot is not None:
+            self._snapshot_pixmap = self._create_snapshot_pixmap(snapshot)
+            # 背景は毎回すべて描き直すので，Qt による事前の塗りつぶしは不要
+            self.setAttribute(Qt.WidgetAttribute.WA_OpaquePaintEvent)
+        else:
+            self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground)
         self.showFullScreen()
         self.setCursor(Qt.CursorShape.CrossCursor)
 
+    @staticmethod
+    def _create_snapshot_pixmap(snapshot: ScreenSnapshot) -> QPixmap:
+        """BGR のスナップショットを背景用の QPixmap に変換する"""
+        image = snapshot.image
+        height, width = image.shape[:2]
+        qimage = QImage(image.data, width, height, image.strides[0], QImage.Format.Format_BGR888)
+        # QImage は配列を参照しているだけなので，QPixmap へ変換してから手放す
+        return QPixmap.fromImage(qimage)
+
+    def _selection_rect(self) -> Optional[QRect]:
+        """現在の選択矩形（論理座標）。未選択なら None"""
+        if self.selecting and self.start_position and self.current_position:
+            return QRect(self.start_position, self.current_position).normalized()
+        return None
+
     def mousePressEvent(self, event):
         if event.button() == Qt.MouseButton.LeftButton:
+            previous = self._selection_rect()
             self.start_position = event.position().toPoint()
+            self.current_position = None
             self.selecting = True
+            if previous is not None:
+                self._update_selection_area(previous)
 
     def mouseMoveEvent(self, event):
         if self.selecting:
+            previous = self._selection_rect()
             self.current_position = event.position().toPoint()
-            self.update()
+            current = self._selection_rect()
+            # 変化した範囲（旧矩形と新矩形を含む範囲）だけを再描画する
+            dirty = current if previous is None else previous.united(current)
+            self._update_selection_area(dirty)
+
+    def _update_selection_area(self, rect: QRect):
+        """枠線の太さ分の余白を含めて rect を再描画対象にする"""
+        margin = SELECTION_PEN_WIDTH
+        self.update(rect.adjusted(-margin, -margin, margin, margin))
 
     def mouseReleaseEvent(self, event):
         if self.selecting and self.start_position and self.current_position:
@@ -56,9 +104,9 @@ class Overlay(QWidget):
                         screens = app.screens()
                         if screens:
                             device_pixel_ratio = screens[0].devicePixelRatio()
-                            print(f"Overlay: デバイスピクセル比 = {device_pixel_ratio}")
+                            logger.debug(f"Overlay: デバイスピクセル比 = {device_pixel_ratio}")
                     except Exception as e:
-                        print(f"Overlay: デバイスピクセル比取得失敗: {e}")
+                        logger.warning(f"Overlay: デバイスピクセル比取得失敗: {e}")
 
                 # 物理座標に変換
                 physical_x = int(rect.x() * device_pixel_ratio)
@@ -69,19 +117,25 @@ class Overlay(QWidget):
                 rectangle_coordinate = RectangleCoordinates(physical_x, physical_y, physical_width, physical_height)
 
                 # デバッグ用：座標情報をログ出力
-                print(f"Overlay: 論理座標 - x={rect.x()}, y={rect.y()}, 幅={rect.width()}, 高さ={rect.height()}")
-                print(f"Overlay: 物理座標 - x={physical_x}, y={physical_y}, 幅={physical_width}, 高さ={physical_height}")
-                print(f"Overlay: 開始位置 - x={self.start_position.x()}, y={self.start_position.y()}")
-                print(f"Overlay: 現在位置 - x={self.current_position.x()}, y={self.current_position.y()}")
-                print(f"Overlay: MSS用座標 - {rectangle_coordinate.mss_coordinates}")
+                logger.debug(f"Overlay: 論理座標 - x={rect.x()}, y={rect.y()}, 幅={rect.width()}, 高さ={rect.height()}")
+                logger.debug(f"Overlay: 物理座標 - x={physical_x}, y={physical_y}, 幅={physical_width}, 高さ={physical_height}")
+                logger.debug(f"Overlay: 開始位置 - x={self.start_position.x()}, y={self.start_position.y()}")
+                logger.debug(f"Overlay: 現在位置 - x={self.current_position.x()}, y={self.current_position.y()}")
+                logger.debug(f"Overlay: MSS用座標 - {rectangle_coordinate.mss_coordinates}")
 
                 if self.callback:
+                    # この選択から始まる処理をひとつのトレースとして追跡する
+                    trace_id = new_trace_id()
+                    with use_trace(trace_id), span("overlay_crop"):
+                        # スナップショットがあれば選択範囲をそこから切り出す（再キャプチャしない）
+                        image = self.snapshot.crop(rectangle_coordinate) if self.snapshot is not None else None
 
                     callback_thread = threading.Thread(
-                        target=self.callback,
-                        args=(rectangle_coordinate,),
+                        target=run_in_trace,
+                        args=(trace_id, self.callback, rectangle_coordinate, image),
                         daemon=True
                     )
+                    self.selected = True
                     callback_thread.start()
             self.close()
 
@@ -92,24 +146,42 @@ class Overlay(QWidget):
 
     def closeEvent(self, event):
         """closeEventをオーバーライドしてシグナルを発行"""
-        print("Overlay: 閉じるシグナルを発行します．")
+        logger.debug("Overlay: 閉じるシグナルを発行します．")
         self.closed.emit()
         super().closeEvent(event)
 
+    def _draw_snapshot(self, painter: QPainter, rect: QRect):
+        """スナップショットのうち rect（論理座標）に当たる部分を描画する"""
+        # スナップショットは物理ピクセルなので論理座標を変換して切り出す
+        ratio = self.devicePixelRatioF()
+        source = QRectF(rect.x() * ratio, rect.y() * ratio, rect.width() * ratio, rect.height() * ratio)
+        painter.drawPixmap(QRectF(rect), self._snapshot_pixmap, source)
+
     def paintEvent(self, event):
         painter = QPainter(self)
+        # 再描画が必要な範囲だけを描く
+        dirty = event.rect()
+        painter.setClipRect(dirty)
+
+        if self._snapshot_pixmap is not None:
+            self._draw_snapshot(painter, dirty)
+
         # 半透明背景
-        painter.fillRect(self.rect(), QColor(0, 0, 0, 80))
+        painter.fillRect(dirty, QColor(0, 0, 0, 80))
 
         # 選択矩形
-        if self.selecting and self.start_position and self.current_position:
-            rect = QRect(self.start_position, self.current_position).normalized()
-            # 選択領域を透明に
-            painter.fillRect(rect, QColor(0, 0, 0, 0))
+        rect = self._selection_rect()
+        if rect is not None and rect.intersects(dirty):
+            if self._snapshot_pixmap is not None:
+                # 選択領域は暗くせずにスナップショットをそのまま見せる
+                self._draw_snapshot(painter, rect.intersected(dirty))
+            else:
+                # 選択領域を透明に
+                painter.fillRect(rect, QColor(0, 0, 0, 0))
             # 矩形の枠線
-            painter.setPen(QPen(QColor(0, 120, 215), 2))
+            painter.setPen(QPen(QColor(0, 120, 215), SELECTION_PEN_WIDTH))
             painter.drawRect(rect)
 
-def show_screen_area(callback):
+def show_screen_area(callback, snapshot: Optional[ScreenSnapshot] = None):
     """画面選択オーバーレイを表示"""
-    return Overlay(callback)
+    return Overlay(callback, snapshot)